@@ -0,0 +1,128 @@
+"""
+Encode and decode time and size of events in binary codec, json and pickle.
+
+json is the API serializer, orjson when it is installed, stdlib_json is
+json module with the same dataclass fallback. json decode only parses to
+dicts, objects are not rebuilt, so it is faster than any real json reader
+of events would be.
+
+Run: python -m benchmarks.bench_codec
+"""
+import json
+import pickle
+import time
+import typing as tp
+
+from src.domain.events import Event
+from src.domain.events import PollCreated
+from src.domain.events import PollsPage
+from src.domain.events import PollView
+from src.domain.events import VoteSaved
+from src.domain.models import PollSummary
+from src.domain.models import PollWithResults
+from src.domain.models import SimplePoll
+from src.domain.models import SimpleVariant
+from src.domain.models import SimpleVote
+from src.services import codec
+from src.web import serialization
+
+
+def sample_events(variants: int, page: int) -> dict[str, Event]:
+    poll = SimplePoll(
+        poll_id="42",
+        creator_id="creator",
+        name="poll_42",
+        description="description of poll",
+        is_open=True,
+        variants=tuple(
+            SimpleVariant(variant_id=str(100 + v), poll_id="42", name=f"variant_{v}")
+            for v in range(variants)
+        ),
+    )
+    parent = VoteSaved(vote=SimpleVote("user", "100"), saved=True)
+    return {
+        "vote_saved": VoteSaved(
+            vote=SimpleVote(user_id="user_12345", variant_id="100"),
+            saved=True,
+            parent_id=parent.id_,
+        ),
+        "poll_created": PollCreated(poll=poll),
+        "poll_view": PollView(
+            sender_user_id="user_12345",
+            poll_id="42",
+            view=PollWithResults(
+                poll=poll,
+                results={variant.name: 1000 for variant in poll.variants},
+                voted=True,
+            ),
+        ),
+        "polls_page": PollsPage(
+            sender_user_id="user_12345",
+            polls=[
+                PollSummary(str(n), f"poll_{n}", "description of poll", True)
+                for n in range(page)
+            ],
+            next_cursor=str(page),
+        ),
+    }
+
+
+def per_call_seconds(
+    func: tp.Callable[[], tp.Any], calls: int, repeats: int = 5
+) -> float:
+    # лучший из прогонов: остальные искажены шумом машины
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(calls):
+            func()
+        best = min(best, time.perf_counter() - start)
+    return best / calls
+
+
+def stdlib_dumps(value: tp.Any) -> bytes:
+    return json.dumps(
+        value,
+        default=serialization._to_builtin,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode()
+
+
+def bench_formats(event: Event, calls: int) -> dict[str, float]:
+    formats: dict[
+        str, tuple[tp.Callable[[tp.Any], bytes], tp.Callable[[tp.Any], tp.Any]]
+    ] = {
+        "codec": (codec.encode, codec.decode),
+        "pickle": (
+            lambda value: pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL),
+            pickle.loads,
+        ),
+        "json": (serialization.dumps, serialization.loads),
+        "stdlib_json": (stdlib_dumps, json.loads),
+    }
+    results: dict[str, float] = {}
+    for name, (dumps, loads) in formats.items():
+        data = dumps(event)
+        view = memoryview(data)
+        results[f"{name}_bytes"] = len(data)
+        results[f"{name}_encode_us"] = (
+            per_call_seconds(lambda: dumps(event), calls) * 1e6
+        )
+        # codec читает прямо из memoryview, остальным нужны bytes
+        source = view if name == "codec" else data
+        results[f"{name}_decode_us"] = (
+            per_call_seconds(lambda: loads(source), calls) * 1e6
+        )
+    return results
+
+
+def main() -> None:
+    for name, event in sample_events(variants=5, page=20).items():
+        print(name)
+        for metric, value in bench_formats(event, calls=5000).items():
+            print(f"  {metric:<20}{value:>12.4g}")
+
+
+if __name__ == "__main__":
+    main()
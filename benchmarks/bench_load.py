@@ -0,0 +1,433 @@
+"""
+Throughput and latency of the bus, every adapter and the HTTP layer.
+
+Run: python -m benchmarks.bench_load --output results.json
+Compare with previous run: python -m benchmarks.bench_load --compare results.json
+"""
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import tempfile
+import time
+import typing as tp
+from dataclasses import asdict
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from src.bootstrap import build
+from src.domain.events import GetPollResult
+from src.domain.events import GetPollsPage
+from src.domain.events import GetPollView
+from src.domain.events import PollResult
+from src.domain.events import PollsPage
+from src.domain.events import PollView
+from src.domain.events import VoteEvent
+from src.domain.events import VoteSaved
+from src.domain.models import SimpleVote
+from src.domain.processors import AbstractAdapter
+from src.domain.processors import PollGetter
+from src.domain.processors import PollSaver
+from src.domain.processors import VoteCounter
+from src.domain.processors import VoteSaver
+from src.domain.tallies import PollTallies
+from src.services.cache import CachedDbAdapter
+from src.services.columnar_adapter import ColumnarDbAdapter
+from src.services.db_adapter import FakeDbAdapter
+from src.services.db_adapter import IndexedDbAdapter
+from src.services.message_bus import ConcreteMessageBus
+from src.services.single_flight import SingleFlightDbAdapter
+from src.services.sqlite_adapter import SqliteDbAdapter
+from src.settings import Settings
+from src.web.web import FastApiWeb
+from src.web.web_adapter import WebAdapter
+
+Samples = list[float]
+Results = dict[str, dict[str, float]]
+
+
+@dataclass
+class Scale:
+    polls: int = 20
+    variants: int = 4
+    users: int = 500
+    reads: int = 2000
+    concurrency: int = 50
+
+
+def summarize(samples: Samples, elapsed: float) -> dict[str, float]:
+    """Latencies in ms by nearest rank and operations per second"""
+    ordered = sorted(samples)
+
+    def rank(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {
+        "count": len(ordered),
+        "ops_per_sec": len(ordered) / elapsed if elapsed else 0.0,
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": rank(0.5),
+        "p99_ms": rank(0.99),
+    }
+
+
+async def measure(
+    calls: tp.Iterable[tp.Callable[[], tp.Awaitable[tp.Any]]], concurrency: int
+) -> dict[str, float]:
+    """Run calls by concurrency workers, measure latency of every call"""
+    pending = iter(calls)
+    samples: Samples = []
+
+    async def worker() -> None:
+        for call in pending:
+            start = time.perf_counter()
+            await call()
+            samples.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(samples, time.perf_counter() - start)
+
+
+async def create_polls(adapter: AbstractAdapter, scale: Scale) -> list[list[str]]:
+    """Create polls, return variants ids of every poll"""
+    variants: list[list[str]] = []
+    for number in range(scale.polls):
+        poll = await adapter.create_poll(
+            creator_id="bench",
+            name=f"poll_{number}",
+            description="bench poll",
+            is_open=True,
+            variants=[f"variant_{v}" for v in range(scale.variants)],
+        )
+        variants.append([v.variant_id for v in poll.variants])
+    return variants
+
+
+def user_votes(variants: list[list[str]], scale: Scale) -> list[SimpleVote]:
+    """Every user votes once in every poll"""
+    return [
+        SimpleVote(
+            user_id=f"user_{user}",
+            variant_id=poll_variants[user % len(poll_variants)],
+        )
+        for poll_variants in variants
+        for user in range(scale.users)
+    ]
+
+
+async def bench_bus(scale: Scale) -> Results:
+    adapter = IndexedDbAdapter()
+    tallies = PollTallies(db_adapter=adapter)
+    bus = ConcreteMessageBus(concurrent=True, isolate_errors=True, early_return=True)
+    bus.register(PollSaver(db_adapter=adapter))
+    bus.register(PollGetter(db_adapter=adapter))
+    bus.register(VoteCounter(db_adapter=adapter, tallies=tallies))
+    bus.register(VoteSaver(db_adapter=adapter, batch_size=100, tallies=tallies))
+    await bus.start()
+    variants = await create_polls(adapter, scale)
+    polls_ids = await adapter.get_polls_ids()
+    votes = user_votes(variants, scale)
+
+    results = {
+        "bus.vote": await measure(
+            (
+                partial(bus.request, VoteEvent(vote=vote), expect=[VoteSaved])
+                for vote in votes
+            ),
+            scale.concurrency,
+        ),
+        "bus.results": await measure(
+            (
+                partial(
+                    bus.request,
+                    GetPollResult(
+                        sender_user_id="bench", poll_id=polls_ids[i % scale.polls]
+                    ),
+                    expect=[PollResult],
+                )
+                for i in range(scale.reads)
+            ),
+            scale.concurrency,
+        ),
+        "bus.view": await measure(
+            (
+                partial(
+                    bus.request,
+                    GetPollView(
+                        sender_user_id=f"user_{i % scale.users}",
+                        poll_id=polls_ids[i % scale.polls],
+                    ),
+                    expect=[PollView],
+                )
+                for i in range(scale.reads)
+            ),
+            scale.concurrency,
+        ),
+        "bus.page": await measure(
+            (
+                partial(
+                    bus.request,
+                    GetPollsPage(sender_user_id="bench", limit=10),
+                    expect=[PollsPage],
+                )
+                for _ in range(scale.reads)
+            ),
+            scale.concurrency,
+        ),
+    }
+    await bus.stop()
+    return results
+
+
+def adapters(directory: str) -> dict[str, AbstractAdapter]:
+    return {
+        "memory": FakeDbAdapter(),
+        "indexed": IndexedDbAdapter(),
+        "columnar": ColumnarDbAdapter(),
+        "sqlite": SqliteDbAdapter(path=f"{directory}/bench.sqlite3"),
+        "sqlite_single_flight": SingleFlightDbAdapter(
+            adapter=SqliteDbAdapter(path=f"{directory}/bench_flight.sqlite3")
+        ),
+        "cached_indexed": CachedDbAdapter(
+            adapter=IndexedDbAdapter(), max_size=10000, ttl=60
+        ),
+    }
+
+
+async def bench_adapter(adapter: AbstractAdapter, name: str, scale: Scale) -> Results:
+    variants = await create_polls(adapter, scale)
+    polls_ids = await adapter.get_polls_ids()
+    votes = user_votes(variants, scale)
+    bounds = range(0, len(votes) + 99, 100)
+    batches = [votes[start:end] for start, end in zip(bounds, bounds[1:])]
+    reads = range(scale.reads)
+    return {
+        f"adapter.{name}.create_votes_100": await measure(
+            (partial(adapter.create_votes, batch) for batch in batches), 1
+        ),
+        f"adapter.{name}.poll_and_voted": await measure(
+            (
+                partial(
+                    adapter.get_poll_and_voted,
+                    poll_id=polls_ids[i % scale.polls],
+                    user_id=f"user_{i % scale.users}",
+                )
+                for i in reads
+            ),
+            scale.concurrency,
+        ),
+        f"adapter.{name}.votes_count": await measure(
+            (
+                partial(adapter.get_votes_count, poll_id=polls_ids[i % scale.polls])
+                for i in reads
+            ),
+            scale.concurrency,
+        ),
+        f"adapter.{name}.polls_page": await measure(
+            (partial(adapter.get_polls_page, limit=10) for _ in reads),
+            scale.concurrency,
+        ),
+    }
+
+
+async def bench_adapters(scale: Scale) -> Results:
+    results: Results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name, adapter in adapters(directory).items():
+            results |= await bench_adapter(adapter, name, scale)
+            inner = getattr(adapter, "adapter", adapter)
+            if isinstance(inner, SqliteDbAdapter):
+                await inner.close()
+    return results
+
+
+class AsgiClient:
+    """Calls ASGI app in process, without sockets and http client"""
+
+    def __init__(self, app: tp.Any) -> None:
+        self.app = app
+
+    async def request(
+        self, method: str, url: str, body: bytes = b"", user_id: str = "bench"
+    ) -> tuple[int, bytes]:
+        parts = urlsplit(url)
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": parts.path,
+            "raw_path": parts.path.encode(),
+            "query_string": parts.query.encode(),
+            "root_path": "",
+            "headers": [
+                (b"host", b"bench"),
+                (b"cookie", f"X-edec-poll={user_id}".encode()),
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+            "client": ("127.0.0.1", 0),
+            "server": ("bench", 80),
+        }
+        sent_body = False
+        done = asyncio.Event()
+        status_code = 0
+        chunks: list[bytes] = []
+
+        async def receive() -> dict[str, tp.Any]:
+            nonlocal sent_body
+            if not sent_body:
+                sent_body = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await done.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message: dict[str, tp.Any]) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                done.set()
+
+        await self.app(scope, receive, send)
+        done.set()
+        return status_code, b"".join(chunks)
+
+
+async def bench_http(scale: Scale) -> Results:
+    settings = Settings(storage="indexed", cache_size=0)
+    app = build(
+        bus=partial(
+            ConcreteMessageBus, concurrent=True, isolate_errors=True, early_return=True
+        ),
+        web=FastApiWeb,
+        web_adapter=WebAdapter,
+        settings=settings,
+    )
+    await app.start()
+    client = AsgiClient(tp.cast(FastApiWeb, app.web).app)
+    polls_ids: list[str] = []
+    variants: list[list[str]] = []
+    for number in range(scale.polls):
+        body = json.dumps(
+            {
+                "name": f"poll_{number}",
+                "variants": [f"variant_{v}" for v in range(scale.variants)],
+            }
+        ).encode()
+        _, response = await client.request("POST", "/api/v1/polls", body=body)
+        poll = json.loads(response)
+        polls_ids.append(poll["poll_id"])
+        variants.append([variant["variant_id"] for variant in poll["variants"]])
+    vote_requests = [
+        partial(
+            client.request,
+            "POST",
+            "/api/v1/votes",
+            body=json.dumps({"variant_id": vote.variant_id}).encode(),
+            user_id=vote.user_id,
+        )
+        for vote in user_votes(variants, scale)
+    ]
+    results = {
+        "http.api_vote": await measure(vote_requests, scale.concurrency),
+        "http.polls_page": await measure(
+            (partial(client.request, "GET", "/polls") for _ in range(scale.reads)),
+            scale.concurrency,
+        ),
+        "http.api_poll": await measure(
+            (
+                partial(
+                    client.request,
+                    "GET",
+                    f"/api/v1/polls/{polls_ids[i % scale.polls]}",
+                    user_id=f"user_{i % scale.users}",
+                )
+                for i in range(scale.reads)
+            ),
+            scale.concurrency,
+        ),
+        "http.poll_page": await measure(
+            (
+                partial(
+                    client.request,
+                    "GET",
+                    f"/poll_vote/{polls_ids[i % scale.polls]}",
+                    user_id=f"user_{i % scale.users}",
+                )
+                for i in range(scale.reads)
+            ),
+            scale.concurrency,
+        ),
+    }
+    await app.stop()
+    return results
+
+
+def compare(baseline: dict[str, tp.Any], current: dict[str, tp.Any]) -> None:
+    old_results = baseline["results"]
+    for name, metrics in current["results"].items():
+        if name not in old_results:
+            continue
+        for metric in ("ops_per_sec", "p50_ms", "p99_ms"):
+            old = old_results[name].get(metric)
+            if not old:
+                continue
+            change = (metrics[metric] - old) / old * 100
+            print(
+                f"{name:<44}{metric:<12}{old:>12.4g}{metrics[metric]:>12.4g}{change:>+9.1f}%"
+            )
+
+
+async def run(scale: Scale, suites: list[str]) -> dict[str, tp.Any]:
+    benches = {"bus": bench_bus, "adapters": bench_adapters, "http": bench_http}
+    results: Results = {}
+    for suite in suites:
+        results |= await benches[suite](scale)
+    return {
+        "meta": {
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "scale": asdict(scale),
+        },
+        "results": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    defaults = Scale()
+    for field, value in asdict(defaults).items():
+        parser.add_argument(f"--{field}", type=int, default=value)
+    parser.add_argument(
+        "--suite",
+        action="append",
+        choices=["bus", "adapters", "http"],
+        help="suites to run, all by default",
+    )
+    parser.add_argument("--output", type=Path, help="save results as JSON")
+    parser.add_argument("--compare", type=Path, help="JSON of previous run")
+    args = parser.parse_args()
+    scale = Scale(**{field: getattr(args, field) for field in asdict(defaults)})
+
+    report = asyncio.run(run(scale, args.suite or ["bus", "adapters", "http"]))
+    for name, metrics in report["results"].items():
+        print(
+            f"{name:<44}{metrics['ops_per_sec']:>12.1f} ops/s"
+            f"{metrics['p50_ms']:>10.3f} ms p50{metrics['p99_ms']:>10.3f} ms p99"
+        )
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+    if args.compare:
+        compare(json.loads(args.compare.read_text()), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Memory and allocations of frozen slotted models against plain dataclasses.
+
+Run: python -m benchmarks.bench_models
+"""
+import asyncio
+import copy
+import time
+import tracemalloc
+import typing as tp
+from dataclasses import dataclass
+
+from src.domain.models import SimplePoll
+from src.domain.models import SimpleVariant
+from src.domain.models import SimpleVote
+from src.services.db_adapter import FakeDbAdapter
+
+
+# модели в том виде, в каком они были до заморозки, для сравнения
+@dataclass
+class DictVote:
+    user_id: str
+    variant_id: str
+
+
+@dataclass
+class DictVariant:
+    variant_id: str
+    poll_id: str
+    name: str
+
+
+@dataclass
+class DictPoll:
+    poll_id: str
+    creator_id: str
+    name: str
+    description: str
+    is_open: bool
+    variants: list[DictVariant]
+
+
+def allocated_bytes(func: tp.Callable[[], tp.Any]) -> int:
+    """Bytes allocated and kept by func result"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = func()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return after - before
+
+
+def peak_bytes(func: tp.Callable[[], tp.Any]) -> int:
+    """Peak bytes allocated while func works"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak - before
+
+
+def per_call_seconds(func: tp.Callable[[], tp.Any], calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - start) / calls
+
+
+def bench_vote_memory(votes: int) -> dict[str, float]:
+    user_ids = [f"user_{i}" for i in range(votes)]
+    return {
+        "dict_vote_bytes": allocated_bytes(
+            lambda: [DictVote(user_id=u, variant_id="1") for u in user_ids]
+        )
+        / votes,
+        "slots_vote_bytes": allocated_bytes(
+            lambda: [SimpleVote(user_id=u, variant_id="1") for u in user_ids]
+        )
+        / votes,
+    }
+
+
+def bench_poll_reads(polls: int, variants: int, calls: int) -> dict[str, float]:
+    """Old get_polls with deepcopy and variants scan against current one"""
+    dict_polls: dict[str, DictPoll] = {}
+    dict_variants: dict[str, DictVariant] = {}
+    adapter = FakeDbAdapter()
+    for poll_number in range(polls):
+        poll_id = str(poll_number + 1)
+        poll_variants = [
+            DictVariant(
+                variant_id=f"{poll_id}_{v}", poll_id=poll_id, name=f"variant_{v}"
+            )
+            for v in range(variants)
+        ]
+        dict_variants.update({v.variant_id: v for v in poll_variants})
+        dict_polls[poll_id] = DictPoll(
+            poll_id=poll_id,
+            creator_id="1",
+            name=f"poll_{poll_id}",
+            description="description",
+            is_open=True,
+            variants=poll_variants,
+        )
+        adapter.polls[poll_id] = SimplePoll(
+            poll_id=poll_id,
+            creator_id="1",
+            name=f"poll_{poll_id}",
+            description="description",
+            is_open=True,
+            variants=tuple(
+                SimpleVariant(variant_id=v.variant_id, poll_id=poll_id, name=v.name)
+                for v in poll_variants
+            ),
+        )
+    polls_ids = list(dict_polls)
+
+    def dict_get_polls() -> list[DictPoll]:
+        result: list[DictPoll] = []
+        for poll_id in polls_ids:
+            current_poll = copy.deepcopy(dict_polls[poll_id])
+            current_poll.variants = [
+                v for v in dict_variants.values() if v.poll_id == poll_id
+            ]
+            result.append(current_poll)
+        return result
+
+    loop = asyncio.new_event_loop()
+
+    def slots_get_polls() -> list[SimplePoll]:
+        return loop.run_until_complete(adapter.get_polls(polls_ids))
+
+    try:
+        return {
+            "dict_read_peak_bytes": peak_bytes(dict_get_polls),
+            "slots_read_peak_bytes": peak_bytes(slots_get_polls),
+            "dict_read_seconds": per_call_seconds(dict_get_polls, calls),
+            "slots_read_seconds": per_call_seconds(slots_get_polls, calls),
+        }
+    finally:
+        loop.close()
+
+
+def main() -> None:
+    results = bench_vote_memory(votes=100_000) | bench_poll_reads(
+        polls=100, variants=5, calls=20
+    )
+    for name, value in results.items():
+        print(f"{name:<24}{value:>16.6g}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Memory per vote and results aggregation time of in-memory vote stores.
+
+Run: python -m benchmarks.bench_votes
+"""
+import asyncio
+import time
+import tracemalloc
+
+from src.domain.models import SimpleVote
+from src.domain.processors import AbstractAdapter
+from src.services.columnar_adapter import ColumnarDbAdapter
+from src.services.db_adapter import FakeDbAdapter
+from src.services.db_adapter import IndexedDbAdapter
+
+
+async def fill_votes(
+    adapter: AbstractAdapter, users: int, polls: int, variants: int
+) -> str:
+    """Every user votes in every poll, return id of the last poll"""
+    polls_variants: list[list[str]] = []
+    poll_id = ""
+    for poll_number in range(polls):
+        poll = await adapter.create_poll(
+            creator_id="1",
+            name=f"bench_{poll_number}",
+            description="bench poll",
+            is_open=True,
+            variants=[f"variant_{v}" for v in range(variants)],
+        )
+        polls_variants.append([v.variant_id for v in poll.variants])
+        poll_id = poll.poll_id
+    user_ids = [f"user_{i}" for i in range(users)]
+    for poll_variants in polls_variants:
+        batch = [
+            SimpleVote(user_id=user_id, variant_id=poll_variants[i % variants])
+            for i, user_id in enumerate(user_ids)
+        ]
+        await adapter.create_votes(batch)
+    return poll_id
+
+
+def bench_store(
+    adapter: AbstractAdapter, users: int, polls: int, variants: int
+) -> dict[str, float]:
+    loop = asyncio.new_event_loop()
+    try:
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        poll_id = loop.run_until_complete(fill_votes(adapter, users, polls, variants))
+        after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        start = time.perf_counter()
+        loop.run_until_complete(adapter.get_votes_count(poll_id=poll_id))
+        count_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        loop.run_until_complete(
+            adapter.has_user_voted(user_id=f"user_{users - 1}", poll_id=poll_id)
+        )
+        voted_seconds = time.perf_counter() - start
+    finally:
+        loop.close()
+    return {
+        "bytes_per_vote": (after - before) / (users * polls),
+        "count_seconds": count_seconds,
+        "voted_seconds": voted_seconds,
+    }
+
+
+def bench_recount(users: int, polls: int, variants: int) -> float:
+    adapter = ColumnarDbAdapter()
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(fill_votes(adapter, users, polls, variants))
+    finally:
+        loop.close()
+    start = time.perf_counter()
+    adapter.recount_votes()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    users = 20_000
+    polls = 20
+    variants = 5
+    stores: dict[str, AbstractAdapter] = {
+        "fake": FakeDbAdapter(),
+        "indexed": IndexedDbAdapter(),
+        "columnar": ColumnarDbAdapter(),
+    }
+    for name, adapter in stores.items():
+        for metric, value in bench_store(adapter, users, polls, variants).items():
+            print(f"{name + '_' + metric:<28}{value:>16.6g}")
+    recount_seconds = bench_recount(users, polls, variants)
+    print(f"{'columnar_recount_seconds':<28}{recount_seconds:>16.6g}")
+
+
+if __name__ == "__main__":
+    main()
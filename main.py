@@ -237,14 +237,37 @@
 #     return templates.TemplateResponse("auth/login.html", form.__dict__)
 
 import asyncio
+import socket
+import typing as tp
+from functools import partial
 
 from src.bootstrap import bootstrap
 from src.services.message_bus import ConcreteMessageBus
+from src.services.message_bus import MessageBus
+from src.services.message_bus import WorkerPoolMessageBus
+from src.settings import Settings
+from src.settings import get_settings
 from src.web.web import FastApiWeb
 from src.web.web_adapter import WebAdapter
+from src.web.workers import run_workers
 
 
-async def main() -> None:
+def get_bus_factory(settings: Settings) -> tp.Callable[[], MessageBus]:
+    if settings.bus == "workers":
+        return partial(
+            WorkerPoolMessageBus,
+            workers=settings.bus_workers,
+            request_workers=settings.bus_workers,
+            max_queue_size=settings.bus_queue_size,
+            # воркер берет из очереди сразу столько голосов, сколько в пачке
+            prefetch=settings.vote_batch_size,
+        )
+    return partial(
+        ConcreteMessageBus, concurrent=True, isolate_errors=True, early_return=True
+    )
+
+
+async def serve(settings: Settings, sockets: list[socket.socket] | None = None) -> None:
     init_app = await bootstrap(
         # repo=SQLAlchemyRepo,  # InMemoryRepo,
         # migrator=AlembicMigrator,
@@ -253,9 +276,11 @@ async def main() -> None:
         # ctx_repo=RedisContextRepo,  # InMemoryContextRepo,
         # ep=EventProcessor,
         # ep_wrapper=EPWrapper,
-        bus=ConcreteMessageBus,
+        bus=get_bus_factory(settings),
         web=FastApiWeb,
         web_adapter=WebAdapter,
+        settings=settings,
+        sockets=sockets,
         # poller=TgPoller,
         # poller_adapter=PollerAdapter,
         # sender=TgSender,
@@ -264,5 +289,17 @@ async def main() -> None:
     await init_app
 
 
+def run_worker(settings: Settings, sock: socket.socket) -> None:
+    asyncio.run(serve(settings, sockets=[sock]))
+
+
+def main() -> None:
+    settings = get_settings()
+    if settings.web_workers > 1:
+        run_workers(settings, worker=run_worker)
+    else:
+        asyncio.run(serve(settings))
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    main()
@@ -1,53 +1,223 @@
 import asyncio
+import os
+import socket
 import typing as tp
+from dataclasses import dataclass
 
+from src.domain.processors import AbstractAdapter
 from src.domain.processors import PollGetter
 from src.domain.processors import PollSaver
+from src.domain.processors import ResultsBroadcaster
 from src.domain.processors import VoteCounter
 from src.domain.processors import VoteSaver
+from src.domain.tallies import PollTallies
+from src.domain.versions import DataVersion
+from src.services.cache import CachedDbAdapter
+from src.services.change_sync import ChangeSync
+from src.services.columnar_adapter import ColumnarDbAdapter
 from src.services.db_adapter import FakeDbAdapter
+from src.services.db_adapter import IndexedDbAdapter
+from src.services.journal import EventJournal
 from src.services.message_bus import MessageBus
+from src.services.metrics import BusMetrics
+from src.services.observed_adapter import AdapterObserver
+from src.services.observed_adapter import ObservedDbAdapter
+from src.services.single_flight import SingleFlightDbAdapter
+from src.services.sqlite_adapter import SqliteDbAdapter
+from src.services.tracing import JsonLinesExporter
+from src.services.tracing import Tracer
+from src.settings import Settings
+from src.settings import get_settings
+from src.web.page_cache import PageCache
 from src.web.web import AbstractWeb
 from src.web.web_adapter import AbstractWebAdapter
 
 
-async def bootstrap(
-    bus: tp.Type[MessageBus],
+def create_storage(settings: Settings) -> AbstractAdapter:
+    if settings.storage == "memory":
+        return FakeDbAdapter(initial=True)
+    if settings.storage == "indexed":
+        return IndexedDbAdapter(initial=True)
+    if settings.storage == "columnar":
+        return ColumnarDbAdapter(initial=True)
+    if settings.storage == "sqlite":
+        return SqliteDbAdapter(
+            path=settings.sqlite_path, pool_size=settings.sqlite_pool_size
+        )
+    raise ValueError(f"Unknown storage: {settings.storage}")
+
+
+def create_db_adapter(settings: Settings, storage: AbstractAdapter) -> AbstractAdapter:
+    db_adapter = storage
+    if isinstance(storage, SqliteDbAdapter):
+        # одинаковые одновременные чтения идут в базу одним запросом,
+        # in-memory хранилища отвечают без ожидания, им это не нужно
+        db_adapter = SingleFlightDbAdapter(adapter=storage)
+    if settings.cache_size > 0:
+        db_adapter = CachedDbAdapter(
+            adapter=db_adapter, max_size=settings.cache_size, ttl=settings.cache_ttl
+        )
+    return db_adapter
+
+
+@dataclass
+class App:
+    bus: MessageBus
+    web: AbstractWeb
+    db_adapter: AbstractAdapter
+    # только при нескольких воркерах
+    change_sync: ChangeSync | None = None
+    journal: EventJournal | None = None
+
+    async def start(self) -> None:
+        if self.journal is not None:
+            # состояние восстанавливается до первого события
+            await self.journal.replay()
+        await self.bus.start()
+        if self.change_sync is not None:
+            await self.change_sync.start()
+
+    async def stop(self) -> None:
+        if self.change_sync is not None:
+            await self.change_sync.stop()
+        await self.bus.stop()
+        # после шины: подписчики сбрасывают пачки в хранилище и журнал
+        if self.journal is not None:
+            await self.journal.close()
+        await self.db_adapter.close()
+
+
+def build(
+    bus: tp.Callable[[], MessageBus],
     web: tp.Type[AbstractWeb],
     web_adapter: tp.Type[AbstractWebAdapter],
-) -> tp.Any:
-    # if migrator:
-    #     await migrator().run_async_upgrade()
+    settings: Settings,
+) -> App:
+    """Create adapter, processors, bus and web, app is not started"""
+    storage = create_storage(settings)
+    if settings.web_workers > 1 and not isinstance(storage, SqliteDbAdapter):
+        raise ValueError("Several web workers need shared storage, use sqlite")
+    if settings.journal_dir and type(storage) is not IndexedDbAdapter:
+        raise ValueError("Journal restores indexed storage only")
+    concrete_bus = bus()
+    metrics = None
+    if settings.metrics:
+        # /metrics отвечает случайный процесс, его серии помечены pid
+        worker = str(os.getpid()) if settings.web_workers > 1 else ""
+        metrics = BusMetrics(bus=concrete_bus, worker=worker)
+    tracer = (
+        Tracer(exporter=JsonLinesExporter(path=settings.trace_path))
+        if settings.trace_path
+        else None
+    )
+    observers: list[AdapterObserver] = [
+        observer for observer in (metrics, tracer) if observer is not None
+    ]
 
-    fake_db_adapter = FakeDbAdapter(initial=True)
+    db_adapter = create_db_adapter(settings, storage)
+    cache = db_adapter if isinstance(db_adapter, CachedDbAdapter) else None
+    if observers:
+        # время вызовов с учетом кэша, как его видят процессоры
+        db_adapter = ObservedDbAdapter(adapter=db_adapter, observers=observers)
+    if metrics is not None:
+        concrete_bus.add_observer(metrics)
+    if tracer is not None:
+        concrete_bus.add_observer(tracer)
 
-    poll_saver = PollSaver(db_adapter=fake_db_adapter)
-    poll_getter = PollGetter(db_adapter=fake_db_adapter)
-    vote_counter = VoteCounter(db_adapter=fake_db_adapter)
-    vote_saver = VoteSaver(db_adapter=fake_db_adapter)
+    tallies = PollTallies(db_adapter=db_adapter)
+    versions = DataVersion()
+    journal = None
+    if settings.journal_dir:
+        journal = EventJournal(
+            db_adapter=tp.cast(IndexedDbAdapter, storage),
+            directory=settings.journal_dir,
+            fsync_interval=settings.journal_fsync_interval,
+            snapshot_every=settings.journal_snapshot_every,
+        )
 
-    concrete_bus = bus()
+    poll_saver = PollSaver(db_adapter=db_adapter, versions=versions, journal=journal)
+    poll_getter = PollGetter(db_adapter=db_adapter, tallies=tallies)
+    vote_counter = VoteCounter(db_adapter=db_adapter, tallies=tallies)
+    vote_saver = VoteSaver(
+        db_adapter=db_adapter,
+        tallies=tallies,
+        versions=versions,
+        batch_size=settings.vote_batch_size,
+        batch_window=settings.vote_batch_window,
+        journal=journal,
+    )
+
+    live_results = ResultsBroadcaster(
+        db_adapter=db_adapter, tallies=tallies, tick=settings.live_results_tick
+    )
 
     concrete_bus.register(poll_saver)
     concrete_bus.register(poll_getter)
     concrete_bus.register(vote_counter)
     concrete_bus.register(vote_saver)
-    # mp = metrics_processor()
-    # concrete_bus.register(mp)
+    concrete_bus.register(live_results)
 
     concrete_web_adapter = web_adapter(
         bus=concrete_bus,
-        # metrics_processor=mp,
+        metrics=metrics,
+        tracer=tracer,
+        live_results=live_results,
+        versions=versions,
+        page_cache=(
+            PageCache(max_size=settings.page_cache_size)
+            if settings.page_cache_size > 0
+            else None
+        ),
     )
     concrete_web = web(
-        host="localhost",
-        port=8080,
+        host=settings.host,
+        port=settings.port,
         adapter=concrete_web_adapter,
         message_handler=concrete_web_adapter.message_handler,
         # metrics_handler=concrete_web_adapter.get_metrics,
     )
+    change_sync = None
+    if settings.web_workers > 1 and isinstance(storage, SqliteDbAdapter):
+        change_sync = ChangeSync(
+            storage=storage,
+            bus=concrete_bus,
+            tallies=tallies,
+            versions=versions,
+            cache=cache,
+            interval=settings.sync_interval,
+        )
+    return App(
+        bus=concrete_bus,
+        web=concrete_web,
+        db_adapter=db_adapter,
+        change_sync=change_sync,
+        journal=journal,
+    )
+
+
+async def bootstrap(
+    bus: tp.Callable[[], MessageBus],
+    web: tp.Type[AbstractWeb],
+    web_adapter: tp.Type[AbstractWebAdapter],
+    settings: Settings | None = None,
+    sockets: list[socket.socket] | None = None,
+) -> tp.Any:
+    # if migrator:
+    #     await migrator().run_async_upgrade()
+
+    if settings is None:
+        settings = get_settings()
+
+    app = build(bus=bus, web=web, web_adapter=web_adapter, settings=settings)
+
+    async def run() -> None:
+        await app.start()
+        try:
+            await app.web.start(sockets=sockets)
+        finally:
+            await app.stop()
 
     # if poller is not None and poller_adapter is not None:
     #     return asyncio.gather(concrete_poller.poll(), concrete_web.start())
     # else:
-    return asyncio.gather(concrete_web.start())
+    return asyncio.gather(run())
@@ -1,14 +1,18 @@
 import uuid
 from dataclasses import dataclass
 
+from src.domain.models import PollSummary
+from src.domain.models import PollWithResults
 from src.domain.models import SimplePoll
 from src.domain.models import SimpleVote
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, frozen=True, slots=True)
 class Event:
     """
-    Base class for events
+    Base class for events.
+    Events are frozen, use dataclasses.replace to get changed copy,
+    copy keeps id_ of the event.
     """
 
     id_: str = ""
@@ -16,27 +20,36 @@ class Event:
     track_for_event_class: list[type] | None = None
 
     def __post_init__(self) -> None:
-        self.id_ = str(uuid.uuid4())
+        # replace передает id_ копии, новый создается только у нового события
+        if not self.id_:
+            object.__setattr__(self, "id_", str(uuid.uuid4()))
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class VoteEvent(Event):
     vote: SimpleVote
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
+class VoteSaved(Event):
+    vote: SimpleVote
+    saved: bool
+    unknown_variant: bool = False  # голос не сохранен, такого варианта нет
+
+
+@dataclass(frozen=True, slots=True)
 class GetPollResult(Event):
     sender_user_id: str
     poll_id: str
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class PollResult(Event):
     poll_id: str
     results: dict[str, int]  # словарь вида вариант_имя:количество_ответов
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class CreatePoll(Event):
     creator_id: str
     name: str
@@ -45,25 +58,57 @@ class CreatePoll(Event):
     variants: list[str]  # варианты текстом в списке
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
+class PollCreated(Event):
+    poll: SimplePoll
+
+
+@dataclass(frozen=True, slots=True)
 class GetPollIds(Event):
     sender_user_id: str
     ...
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class GetPollsByIds(Event):
     sender_user_id: str
     polls_ids: list[str]
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class PollsIds(Event):
     sender_user_id: str
     ids: list[str]
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Polls(Event):
     sender_user_id: str
     polls: list[SimplePoll]
+
+
+@dataclass(frozen=True, slots=True)
+class GetPollsPage(Event):
+    sender_user_id: str
+    limit: int
+    cursor: str = ""  # id последнего опроса предыдущей страницы
+
+
+@dataclass(frozen=True, slots=True)
+class PollsPage(Event):
+    sender_user_id: str
+    polls: list[PollSummary]
+    next_cursor: str  # пустая строка, если это последняя страница
+
+
+@dataclass(frozen=True, slots=True)
+class GetPollView(Event):
+    sender_user_id: str
+    poll_id: str
+
+
+@dataclass(frozen=True, slots=True)
+class PollView(Event):
+    sender_user_id: str
+    poll_id: str
+    view: PollWithResults | None  # None, если опроса нет
@@ -3,18 +3,22 @@ from dataclasses import dataclass
 
 class BaseDomainModel:
     """
-    Base model class
+    Base model class.
+    Models are frozen and slotted, so one instance can be shared
+    by adapters, caches and events without copying.
     """
 
+    __slots__ = ()
 
-@dataclass
+
+@dataclass(frozen=True, slots=True)
 class User(BaseDomainModel):
     user_id: str
     name: str
     surname: str
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class BasePoll(BaseDomainModel):
     poll_id: str
     creator_id: str
@@ -24,19 +28,42 @@ class BasePoll(BaseDomainModel):
     ...
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
+class PollSummary(BaseDomainModel):
+    """
+    Poll without variants, for polls list
+    """
+
+    poll_id: str
+    name: str
+    description: str
+    is_open: bool
+
+
+@dataclass(frozen=True, slots=True)
 class SimpleVariant(BaseDomainModel):
     variant_id: str
     poll_id: str
     name: str
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class SimplePoll(BasePoll):
-    variants: list[SimpleVariant]
+    variants: tuple[SimpleVariant, ...]
+
+
+@dataclass(frozen=True, slots=True)
+class PollWithResults(BaseDomainModel):
+    """
+    Poll with its results and whether user has voted in it, for poll page
+    """
+
+    poll: SimplePoll
+    results: dict[str, int]  # словарь вида вариант_имя:количество_ответов
+    voted: bool
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class SimpleVote(BaseDomainModel):
     user_id: str
     variant_id: str
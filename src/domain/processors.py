@@ -1,17 +1,35 @@
+import asyncio
+import typing as tp
 from abc import ABC
 from abc import abstractmethod
+from dataclasses import replace
 
 from src.domain.events import CreatePoll
 from src.domain.events import Event
 from src.domain.events import GetPollIds
 from src.domain.events import GetPollResult
 from src.domain.events import GetPollsByIds
+from src.domain.events import GetPollsPage
+from src.domain.events import GetPollView
+from src.domain.events import PollCreated
 from src.domain.events import PollResult
 from src.domain.events import Polls
 from src.domain.events import PollsIds
+from src.domain.events import PollsPage
+from src.domain.events import PollView
 from src.domain.events import VoteEvent
+from src.domain.events import VoteSaved
+from src.domain.models import PollSummary
+from src.domain.models import PollWithResults
 from src.domain.models import SimplePoll
+from src.domain.models import SimpleVote
 from src.domain.subscriber import Subscriber
+from src.domain.tallies import PollTallies
+from src.domain.versions import DataVersion
+
+E = tp.TypeVar("E", bound=Event)
+# обновления результатов для слушателя, None - конец потока
+ResultsQueue = asyncio.Queue[dict[str, tp.Any] | None]
 
 
 class AbstractAdapter(ABC):
@@ -35,7 +53,25 @@ class AbstractAdapter(ABC):
         raise NotImplementedError
 
     @abstractmethod
+    async def get_polls_page(self, limit: int, after: str = "") -> list[PollSummary]:
+        """Up to limit polls following poll with id after, from start if empty"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def create_vote_if_absent(self, user_id: str, variant_id: str) -> bool:
+        """
+        Atomically save vote unless user has voted in poll of variant already.
+        Return False for duplicate vote or unknown variant.
+        """
+        raise NotImplementedError
+
     async def create_vote(self, user_id: str, variant_id: str) -> bool:
+        """Same as create_vote_if_absent, votes are never duplicated"""
+        return await self.create_vote_if_absent(user_id=user_id, variant_id=variant_id)
+
+    @abstractmethod
+    async def create_votes(self, votes: list[SimpleVote]) -> list[bool]:
+        """Save votes like create_vote_if_absent, duplicates in votes too"""
         raise NotImplementedError
 
     @abstractmethod
@@ -44,6 +80,23 @@ class AbstractAdapter(ABC):
     ) -> dict[str, int]:
         raise NotImplementedError
 
+    @abstractmethod
+    async def get_votes_count(self, poll_id: str) -> dict[str, int]:
+        """Votes of poll as variant_id: votes"""
+        raise NotImplementedError
+
+    async def get_poll_and_voted(
+        self, poll_id: str, user_id: str
+    ) -> tuple[SimplePoll, bool] | None:
+        """
+        Poll and voted flag of user, None if poll is unknown.
+        Adapters with real storage should answer it with one query.
+        """
+        polls = await self.get_polls(polls_ids=[poll_id])
+        if not polls:
+            return None
+        return polls[0], await self.has_user_voted(user_id=user_id, poll_id=poll_id)
+
     @abstractmethod
     async def update_poll(self, poll_id: str, is_open: bool) -> bool:
         raise NotImplementedError
@@ -52,22 +105,40 @@ class AbstractAdapter(ABC):
     async def has_user_voted(self, user_id: str, poll_id: str) -> bool:
         raise NotImplementedError
 
+    @abstractmethod
+    async def has_variant(self, variant_id: str) -> bool:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        """Release connections and threads, called once on app stop"""
+        return None
+
+
+class ChangeJournal(tp.Protocol):
+    """Durable log of writes, saved change is acknowledged after it is logged"""
+
+    async def log_poll(self, poll: SimplePoll) -> None:
+        """Return when created poll is on disk"""
+
+    async def log_vote(self, vote: SimpleVote) -> None:
+        """Return when saved vote is on disk"""
+
 
 class BaseProcessor(ABC, Subscriber):
     """
-    Base processor class
+    Base processor class.
+    Set handled_events to event classes the processor needs,
+    bus will not call process for other events.
     """
 
     def __init__(self, db_adapter: AbstractAdapter) -> None:
         self.db_adapter = db_adapter
 
     @staticmethod
-    async def set_event_parent_id(parent_event: Event, child_event: Event) -> Event:
-        if parent_event.parent_id:
-            child_event.parent_id = parent_event.parent_id
-        else:
-            child_event.parent_id = parent_event.id_
-        return child_event
+    async def set_event_parent_id(parent_event: Event, child_event: E) -> E:
+        return replace(
+            child_event, parent_id=parent_event.parent_id or parent_event.id_
+        )
 
     @abstractmethod
     async def process(self, event: Event) -> list[Event]:
@@ -75,49 +146,192 @@ class BaseProcessor(ABC, Subscriber):
 
 
 class VoteSaver(BaseProcessor):
+    """
+    Save votes. With batch_size > 1 votes are collected and saved by one
+    create_votes call when batch is full or batch_window seconds passed.
+    Repeated vote of user in poll is not saved, VoteSaved has saved=False,
+    vote for unknown variant also has unknown_variant=True.
+    With journal VoteSaved is returned after saved vote is logged.
+    """
+
+    handled_events = (VoteEvent,)
+
+    def __init__(
+        self,
+        db_adapter: AbstractAdapter,
+        batch_size: int = 1,
+        batch_window: float = 0.005,
+        tallies: PollTallies | None = None,
+        versions: DataVersion | None = None,
+        journal: ChangeJournal | None = None,
+    ) -> None:
+        super().__init__(db_adapter=db_adapter)
+        self.tallies = tallies
+        self.versions = versions
+        self.journal = journal
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.batch: list[tuple[SimpleVote, asyncio.Future[bool]]] = []
+        self.flush_timer: asyncio.Task[None] | None = None
+        self.unsettled: set[asyncio.Future[bool]] = set()
+
     async def process(self, event: Event) -> list[Event]:
         if not isinstance(event, VoteEvent):
             return []
-        _ = await self.db_adapter.create_vote(
-            user_id=event.vote.user_id,
-            variant_id=event.vote.variant_id,
+        if self.tallies is None:
+            saved = await self.save(event.vote)
+        else:
+            # загрузка счетчиков не должна попасть между сохранением и учетом
+            async with self.tallies.writing():
+                saved = await self.save(event.vote)
+                if saved:
+                    self.tallies.record_vote(event.vote.variant_id)
+        if saved and self.journal is not None:
+            # подтверждение голоса не должно опередить запись на диск
+            await self.journal.log_vote(event.vote)
+        if saved and self.versions is not None:
+            self.versions.bump_votes()
+        # редкий путь: отличить неизвестный вариант от повторного голоса
+        unknown_variant = not saved and not await self.db_adapter.has_variant(
+            event.vote.variant_id
         )
-        return []
+        out_event = VoteSaved(
+            vote=event.vote, saved=saved, unknown_variant=unknown_variant
+        )
+        out_event = await self.set_event_parent_id(event, out_event)
+        return [out_event]
+
+    async def save(self, vote: SimpleVote) -> bool:
+        if self.batch_size > 1:
+            return await self.save_in_batch(vote)
+        return await self.db_adapter.create_vote_if_absent(
+            user_id=vote.user_id, variant_id=vote.variant_id
+        )
+
+    async def save_in_batch(self, vote: SimpleVote) -> bool:
+        future: asyncio.Future[bool] = asyncio.get_running_loop().create_future()
+        self.unsettled.add(future)
+        future.add_done_callback(self.unsettled.discard)
+        self.batch.append((vote, future))
+        if len(self.batch) >= self.batch_size:
+            await self.flush()
+        elif self.flush_timer is None:
+            self.flush_timer = asyncio.create_task(self.flush_later())
+        return await future
+
+    async def flush_later(self) -> None:
+        await asyncio.sleep(self.batch_window)
+        self.flush_timer = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        batch, self.batch = self.batch, []
+        if not batch:
+            return
+        try:
+            results = await self.db_adapter.create_votes([vote for vote, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), saved in zip(batch, results):
+            if not future.done():
+                future.set_result(saved)
+
+    async def close(self) -> None:
+        if self.flush_timer is not None:
+            self.flush_timer.cancel()
+            self.flush_timer = None
+        await self.flush()
+        if self.unsettled:
+            await asyncio.wait(self.unsettled)
 
 
 class PollSaver(BaseProcessor):
+    """Create polls. With journal PollCreated is returned after poll is logged"""
+
+    handled_events = (CreatePoll,)
+
+    def __init__(
+        self,
+        db_adapter: AbstractAdapter,
+        versions: DataVersion | None = None,
+        journal: ChangeJournal | None = None,
+    ) -> None:
+        super().__init__(db_adapter=db_adapter)
+        self.versions = versions
+        self.journal = journal
+
     async def process(self, event: Event) -> list[Event]:
         if not isinstance(event, CreatePoll):
             return []
-        _ = await self.db_adapter.create_poll(
+        poll = await self.db_adapter.create_poll(
             creator_id=event.creator_id,
             name=event.name,
             description=event.description,
             is_open=event.is_open,
             variants=event.variants,
         )
-        return []
+        if self.journal is not None:
+            await self.journal.log_poll(poll)
+        if self.versions is not None:
+            self.versions.bump_polls()
+        out_event = PollCreated(poll=poll)
+        out_event = await self.set_event_parent_id(event, out_event)
+        return [out_event]
 
 
 class VoteCounter(BaseProcessor):
+    """
+    Count poll results. With tallies results are taken from
+    incrementally updated counts instead of counting votes in adapter.
+    """
+
+    handled_events = (GetPollResult,)
+
+    def __init__(
+        self, db_adapter: AbstractAdapter, tallies: PollTallies | None = None
+    ) -> None:
+        super().__init__(db_adapter=db_adapter)
+        self.tallies = tallies
+
     async def process(self, event: Event) -> list[Event]:
         if not isinstance(event, GetPollResult):
             return []
-        results: dict[str, int] = await self.db_adapter.get_poll_results(
-            poll_id=event.poll_id, sender_user_id=event.sender_user_id
-        )
+        if self.tallies is not None:
+            results = await self.tallies.get_results(poll_id=event.poll_id)
+        else:
+            results = await self.db_adapter.get_poll_results(
+                poll_id=event.poll_id, sender_user_id=event.sender_user_id
+            )
         poll_result = PollResult(poll_id=event.poll_id, results=results)
-        poll_result = await self.set_event_parent_id(event, poll_result)  # type: ignore
+        poll_result = await self.set_event_parent_id(event, poll_result)
         return [poll_result]
 
 
 class PollGetter(BaseProcessor):
+    """
+    Read polls. With tallies results of poll view are taken from
+    incrementally updated counts instead of counting votes in adapter.
+    """
+
+    handled_events = (GetPollIds, GetPollsByIds, GetPollsPage, GetPollView)
+
+    def __init__(
+        self, db_adapter: AbstractAdapter, tallies: PollTallies | None = None
+    ) -> None:
+        super().__init__(db_adapter=db_adapter)
+        self.tallies = tallies
+
     async def process(self, event: Event) -> list[Event]:
         if not isinstance(
             event,
             (
                 GetPollIds,
                 GetPollsByIds,
+                GetPollsPage,
+                GetPollView,
             ),
         ):
             return []
@@ -130,16 +344,154 @@ class PollGetter(BaseProcessor):
                     out_event_voted = GetPollResult(
                         sender_user_id=event.sender_user_id, poll_id=event.polls_ids[0]
                     )
-                    out_event_voted = await self.set_event_parent_id(event, out_event_voted)  # type: ignore
+                    out_event_voted = await self.set_event_parent_id(
+                        event, out_event_voted
+                    )
                     return [out_event_voted]
             polls = await self.db_adapter.get_polls(polls_ids=event.polls_ids)
             out_event = Polls(polls=polls, sender_user_id=event.sender_user_id)
-            out_event = await self.set_event_parent_id(event, out_event)  # type: ignore
+            out_event = await self.set_event_parent_id(event, out_event)
             return [out_event]
         elif isinstance(event, GetPollIds):
             ids = await self.db_adapter.get_polls_ids()
             out_ids_event = PollsIds(sender_user_id=event.sender_user_id, ids=ids)
-            out_ids_event = await self.set_event_parent_id(event, out_ids_event)  # type: ignore
+            out_ids_event = await self.set_event_parent_id(event, out_ids_event)
             return [out_ids_event]
+        elif isinstance(event, GetPollsPage):
+            # на один больше, чтобы понять, есть ли следующая страница
+            limit = event.limit
+            summaries = await self.db_adapter.get_polls_page(
+                limit=limit + 1, after=event.cursor
+            )
+            page = summaries[:limit]
+            next_cursor = page[-1].poll_id if len(summaries) > limit else ""
+            out_page_event = PollsPage(
+                sender_user_id=event.sender_user_id,
+                polls=page,
+                next_cursor=next_cursor,
+            )
+            out_page_event = await self.set_event_parent_id(event, out_page_event)
+            return [out_page_event]
+        elif isinstance(event, GetPollView):
+            view = await self.get_poll_view(
+                poll_id=event.poll_id, user_id=event.sender_user_id
+            )
+            out_view_event = PollView(
+                sender_user_id=event.sender_user_id, poll_id=event.poll_id, view=view
+            )
+            out_view_event = await self.set_event_parent_id(event, out_view_event)
+            return [out_view_event]
         else:
             raise NotImplementedError
+
+    async def get_poll_view(self, poll_id: str, user_id: str) -> PollWithResults | None:
+        found = await self.db_adapter.get_poll_and_voted(
+            poll_id=poll_id, user_id=user_id
+        )
+        if found is None:
+            return None
+        poll, voted = found
+        if self.tallies is not None:
+            results = await self.tallies.get_results(poll_id=poll_id)
+        else:
+            results = await self.db_adapter.get_poll_results(
+                poll_id=poll_id, sender_user_id=user_id
+            )
+        return PollWithResults(poll=poll, results=results, voted=voted)
+
+
+class ResultsBroadcaster(BaseProcessor):
+    """
+    Push results of polls to live listeners. Saved votes are collected
+    for tick seconds and sent once per poll as delta and current results,
+    however many clients listen to the poll.
+    """
+
+    handled_events = (VoteSaved,)
+
+    def __init__(
+        self,
+        db_adapter: AbstractAdapter,
+        tallies: PollTallies,
+        tick: float = 0.5,
+        listener_queue_size: int = 16,
+    ) -> None:
+        super().__init__(db_adapter=db_adapter)
+        self.tallies = tallies
+        self.tick = tick
+        self.listener_queue_size = listener_queue_size
+        self.listeners: dict[str, set[ResultsQueue]] = {}
+        # вариант: (опрос, имя варианта), только для опросов со слушателями
+        self.variant_polls: dict[str, tuple[str, str]] = {}
+        # опрос: имя варианта: новые голоса с последней отправки
+        self.deltas: dict[str, dict[str, int]] = {}
+        self.flush_timer: asyncio.Task[None] | None = None
+
+    async def has_poll(self, poll_id: str) -> bool:
+        await self.tallies.get_results(poll_id)
+        return poll_id in self.tallies.variants
+
+    async def subscribe(self, poll_id: str) -> ResultsQueue:
+        """Return queue of results updates, first item is current results"""
+        results = await self.tallies.get_results(poll_id)
+        for variant_id, name in self.tallies.variants.get(poll_id, []):
+            self.variant_polls[variant_id] = (poll_id, name)
+        queue: ResultsQueue = asyncio.Queue(maxsize=self.listener_queue_size)
+        queue.put_nowait({"poll_id": poll_id, "delta": {}, "results": results})
+        self.listeners.setdefault(poll_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, poll_id: str, queue: ResultsQueue) -> None:
+        listeners = self.listeners.get(poll_id)
+        if listeners is None:
+            return
+        listeners.discard(queue)
+        if listeners:
+            return
+        del self.listeners[poll_id]
+        self.deltas.pop(poll_id, None)
+        for variant_id, _ in self.tallies.variants.get(poll_id, []):
+            self.variant_polls.pop(variant_id, None)
+
+    async def process(self, event: Event) -> list[Event]:
+        if not isinstance(event, VoteSaved) or not event.saved:
+            return []
+        target = self.variant_polls.get(event.vote.variant_id)
+        if target is None:
+            return []
+        poll_id, name = target
+        delta = self.deltas.setdefault(poll_id, {})
+        delta[name] = delta.get(name, 0) + 1
+        if self.flush_timer is None:
+            self.flush_timer = asyncio.create_task(self.flush_later())
+        return []
+
+    async def flush_later(self) -> None:
+        await asyncio.sleep(self.tick)
+        self.flush_timer = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        deltas, self.deltas = self.deltas, {}
+        for poll_id, delta in deltas.items():
+            results = await self.tallies.get_results(poll_id)
+            update = {"poll_id": poll_id, "delta": delta, "results": results}
+            for queue in list(self.listeners.get(poll_id, ())):
+                self.push(queue, update)
+
+    @staticmethod
+    def push(queue: ResultsQueue, update: dict[str, tp.Any] | None) -> None:
+        # в каждом обновлении есть итог, медленный клиент теряет только старые
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(update)
+
+    async def close(self) -> None:
+        if self.flush_timer is not None:
+            self.flush_timer.cancel()
+            self.flush_timer = None
+        await self.flush()
+        # None завершает поток у слушателей
+        for listeners in self.listeners.values():
+            for queue in listeners:
+                self.push(queue, None)
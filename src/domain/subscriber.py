@@ -4,5 +4,12 @@ from src.domain.events import Event
 
 
 class Subscriber(tp.Protocol):
+    # классы событий, которые обрабатывает подписчик, пустой кортеж - все события
+    handled_events: tuple[type[Event], ...] = ()
+
     async def process(self, message: Event) -> list[Event]:
         """Handle message from bus"""
+
+    async def close(self) -> None:
+        """Flush buffered data, called by bus on stop"""
+        return None
@@ -0,0 +1,112 @@
+import asyncio
+import typing as tp
+from contextlib import asynccontextmanager
+
+if tp.TYPE_CHECKING:
+    from src.domain.processors import AbstractAdapter
+
+
+class PollTallies:
+    """
+    Vote counts of polls, loaded from adapter on first request
+    and updated on every saved vote.
+    Vote is saved and recorded inside writing(), counts are read from
+    adapter only when no vote is between these two steps, so loaded
+    count neither misses nor doubles it.
+    """
+
+    def __init__(self, db_adapter: "AbstractAdapter") -> None:
+        self.db_adapter = db_adapter
+        # опрос: список (id варианта, имя варианта) в порядке вариантов
+        self.variants: dict[str, list[tuple[str, str]]] = {}
+        # вариант: количество голосов, только для загруженных опросов
+        self.counts: dict[str, int] = {}
+        self.loading: dict[str, asyncio.Task[None]] = {}
+        # голоса между сохранением и record_vote
+        self.writes = 0
+        self.no_writes = asyncio.Event()
+        self.no_writes.set()
+        # сброшен, пока счетчики читаются из хранилища
+        self.writes_allowed = asyncio.Event()
+        self.writes_allowed.set()
+        self.read_lock = asyncio.Lock()
+
+    @asynccontextmanager
+    async def writing(self) -> tp.AsyncIterator[None]:
+        """Save vote and call record_vote inside, waits for counts read"""
+        # событие могли снова сбросить, пока ожидание просыпалось
+        while not self.writes_allowed.is_set():
+            await self.writes_allowed.wait()
+        self.writes += 1
+        self.no_writes.clear()
+        try:
+            yield
+        finally:
+            self.writes -= 1
+            if self.writes == 0:
+                self.no_writes.set()
+
+    @asynccontextmanager
+    async def reading(self) -> tp.AsyncIterator[None]:
+        """Block new votes and wait for saved ones to be recorded"""
+        async with self.read_lock:
+            self.writes_allowed.clear()
+            try:
+                await self.no_writes.wait()
+                yield
+            finally:
+                self.writes_allowed.set()
+
+    def record_vote(self, variant_id: str) -> None:
+        """Count saved vote, votes of not loaded polls are counted on load"""
+        if variant_id in self.counts:
+            self.counts[variant_id] += 1
+
+    async def get_results(self, poll_id: str) -> dict[str, int]:
+        """Results as variant_name: votes, same as adapter get_poll_results"""
+        if poll_id not in self.variants:
+            await self.load(poll_id)
+        variants = self.variants.get(poll_id, [])
+        return {name: self.counts[v_id] for v_id, name in variants}
+
+    async def load(self, poll_id: str) -> None:
+        # один запрос к хранилищу на опрос, даже если результаты ждут многие
+        task = self.loading.get(poll_id)
+        if task is None:
+            task = asyncio.create_task(self.rebuild(poll_id))
+            self.loading[poll_id] = task
+            task.add_done_callback(lambda _: self.loading.pop(poll_id, None))
+        await asyncio.shield(task)
+
+    async def rebuild(self, poll_id: str) -> None:
+        """Recount poll votes from scratch"""
+        polls = await self.db_adapter.get_polls(polls_ids=[poll_id])
+        if not polls:
+            return
+        variants = [(v.variant_id, v.name) for v in polls[0].variants]
+        async with self.reading():
+            counts = await self.db_adapter.get_votes_count(poll_id=poll_id)
+            for variant_id, _ in variants:
+                self.counts[variant_id] = counts.get(variant_id, 0)
+            self.variants[poll_id] = variants
+
+    async def rebuild_all(self) -> None:
+        """Recount votes of all loaded polls"""
+        for poll_id in list(self.variants):
+            await self.rebuild(poll_id)
+
+    async def check_consistency(
+        self,
+    ) -> dict[str, tuple[dict[str, int], dict[str, int]]]:
+        """
+        Compare loaded tallies with adapter.
+        Return inconsistent polls as poll_id: (tally counts, adapter counts)
+        """
+        inconsistent: dict[str, tuple[dict[str, int], dict[str, int]]] = {}
+        for poll_id, variants in list(self.variants.items()):
+            counts = await self.db_adapter.get_votes_count(poll_id=poll_id)
+            tally = {v_id: self.counts[v_id] for v_id, _ in variants}
+            expected = {v_id: counts.get(v_id, 0) for v_id, _ in variants}
+            if tally != expected:
+                inconsistent[poll_id] = (tally, expected)
+        return inconsistent
@@ -0,0 +1,15 @@
+class DataVersion:
+    """
+    Counters of data changes, bumped by processors on every write.
+    Anything built from data stays valid while its counters are the same.
+    """
+
+    def __init__(self) -> None:
+        self.polls = 0
+        self.votes = 0
+
+    def bump_polls(self) -> None:
+        self.polls += 1
+
+    def bump_votes(self) -> None:
+        self.votes += 1
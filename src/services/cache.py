@@ -0,0 +1,180 @@
+import time
+import typing as tp
+from collections import OrderedDict
+
+from src.domain.models import PollSummary
+from src.domain.models import SimplePoll
+from src.domain.models import SimpleVote
+from src.domain.processors import AbstractAdapter
+
+K = tp.TypeVar("K")
+V = tp.TypeVar("V")
+
+
+class TTLCache(tp.Generic[K, V]):
+    """
+    LRU cache with limited size and time to live of entries
+    """
+
+    def __init__(self, max_size: int, ttl: float) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: K) -> V | None:
+        item = self.data.get(key)
+        if item is None or item[0] < time.monotonic():
+            if item is not None:
+                del self.data[key]
+            self.misses += 1
+            return None
+        self.data.move_to_end(key)
+        self.hits += 1
+        return item[1]
+
+    def set(self, key: K, value: V) -> None:
+        self.data[key] = (time.monotonic() + self.ttl, value)
+        self.data.move_to_end(key)
+        while len(self.data) > self.max_size:
+            self.data.popitem(last=False)
+
+    def invalidate(self, key: K) -> None:
+        self.data.pop(key, None)
+
+    def clear(self) -> None:
+        self.data.clear()
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+
+class CachedDbAdapter(AbstractAdapter):
+    """
+    Read-through cache of polls and polls ids for any adapter
+    """
+
+    def __init__(self, adapter: AbstractAdapter, max_size: int, ttl: float) -> None:
+        self.adapter = adapter
+        self.polls_cache: TTLCache[str, SimplePoll] = TTLCache(max_size, ttl)
+        self.ids_cache: TTLCache[None, list[str]] = TTLCache(1, ttl)
+        self.pages_cache: TTLCache[tuple[int, str], list[PollSummary]] = TTLCache(
+            max_size, ttl
+        )
+        # меняется при каждой записи, чтобы не класть в кэш прочитанное до нее
+        self.generation = 0
+
+    async def close(self) -> None:
+        await self.adapter.close()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "polls_hits": self.polls_cache.hits,
+            "polls_misses": self.polls_cache.misses,
+            "polls_size": len(self.polls_cache),
+            "ids_hits": self.ids_cache.hits,
+            "ids_misses": self.ids_cache.misses,
+            "pages_hits": self.pages_cache.hits,
+            "pages_misses": self.pages_cache.misses,
+        }
+
+    async def create_poll(
+        self,
+        creator_id: str,
+        name: str,
+        description: str,
+        is_open: bool,
+        variants: list[str],
+    ) -> SimplePoll:
+        poll = await self.adapter.create_poll(
+            creator_id=creator_id,
+            name=name,
+            description=description,
+            is_open=is_open,
+            variants=variants,
+        )
+        self.invalidate_polls([poll.poll_id])
+        return poll
+
+    def invalidate_polls(self, polls_ids: tp.Iterable[str]) -> None:
+        """Drop polls, ids and pages, polls were changed not through this cache"""
+        self.generation += 1
+        self.ids_cache.clear()
+        self.pages_cache.clear()
+        for poll_id in polls_ids:
+            self.polls_cache.invalidate(poll_id)
+
+    async def get_polls(self, polls_ids: list[str]) -> list[SimplePoll]:
+        cached: dict[str, SimplePoll] = {}
+        missed: list[str] = []
+        for poll_id in polls_ids:
+            poll = self.polls_cache.get(poll_id)
+            if poll is None:
+                missed.append(poll_id)
+            else:
+                cached[poll_id] = poll
+        if missed:
+            generation = self.generation
+            for poll in await self.adapter.get_polls(polls_ids=missed):
+                if generation == self.generation:
+                    self.polls_cache.set(poll.poll_id, poll)
+                cached[poll.poll_id] = poll
+        return [cached[poll_id] for poll_id in polls_ids if poll_id in cached]
+
+    async def get_polls_ids(self) -> list[str]:
+        ids = self.ids_cache.get(None)
+        if ids is None:
+            generation = self.generation
+            ids = await self.adapter.get_polls_ids()
+            if generation == self.generation:
+                self.ids_cache.set(None, ids)
+        return list(ids)
+
+    async def get_polls_page(self, limit: int, after: str = "") -> list[PollSummary]:
+        page = self.pages_cache.get((limit, after))
+        if page is None:
+            generation = self.generation
+            page = await self.adapter.get_polls_page(limit=limit, after=after)
+            if generation == self.generation:
+                self.pages_cache.set((limit, after), page)
+        return list(page)
+
+    async def create_vote_if_absent(self, user_id: str, variant_id: str) -> bool:
+        return await self.adapter.create_vote_if_absent(
+            user_id=user_id, variant_id=variant_id
+        )
+
+    async def create_votes(self, votes: list[SimpleVote]) -> list[bool]:
+        return await self.adapter.create_votes(votes)
+
+    async def get_poll_results(
+        self, poll_id: str, sender_user_id: str
+    ) -> dict[str, int]:
+        return await self.adapter.get_poll_results(
+            poll_id=poll_id, sender_user_id=sender_user_id
+        )
+
+    async def get_votes_count(self, poll_id: str) -> dict[str, int]:
+        return await self.adapter.get_votes_count(poll_id=poll_id)
+
+    async def get_poll_and_voted(
+        self, poll_id: str, user_id: str
+    ) -> tuple[SimplePoll, bool] | None:
+        # голос меняется постоянно, кэшируется только сам опрос
+        generation = self.generation
+        found = await self.adapter.get_poll_and_voted(poll_id=poll_id, user_id=user_id)
+        if found is not None and generation == self.generation:
+            self.polls_cache.set(poll_id, found[0])
+        return found
+
+    async def update_poll(self, poll_id: str, is_open: bool) -> bool:
+        result = await self.adapter.update_poll(poll_id=poll_id, is_open=is_open)
+        self.invalidate_polls([poll_id])
+        return result
+
+    async def has_user_voted(self, user_id: str, poll_id: str) -> bool:
+        return await self.adapter.has_user_voted(user_id=user_id, poll_id=poll_id)
+
+    async def has_variant(self, variant_id: str) -> bool:
+        return await self.adapter.has_variant(variant_id=variant_id)
@@ -0,0 +1,81 @@
+import asyncio
+import logging
+
+from src.domain.events import VoteSaved
+from src.domain.tallies import PollTallies
+from src.domain.versions import DataVersion
+from src.services.cache import CachedDbAdapter
+from src.services.message_bus import MessageBus
+from src.services.sqlite_adapter import Changes
+from src.services.sqlite_adapter import SqliteDbAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class ChangeSync:
+    """
+    Keeps state of worker process coherent with writes of other workers.
+    Changes are read from shared sqlite every interval seconds:
+    changed polls are dropped from cache, tallies of polls with new votes
+    are recounted, new votes are published as VoteSaved for live results.
+    """
+
+    def __init__(
+        self,
+        storage: SqliteDbAdapter,
+        bus: MessageBus,
+        tallies: PollTallies,
+        versions: DataVersion,
+        cache: CachedDbAdapter | None = None,
+        interval: float = 0.1,
+    ) -> None:
+        self.storage = storage
+        self.bus = bus
+        self.tallies = tallies
+        self.versions = versions
+        self.cache = cache
+        self.interval = interval
+        self.task: asyncio.Task[None] | None = None
+
+    async def start(self) -> None:
+        if self.task is not None:
+            return
+        # первое чтение только запоминает, докуда дошли другие процессы
+        await self.storage.get_changes()
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self.task is None:
+            return
+        self.task.cancel()
+        await asyncio.gather(self.task, return_exceptions=True)
+        self.task = None
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.sync()
+            except Exception:
+                logger.exception("Sync of changes from other workers failed")
+
+    async def sync(self) -> None:
+        """Read and apply changes once"""
+        changes = await self.storage.get_changes()
+        await self.apply(changes)
+
+    async def apply(self, changes: Changes) -> None:
+        if changes.polls_ids:
+            if self.cache is not None:
+                self.cache.invalidate_polls(changes.polls_ids)
+            self.versions.bump_polls()
+        if not changes.votes:
+            return
+        # пересчет вместо прибавления: загрузка опроса могла уже учесть голос
+        for poll_id in {poll_id for poll_id, _ in changes.votes}:
+            if poll_id in self.tallies.variants:
+                await self.tallies.rebuild(poll_id)
+        self.versions.bump_votes()
+        await self.bus.public_message(
+            [VoteSaved(vote=vote, saved=True) for _, vote in changes.votes]
+        )
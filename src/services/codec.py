@@ -0,0 +1,623 @@
+"""
+Compact binary encoding of domain events and models.
+
+Frame is format version byte, class tag and fields of the class in
+declaration order, each struct starts with its fields count. Layout is
+built once per class from type hints, writer and reader of current layout
+are compiled from it. New fields are only appended with default,
+reader fills fields missing in older data with defaults.
+"""
+import dataclasses
+import struct
+import types
+import typing as tp
+from operator import attrgetter
+
+from src.domain import events
+from src.domain import models
+
+FORMAT_VERSION = 1
+
+# номер класса на проводе - его позиция плюс один,
+# поэтому новые классы добавляются только в конец
+CLASSES: tuple[type, ...] = (
+    models.User,
+    models.BasePoll,
+    models.PollSummary,
+    models.SimpleVariant,
+    models.SimplePoll,
+    models.PollWithResults,
+    models.SimpleVote,
+    events.Event,
+    events.VoteEvent,
+    events.VoteSaved,
+    events.GetPollResult,
+    events.PollResult,
+    events.CreatePoll,
+    events.PollCreated,
+    events.GetPollIds,
+    events.GetPollsByIds,
+    events.PollsIds,
+    events.Polls,
+    events.GetPollsPage,
+    events.PollsPage,
+    events.GetPollView,
+    events.PollView,
+)
+TAGS: dict[type, int] = {cls: tag for tag, cls in enumerate(CLASSES, start=1)}
+
+# поля событий с uuid, пишутся 16 байтами
+ID_FIELDS = ("id_", "parent_id")
+
+DOUBLE = struct.Struct("<d")
+
+Writer = tp.Callable[[bytearray, tp.Any], None]
+Reader = tp.Callable[[memoryview, int], tuple[tp.Any, int]]
+Buffer = bytes | bytearray | memoryview
+
+
+class CodecError(Exception):
+    pass
+
+
+def write_uint(out: bytearray, value: int) -> None:
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_uint(view: memoryview, pos: int) -> tuple[int, int]:
+    byte = view[pos]
+    if byte < 0x80:
+        return byte, pos + 1
+    value = byte & 0x7F
+    shift = 7
+    while True:
+        pos += 1
+        byte = view[pos]
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos + 1
+        shift += 7
+
+
+def write_int(out: bytearray, value: int) -> None:
+    # zigzag: маленькие по модулю отрицательные тоже занимают один байт
+    write_uint(out, value << 1 if value >= 0 else (-value << 1) - 1)
+
+
+def read_int(view: memoryview, pos: int) -> tuple[int, int]:
+    value, pos = read_uint(view, pos)
+    return (value >> 1) ^ -(value & 1), pos
+
+
+def write_str(out: bytearray, value: str) -> None:
+    data = value.encode()
+    write_uint(out, len(data))
+    out += data
+
+
+def read_str(view: memoryview, pos: int) -> tuple[str, int]:
+    length = view[pos]
+    if length < 0x80:
+        pos += 1
+    else:
+        length, pos = read_uint(view, pos)
+    end = pos + length
+    return str(view[pos:end], "utf-8"), end
+
+
+def write_bool(out: bytearray, value: bool) -> None:
+    out.append(1 if value else 0)
+
+
+def read_bool(view: memoryview, pos: int) -> tuple[bool, int]:
+    return view[pos] != 0, pos + 1
+
+
+def write_float(out: bytearray, value: float) -> None:
+    out += DOUBLE.pack(value)
+
+
+def read_float(view: memoryview, pos: int) -> tuple[float, int]:
+    return DOUBLE.unpack_from(view, pos)[0], pos + DOUBLE.size
+
+
+def is_uuid(value: str) -> bool:
+    # остальное проверяет fromhex: лишний дефис или пробел дают не 16 байт
+    return (
+        len(value) == 36
+        and value[8] == value[13] == value[18] == value[23] == "-"
+        and value == value.lower()
+    )
+
+
+def write_id(out: bytearray, value: str) -> None:
+    # 0 - пустой id, 1 - uuid 16 байтами, 2 - произвольная строка
+    if not value:
+        out.append(0)
+        return
+    if is_uuid(value):
+        try:
+            data = bytes.fromhex(value.replace("-", ""))
+        except ValueError:
+            pass
+        else:
+            if len(data) == 16:
+                out.append(1)
+                out += data
+                return
+    out.append(2)
+    write_str(out, value)
+
+
+def read_id(view: memoryview, pos: int) -> tuple[str, int]:
+    kind = view[pos]
+    pos += 1
+    if kind == 0:
+        return "", pos
+    if kind == 1:
+        end = pos + 16
+        h = view[pos:end].hex()
+        return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}", end
+    if kind == 2:
+        return read_str(view, pos)
+    raise CodecError(f"Unknown id kind {kind}")
+
+
+def write_class(out: bytearray, value: type) -> None:
+    tag = TAGS.get(value)
+    if tag is None:
+        raise CodecError(f"Class {value.__name__} is not registered")
+    write_uint(out, tag)
+
+
+def read_class(view: memoryview, pos: int) -> tuple[type, int]:
+    tag, pos = read_uint(view, pos)
+    if not 0 < tag <= len(CLASSES):
+        raise CodecError(f"Unknown class tag {tag}")
+    return CLASSES[tag - 1], pos
+
+
+SCALARS: dict[tp.Any, tuple[Writer, Reader]] = {
+    str: (write_str, read_str),
+    int: (write_int, read_int),
+    bool: (write_bool, read_bool),
+    float: (write_float, read_float),
+    type: (write_class, read_class),
+}
+
+
+def sequence_codec(item: tuple[Writer, Reader], factory: type) -> tuple[Writer, Reader]:
+    write_item, read_item = item
+
+    def write(out: bytearray, value: tp.Any) -> None:
+        write_uint(out, len(value))
+        for element in value:
+            write_item(out, element)
+
+    def read(view: memoryview, pos: int) -> tuple[tp.Any, int]:
+        count, pos = read_uint(view, pos)
+        items = []
+        for _ in range(count):
+            element, pos = read_item(view, pos)
+            items.append(element)
+        return (items if factory is list else factory(items)), pos
+
+    return write, read
+
+
+def fixed_tuple_codec(items: list[tuple[Writer, Reader]]) -> tuple[Writer, Reader]:
+    writers = [write for write, _ in items]
+    readers = [read for _, read in items]
+
+    def write(out: bytearray, value: tp.Any) -> None:
+        if len(value) != len(writers):
+            raise CodecError(f"Expected tuple of {len(writers)} items")
+        for write_item, element in zip(writers, value):
+            write_item(out, element)
+
+    def read(view: memoryview, pos: int) -> tuple[tp.Any, int]:
+        elements = []
+        for read_item in readers:
+            element, pos = read_item(view, pos)
+            elements.append(element)
+        return tuple(elements), pos
+
+    return write, read
+
+
+def dict_codec(
+    key: tuple[Writer, Reader], value: tuple[Writer, Reader]
+) -> tuple[Writer, Reader]:
+    write_key, read_key = key
+    write_value, read_value = value
+
+    def write(out: bytearray, mapping: tp.Any) -> None:
+        write_uint(out, len(mapping))
+        for k, v in mapping.items():
+            write_key(out, k)
+            write_value(out, v)
+
+    def read(view: memoryview, pos: int) -> tuple[tp.Any, int]:
+        count, pos = read_uint(view, pos)
+        mapping = {}
+        for _ in range(count):
+            k, pos = read_key(view, pos)
+            v, pos = read_value(view, pos)
+            mapping[k] = v
+        return mapping, pos
+
+    return write, read
+
+
+def optional_codec(item: tuple[Writer, Reader]) -> tuple[Writer, Reader]:
+    write_item, read_item = item
+
+    def write(out: bytearray, value: tp.Any) -> None:
+        if value is None:
+            out.append(0)
+        else:
+            out.append(1)
+            write_item(out, value)
+
+    def read(view: memoryview, pos: int) -> tuple[tp.Any, int]:
+        if view[pos] == 0:
+            return None, pos + 1
+        return read_item(view, pos + 1)
+
+    return write, read
+
+
+class StructCodec:
+    """Fields of dataclass in declaration order, prefixed by their count"""
+
+    def __init__(self, cls: type) -> None:
+        self.cls = cls
+        fields = dataclasses.fields(cls)
+        hints = tp.get_type_hints(cls)
+        names = [field.name for field in fields]
+        self.get = attrgetter(*names)
+        self.writers: list[Writer] = []
+        self.readers: list[Reader] = []
+        # None - id события, он пишется не по типу поля
+        self.hints: list[tp.Any] = []
+        for field in fields:
+            write: Writer
+            read: Reader
+            if field.name in ID_FIELDS and issubclass(cls, events.Event):
+                write, read = write_id, read_id
+                self.hints.append(None)
+            else:
+                write, read = type_codec(hints[field.name])
+                self.hints.append(hints[field.name])
+            self.writers.append(write)
+            self.readers.append(read)
+        # дескрипторы слотов: поля задаются без __init__ и __post_init__,
+        # иначе событие получило бы новый id_
+        self.setters = [getattr(cls, name).__set__ for name in names]
+        self.defaults: list[tp.Callable[[], tp.Any] | None] = [
+            field_default(field) for field in fields
+        ]
+        self.names = names
+        self.read_current = self.compile_reader()
+        self.write = self.compile_writer()
+
+    def compile_writer(self) -> Writer:
+        """Writer of all fields in one function, scalar fields inline"""
+        namespace = writer_namespace()
+        lines = ["def write(out, value):"]
+        lines += indent(count_lines(len(self.names)))
+        for name, hint in zip(self.names, self.hints):
+            lines.append(f"    field_value = value.{name}")
+            if hint is None:
+                lines += indent(id_lines("field_value"))
+            else:
+                lines += indent(writer_lines(hint, "field_value", namespace, 0))
+        exec("\n".join(lines), namespace)
+        writer: Writer = namespace["write"]
+        return writer
+
+    def read(self, view: memoryview, pos: int) -> tuple[tp.Any, int]:
+        """Read data of any older schema, current one is read by compiled reader"""
+        count, pos = read_uint(view, pos)
+        if count > len(self.readers):
+            raise CodecError(
+                f"{self.cls.__name__} has {len(self.readers)} fields, got {count}"
+            )
+        value: tp.Any = object.__new__(self.cls)
+        for read, set_field in zip(self.readers[:count], self.setters):
+            field_value, pos = read(view, pos)
+            set_field(value, field_value)
+        for set_field, default in zip(self.setters[count:], self.defaults[count:]):
+            if default is None:
+                raise CodecError(f"Missing field of {self.cls.__name__}")
+            set_field(value, default())
+        return value, pos
+
+    def compile_reader(self) -> Reader:
+        """
+        Reader of current schema with string and bool fields read inline,
+        like dataclasses builds __init__. Bounds are checked once by caller.
+        """
+        lines = [
+            "def read(view, pos):",
+            f"    if view[pos] != {len(self.readers)}:",
+            "        return read_any_version(view, pos)",
+            "    pos += 1",
+            "    value = new(cls)",
+        ]
+        namespace: dict[str, tp.Any] = {
+            "read_any_version": self.read,
+            "new": object.__new__,
+            "cls": self.cls,
+            "read_uint": read_uint,
+        }
+        for n, (read, set_field) in enumerate(zip(self.readers, self.setters)):
+            namespace[f"read_{n}"] = read
+            namespace[f"set_{n}"] = set_field
+            if read is read_str:
+                lines += [
+                    "    length = view[pos]",
+                    "    if length < 0x80:",
+                    "        pos += 1",
+                    "    else:",
+                    "        length, pos = read_uint(view, pos)",
+                    "    end = pos + length",
+                    f"    set_{n}(value, str(view[pos:end], 'utf-8'))",
+                    "    pos = end",
+                ]
+            elif read is read_bool:
+                lines += [f"    set_{n}(value, view[pos] != 0)", "    pos += 1"]
+            else:
+                lines += [
+                    f"    field_value, pos = read_{n}(view, pos)",
+                    f"    set_{n}(value, field_value)",
+                ]
+        lines.append("    return value, pos")
+        exec("\n".join(lines), namespace)
+        reader: Reader = namespace["read"]
+        return reader
+
+
+def field_default(field: dataclasses.Field[tp.Any]) -> tp.Callable[[], tp.Any] | None:
+    if field.default is not dataclasses.MISSING:
+        default = field.default
+        return lambda: default
+    if field.default_factory is not dataclasses.MISSING:
+        return field.default_factory
+    return None
+
+
+STRUCTS: dict[type, StructCodec] = {}
+
+
+def type_codec(hint: tp.Any) -> tuple[Writer, Reader]:
+    """Writer and reader of values of type hint"""
+    if hint in SCALARS:
+        return SCALARS[hint]
+    if isinstance(hint, type) and dataclasses.is_dataclass(hint):
+        codec = STRUCTS.get(hint)
+        if codec is None:
+            codec = STRUCTS[hint] = StructCodec(hint)
+        return codec.write, codec.read_current
+    origin = tp.get_origin(hint)
+    args = tp.get_args(hint)
+    if origin is list:
+        return sequence_codec(type_codec(args[0]), list)
+    if origin is tuple and len(args) == 2 and args[1] is Ellipsis:
+        return sequence_codec(type_codec(args[0]), tuple)
+    if origin is tuple:
+        return fixed_tuple_codec([type_codec(arg) for arg in args])
+    if origin is dict:
+        return dict_codec(type_codec(args[0]), type_codec(args[1]))
+    if origin in (types.UnionType, tp.Union) and type(None) in args:
+        other = [arg for arg in args if arg is not type(None)]
+        if len(other) == 1:
+            return optional_codec(type_codec(other[0]))
+    raise TypeError(f"No binary codec for {hint}")
+
+
+def writer_namespace() -> dict[str, tp.Any]:
+    return {
+        "write_uint": write_uint,
+        "write_int": write_int,
+        "write_str": write_str,
+        "write_float": write_float,
+        "write_class": write_class,
+        "fromhex": bytes.fromhex,
+        "CodecError": CodecError,
+    }
+
+
+def indent(lines: list[str]) -> list[str]:
+    return ["    " + line for line in lines]
+
+
+def count_lines(count: int | str) -> list[str]:
+    # как write_uint, но длина меньше 0x80 пишется без вызова
+    return [
+        f"if {count} < 0x80:",
+        f"    out.append({count})",
+        "else:",
+        f"    write_uint(out, {count})",
+    ]
+
+
+def id_lines(value: str) -> list[str]:
+    # то же, что write_id
+    return [
+        f"if not {value}:",
+        "    out.append(0)",
+        f"elif (len({value}) == 36"
+        f" and {value}[8] == {value}[13] == {value}[18] == {value}[23] == '-'"
+        f" and {value} == {value}.lower()):",
+        "    try:",
+        f"        data = fromhex({value}.replace('-', ''))",
+        "    except ValueError:",
+        "        data = b''",
+        "    if len(data) == 16:",
+        "        out.append(1)",
+        "        out += data",
+        "    else:",
+        "        out.append(2)",
+        f"        write_str(out, {value})",
+        "else:",
+        "    out.append(2)",
+        f"    write_str(out, {value})",
+    ]
+
+
+def writer_lines(
+    hint: tp.Any, value: str, namespace: dict[str, tp.Any], depth: int
+) -> list[str]:
+    """Source lines writing variable value of type hint, same bytes as type_codec"""
+    if hint is str:
+        return [f"data = {value}.encode()", *count_lines("len(data)"), "out += data"]
+    if hint is bool:
+        return [f"out.append(1 if {value} else 0)"]
+    if hint is int:
+        return [
+            f"if 0 <= {value} < 0x40:",
+            f"    out.append({value} << 1)",
+            "else:",
+            f"    write_int(out, {value})",
+        ]
+    if hint is float:
+        return [f"write_float(out, {value})"]
+    if hint is type:
+        return [f"write_class(out, {value})"]
+    if isinstance(hint, type) and dataclasses.is_dataclass(hint):
+        name = f"write_{hint.__name__}"
+        namespace[name] = type_codec(hint)[0]
+        return [f"{name}(out, {value})"]
+    return generic_writer_lines(hint, value, namespace, depth)
+
+
+def generic_writer_lines(
+    hint: tp.Any, value: str, namespace: dict[str, tp.Any], depth: int
+) -> list[str]:
+    origin = tp.get_origin(hint)
+    args = tp.get_args(hint)
+    item = f"item_{depth}"
+    if origin is list or (origin is tuple and len(args) == 2 and args[1] is Ellipsis):
+        return [
+            *count_lines(f"len({value})"),
+            f"for {item} in {value}:",
+            *indent(writer_lines(args[0], item, namespace, depth + 1)),
+        ]
+    if origin is tuple:
+        items = [f"{item}_{n}" for n in range(len(args))]
+        lines = [
+            f"if len({value}) != {len(args)}:",
+            f"    raise CodecError('Expected tuple of {len(args)} items')",
+            f"{', '.join(items)}, = {value}",
+        ]
+        for arg, name in zip(args, items):
+            lines += writer_lines(arg, name, namespace, depth + 1)
+        return lines
+    if origin is dict:
+        key, element = f"key_{depth}", f"value_{depth}"
+        return [
+            *count_lines(f"len({value})"),
+            f"for {key}, {element} in {value}.items():",
+            *indent(writer_lines(args[0], key, namespace, depth + 1)),
+            *indent(writer_lines(args[1], element, namespace, depth + 1)),
+        ]
+    if origin in (types.UnionType, tp.Union) and type(None) in args:
+        other = [arg for arg in args if arg is not type(None)]
+        if len(other) == 1:
+            return [
+                f"if {value} is None:",
+                "    out.append(0)",
+                "else:",
+                "    out.append(1)",
+                *indent(writer_lines(other[0], value, namespace, depth)),
+            ]
+    raise TypeError(f"No binary codec for {hint}")
+
+
+def compile_writer(hint: tp.Any) -> Writer:
+    namespace = writer_namespace()
+    lines = ["def write(out, value):"]
+    lines += indent(writer_lines(hint, "value", namespace, 0))
+    exec("\n".join(lines), namespace)
+    writer: Writer = namespace["write"]
+    return writer
+
+
+class TypeCodec:
+    """Versioned encoding of plain values of type hint, like dict[str, int]"""
+
+    def __init__(self, hint: tp.Any) -> None:
+        self.read = type_codec(hint)[1]
+        self.write = compile_writer(hint)
+
+    def encode(self, value: tp.Any) -> bytes:
+        out = bytearray((FORMAT_VERSION,))
+        self.write(out, value)
+        return bytes(out)
+
+    def decode(self, data: Buffer) -> tp.Any:
+        view = memoryview(data)
+        try:
+            check_version(view)
+            value, pos = self.read(view, 1)
+        except (IndexError, ValueError, struct.error) as e:
+            raise CodecError(f"Damaged data: {e}") from e
+        if pos > len(view):
+            raise CodecError("Unexpected end of data")
+        if pos != len(view):
+            raise CodecError("Trailing bytes after value")
+        return value
+
+
+def check_version(view: memoryview, pos: int = 0) -> None:
+    if view[pos] != FORMAT_VERSION:
+        raise CodecError(f"Unsupported format version {view[pos]}")
+
+
+def encode(value: tp.Any) -> bytes:
+    """Frame of registered event or model"""
+    cls = value.__class__
+    codec = STRUCTS.get(cls)
+    if codec is None:
+        raise CodecError(f"Class {cls.__name__} is not registered")
+    out = bytearray(PREFIXES[cls])
+    codec.write(out, value)
+    return bytes(out)
+
+
+def decode_from(data: Buffer, pos: int = 0) -> tuple[tp.Any, int]:
+    """Read frame at pos without copying data, return value and end of frame"""
+    view = memoryview(data)
+    try:
+        check_version(view, pos)
+        cls, pos = read_class(view, pos + 1)
+        value, pos = STRUCTS[cls].read_current(view, pos)
+    except (IndexError, ValueError, struct.error) as e:
+        raise CodecError(f"Damaged data: {e}") from e
+    # строки читаются срезами без проверки границ, обрыв виден здесь
+    if pos > len(view):
+        raise CodecError("Unexpected end of data")
+    return value, pos
+
+
+def decode(data: Buffer) -> tp.Any:
+    value, pos = decode_from(data)
+    if pos != len(data):
+        raise CodecError("Trailing bytes after frame")
+    return value
+
+
+# схемы строятся при импорте, неподдержанный тип поля виден сразу
+for registered in CLASSES:
+    type_codec(registered)
+
+# версия формата и номер класса в начале каждого кадра
+PREFIXES: dict[type, bytes] = {}
+for registered, tag in TAGS.items():
+    prefix = bytearray((FORMAT_VERSION,))
+    write_uint(prefix, tag)
+    PREFIXES[registered] = bytes(prefix)
@@ -0,0 +1,163 @@
+from array import array
+
+from src.domain.models import SimpleVariant
+from src.domain.models import SimpleVote
+from src.services.db_adapter import IndexedDbAdapter
+
+try:
+    import numpy as np
+except ImportError:  # numpy не обязателен, без него пересчет идет в цикле
+    np = None
+
+# множитель для фибоначчиева хеширования 64-битных ключей
+HASH_MULTIPLIER = 11400714819323198485
+MASK_64 = (1 << 64) - 1
+
+
+class PackedIntSet:
+    """
+    Set of 64-bit ints in one array with open addressing,
+    8 bytes per slot instead of python int objects in set
+    """
+
+    def __init__(self, bits: int = 10) -> None:
+        self.bits = bits
+        self.table = array("Q", bytes(8 << bits))  # 0 - пустой слот
+        self.size = 0
+
+    def _slot(self, stored: int) -> int:
+        return ((stored * HASH_MULTIPLIER) & MASK_64) >> (64 - self.bits)
+
+    def __contains__(self, key: int) -> bool:
+        stored = key + 1
+        mask = (1 << self.bits) - 1
+        slot = self._slot(stored)
+        while True:
+            value = self.table[slot]
+            if value == stored:
+                return True
+            if value == 0:
+                return False
+            slot = (slot + 1) & mask
+
+    def add(self, key: int) -> bool:
+        """Add key, return False if it was in set already"""
+        if (self.size + 1) * 2 > len(self.table):
+            self._grow()
+        stored = key + 1
+        mask = (1 << self.bits) - 1
+        slot = self._slot(stored)
+        while True:
+            value = self.table[slot]
+            if value == stored:
+                return False
+            if value == 0:
+                self.table[slot] = stored
+                self.size += 1
+                return True
+            slot = (slot + 1) & mask
+
+    def _grow(self) -> None:
+        old_table = self.table
+        self.bits += 1
+        self.table = array("Q", bytes(8 << self.bits))
+        self.size = 0
+        for stored in old_table:
+            if stored:
+                self.add(stored - 1)
+
+    def __len__(self) -> int:
+        return self.size
+
+
+class ColumnarDbAdapter(IndexedDbAdapter):
+    """
+    In-memory adapter keeping votes in array columns.
+    User and variant ids are interned to ints, vote takes
+    two 4-byte cells plus 8-16 bytes in voted index.
+    """
+
+    def __init__(self, initial: bool = False) -> None:
+        self.user_index: dict[str, int] = {}
+        self.variant_index: dict[str, int] = {}
+        self.poll_index: dict[str, int] = {}
+        self.vote_users = array("I")
+        self.vote_variants = array("I")
+        self.variant_counts = array("Q")
+        self.voted_index = PackedIntSet()
+        super().__init__(initial=initial)
+
+    def _intern_variant(self, variant_id: str) -> int:
+        index = self.variant_index.get(variant_id)
+        if index is None:
+            index = len(self.variant_counts)
+            self.variant_index[variant_id] = index
+            self.variant_counts.append(0)
+        return index
+
+    def _add_variant(self, variant: SimpleVariant) -> None:
+        self.variants[variant.variant_id] = variant
+        self._intern_variant(variant.variant_id)
+        self.poll_index.setdefault(variant.poll_id, len(self.poll_index))
+
+    async def create_vote_if_absent(self, user_id: str, variant_id: str) -> bool:
+        known_variant = self.variants.get(variant_id)
+        if known_variant is None:
+            return False
+        user = self.user_index.setdefault(user_id, len(self.user_index))
+        poll = self.poll_index[known_variant.poll_id]
+        if not self.voted_index.add(user << 32 | poll):
+            return False
+        variant = self.variant_index[variant_id]
+        self.votes_count += 1
+        self.vote_users.append(user)
+        self.vote_variants.append(variant)
+        self.variant_counts[variant] += 1
+        return True
+
+    async def create_votes(self, votes: list[SimpleVote]) -> list[bool]:
+        return [
+            await self.create_vote_if_absent(
+                user_id=vote.user_id, variant_id=vote.variant_id
+            )
+            for vote in votes
+        ]
+
+    async def get_poll_results(
+        self, poll_id: str, sender_user_id: str
+    ) -> dict[str, int]:
+        res: dict[str, int] = {}
+        if poll_id not in self.polls:
+            return res
+        for v in self.polls[poll_id].variants:
+            res[v.name] = self.variant_counts[self.variant_index[v.variant_id]]
+        return res
+
+    async def get_votes_count(self, poll_id: str) -> dict[str, int]:
+        if poll_id not in self.polls:
+            return {}
+        return {
+            v.variant_id: self.variant_counts[self.variant_index[v.variant_id]]
+            for v in self.polls[poll_id].variants
+        }
+
+    async def has_user_voted(self, user_id: str, poll_id: str) -> bool:
+        user = self.user_index.get(user_id)
+        poll = self.poll_index.get(poll_id)
+        if user is None or poll is None:
+            return False
+        return (user << 32 | poll) in self.voted_index
+
+    def recount_votes(self) -> None:
+        """Recount votes of all variants from vote columns"""
+        if np is not None:
+            counts = np.bincount(
+                np.frombuffer(self.vote_variants, dtype=np.uint32),
+                minlength=len(self.variant_counts),
+            )
+            self.variant_counts = array("Q", counts.astype(np.uint64).tobytes())
+            return
+        variant_counts = array("Q", bytes(8 * len(self.variant_counts)))
+        for variant in self.vote_variants:
+            variant_counts[variant] += 1
+        self.variant_counts = variant_counts
@@ -1,16 +1,32 @@
-import copy
+import typing as tp
+from dataclasses import replace
 
+from src.domain.models import PollSummary
 from src.domain.models import SimplePoll
 from src.domain.models import SimpleVariant
 from src.domain.models import SimpleVote
 from src.domain.processors import AbstractAdapter
 
 
+def poll_summary(poll: SimplePoll) -> PollSummary:
+    return PollSummary(
+        poll_id=poll.poll_id,
+        name=poll.name,
+        description=poll.description,
+        is_open=poll.is_open,
+    )
+
+
 class FakeDbAdapter(AbstractAdapter):
     def __init__(self, initial: bool = False) -> None:
         self.polls: dict[str, SimplePoll] = {}
         self.votes: dict[str, SimpleVote] = {}
         self.variants: dict[str, SimpleVariant] = {}
+        # кто уже голосовал: (user_id, poll_id)
+        self.voted: set[tuple[str, str]] = set()
+        # позиции опросов, чтобы страница не искала курсор перебором
+        self.poll_order: list[str] = []
+        self.poll_positions: dict[str, int] = {}
         if initial:
             self.variants = {
                 "1": SimpleVariant(name="Да", poll_id="1", variant_id="1"),
@@ -26,10 +42,7 @@ class FakeDbAdapter(AbstractAdapter):
                     poll_id="1",
                     is_open=True,
                     name="Первый опрос",
-                    variants=[
-                        SimpleVariant(name="Да", poll_id="1", variant_id="1"),
-                        SimpleVariant(name="Нет", poll_id="1", variant_id="2"),
-                    ],
+                    variants=(self.variants["1"], self.variants["2"]),
                 ),
                 "2": SimplePoll(
                     creator_id="1",
@@ -37,13 +50,17 @@ class FakeDbAdapter(AbstractAdapter):
                     poll_id="2",
                     is_open=True,
                     name="Второй опрос",
-                    variants=[
-                        SimpleVariant(name="Да", poll_id="2", variant_id="3"),
-                        SimpleVariant(name="Нет", poll_id="2", variant_id="4"),
-                        SimpleVariant(name="Не знаю", poll_id="2", variant_id="5"),
-                    ],
+                    variants=(
+                        self.variants["3"],
+                        self.variants["4"],
+                        self.variants["5"],
+                    ),
                 ),
             }
+            self.poll_order = list(self.polls)
+            self.poll_positions = {
+                poll_id: position for position, poll_id in enumerate(self.poll_order)
+            }
 
     async def create_poll(
         self,
@@ -53,51 +70,70 @@ class FakeDbAdapter(AbstractAdapter):
         is_open: bool,
         variants: list[str],
     ) -> SimplePoll:
-        # create poll
         new_poll_id = f"{len(self.polls) + 1}"
-        new_poll = SimplePoll(
-            poll_id=new_poll_id,
-            creator_id=creator_id,
-            name=name,
-            description=description,
-            is_open=is_open,
-            variants=[],
-        )
-        self.polls[new_poll_id] = new_poll
 
         # create variants
+        new_variants: list[SimpleVariant] = []
         for var in variants:
             new_variant_id = f"{len(self.variants) + 1}"
             new_variant = SimpleVariant(
                 variant_id=new_variant_id, name=var, poll_id=new_poll_id
             )
             self.variants[new_variant_id] = new_variant
-            new_poll.variants.append(new_variant)
+            new_variants.append(new_variant)
+
+        # create poll
+        new_poll = SimplePoll(
+            poll_id=new_poll_id,
+            creator_id=creator_id,
+            name=name,
+            description=description,
+            is_open=is_open,
+            variants=tuple(new_variants),
+        )
+        self.polls[new_poll_id] = new_poll
+        self.poll_positions[new_poll_id] = len(self.poll_order)
+        self.poll_order.append(new_poll_id)
 
         return new_poll
 
     async def get_polls_ids(self) -> list[str]:
         return list(self.polls.keys())
 
+    async def get_polls_page(self, limit: int, after: str = "") -> list[PollSummary]:
+        start = 0
+        if after:
+            if after not in self.poll_positions:
+                return []
+            start = self.poll_positions[after] + 1
+        end = start + limit
+        return [
+            poll_summary(self.polls[poll_id]) for poll_id in self.poll_order[start:end]
+        ]
+
     async def get_polls(self, polls_ids: list[str]) -> list[SimplePoll]:
-        result: list[SimplePoll] = []
-        for poll_id in polls_ids:
-            current_poll = copy.deepcopy(self.polls.get(poll_id))
-            if not current_poll:
-                continue
-            current_poll.variants = []
-            for i in self.variants.values():
-                if i.poll_id == poll_id:
-                    current_poll.variants.append(i)
-            result.append(current_poll)
-        return result
-
-    async def create_vote(self, user_id: str, variant_id: str) -> bool:
+        # опросы неизменяемые, отдаются без копирования
+        return [self.polls[poll_id] for poll_id in polls_ids if poll_id in self.polls]
+
+    async def create_vote_if_absent(self, user_id: str, variant_id: str) -> bool:
+        # между проверкой и записью нет await, поэтому гонки нет
+        variant = self.variants.get(variant_id)
+        if variant is None or (user_id, variant.poll_id) in self.voted:
+            return False
+        self.voted.add((user_id, variant.poll_id))
         new_vote_id = f"{len(self.votes) + 1}"
         new_vote = SimpleVote(user_id=user_id, variant_id=variant_id)
         self.votes[new_vote_id] = new_vote
         return True
 
+    async def create_votes(self, votes: list[SimpleVote]) -> list[bool]:
+        return [
+            await self.create_vote_if_absent(
+                user_id=vote.user_id, variant_id=vote.variant_id
+            )
+            for vote in votes
+        ]
+
     async def get_poll_results(
         self, poll_id: str, sender_user_id: str
     ) -> dict[str, int]:
@@ -112,15 +148,162 @@ class FakeDbAdapter(AbstractAdapter):
                     res[v.name] += 1
         return res
 
+    async def get_votes_count(self, poll_id: str) -> dict[str, int]:
+        res: dict[str, int] = {
+            v.variant_id: 0 for v in self.variants.values() if v.poll_id == poll_id
+        }
+        for vote in self.votes.values():
+            if vote.variant_id in res:
+                res[vote.variant_id] += 1
+        return res
+
     async def update_poll(self, poll_id: str, is_open: bool) -> bool:
-        self.polls[poll_id].is_open = is_open
+        self.polls[poll_id] = replace(self.polls[poll_id], is_open=is_open)
         return True
 
     async def has_user_voted(self, user_id: str, poll_id: str) -> bool:
-        for vote in self.votes.values():
-            target_variant = self.variants.get(vote.variant_id)
-            if not isinstance(target_variant, SimpleVariant):
-                continue
-            if target_variant.poll_id == poll_id and vote.user_id == user_id:
-                return True
-        return False
+        return (user_id, poll_id) in self.voted
+
+    async def has_variant(self, variant_id: str) -> bool:
+        return variant_id in self.variants
+
+
+class IndexedDbAdapter(AbstractAdapter):
+    """
+    In-memory adapter with indexes, same outputs as FakeDbAdapter
+    """
+
+    def __init__(self, initial: bool = False) -> None:
+        self.polls: dict[str, SimplePoll] = {}
+        self.variants: dict[str, SimpleVariant] = {}
+        self.votes_count = 0
+        # индексы: счетчики голосов, кто уже голосовал
+        self.variant_votes: dict[str, int] = {}
+        self.voted: set[tuple[str, str]] = set()
+        # порядок опросов для постраничного вывода
+        self.poll_order: list[str] = []
+        self.poll_positions: dict[str, int] = {}
+        if initial:
+            seed = FakeDbAdapter(initial=True)
+            for poll in seed.polls.values():
+                for variant in poll.variants:
+                    self._add_variant(variant)
+                self._add_poll(poll)
+
+    def _add_poll(self, poll: SimplePoll) -> None:
+        self.polls[poll.poll_id] = poll
+        self.poll_positions[poll.poll_id] = len(self.poll_order)
+        self.poll_order.append(poll.poll_id)
+
+    def _add_variant(self, variant: SimpleVariant) -> None:
+        self.variants[variant.variant_id] = variant
+        self.variant_votes.setdefault(variant.variant_id, 0)
+
+    def restore_poll(self, poll: SimplePoll) -> None:
+        """Add poll with its own ids when state is restored, known poll is kept"""
+        if poll.poll_id in self.polls:
+            return
+        for variant in poll.variants:
+            self._add_variant(variant)
+        self._add_poll(poll)
+
+    def restore_votes(
+        self, variant_votes: dict[str, int], voted: tp.Iterable[tuple[str, str]]
+    ) -> None:
+        """Add vote counts and voters when state is restored"""
+        for variant_id, count in variant_votes.items():
+            self.variant_votes[variant_id] = (
+                self.variant_votes.get(variant_id, 0) + count
+            )
+            self.votes_count += count
+        self.voted.update(voted)
+
+    async def create_poll(
+        self,
+        creator_id: str,
+        name: str,
+        description: str,
+        is_open: bool,
+        variants: list[str],
+    ) -> SimplePoll:
+        new_poll_id = f"{len(self.polls) + 1}"
+        new_variants: list[SimpleVariant] = []
+        for var in variants:
+            new_variant = SimpleVariant(
+                variant_id=f"{len(self.variants) + 1}", name=var, poll_id=new_poll_id
+            )
+            self._add_variant(new_variant)
+            new_variants.append(new_variant)
+
+        new_poll = SimplePoll(
+            poll_id=new_poll_id,
+            creator_id=creator_id,
+            name=name,
+            description=description,
+            is_open=is_open,
+            variants=tuple(new_variants),
+        )
+        self._add_poll(new_poll)
+        return new_poll
+
+    async def get_polls_ids(self) -> list[str]:
+        return list(self.polls.keys())
+
+    async def get_polls_page(self, limit: int, after: str = "") -> list[PollSummary]:
+        start = 0
+        if after:
+            if after not in self.poll_positions:
+                return []
+            start = self.poll_positions[after] + 1
+        end = start + limit
+        return [
+            poll_summary(self.polls[poll_id]) for poll_id in self.poll_order[start:end]
+        ]
+
+    async def get_polls(self, polls_ids: list[str]) -> list[SimplePoll]:
+        return [self.polls[poll_id] for poll_id in polls_ids if poll_id in self.polls]
+
+    async def create_vote_if_absent(self, user_id: str, variant_id: str) -> bool:
+        variant = self.variants.get(variant_id)
+        if variant is None or (user_id, variant.poll_id) in self.voted:
+            return False
+        self.voted.add((user_id, variant.poll_id))
+        self.votes_count += 1
+        self.variant_votes[variant_id] += 1
+        return True
+
+    async def create_votes(self, votes: list[SimpleVote]) -> list[bool]:
+        return [
+            await self.create_vote_if_absent(
+                user_id=vote.user_id, variant_id=vote.variant_id
+            )
+            for vote in votes
+        ]
+
+    async def get_poll_results(
+        self, poll_id: str, sender_user_id: str
+    ) -> dict[str, int]:
+        res: dict[str, int] = {}
+        if poll_id not in self.polls:
+            return res
+        for v in self.polls[poll_id].variants:
+            res[v.name] = self.variant_votes.get(v.variant_id, 0)
+        return res
+
+    async def get_votes_count(self, poll_id: str) -> dict[str, int]:
+        if poll_id not in self.polls:
+            return {}
+        return {
+            v.variant_id: self.variant_votes.get(v.variant_id, 0)
+            for v in self.polls[poll_id].variants
+        }
+
+    async def update_poll(self, poll_id: str, is_open: bool) -> bool:
+        self.polls[poll_id] = replace(self.polls[poll_id], is_open=is_open)
+        return True
+
+    async def has_user_voted(self, user_id: str, poll_id: str) -> bool:
+        return (user_id, poll_id) in self.voted
+
+    async def has_variant(self, variant_id: str) -> bool:
+        return variant_id in self.variants
@@ -0,0 +1,296 @@
+import asyncio
+import logging
+import os
+import struct
+import typing as tp
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from src.domain.models import SimplePoll
+from src.domain.models import SimpleVote
+from src.services import codec
+from src.services.db_adapter import IndexedDbAdapter
+
+logger = logging.getLogger(__name__)
+
+# длина и crc32 полезной нагрузки перед каждой записью
+HEADER = struct.Struct("<II")
+
+# первый байт нагрузки - вид записи
+POLL = 1
+VOTE = 2
+COUNTS = 3  # снимок: голоса по вариантам
+VOTERS = 4  # снимок: кто в каком опросе голосовал
+
+SNAPSHOT_CHUNK = 10000
+
+# опросы и голоса пишутся как модели, части снимка - как значения
+COUNTS_CODEC = codec.TypeCodec(dict[str, int])
+VOTERS_CODEC = codec.TypeCodec(list[tuple[str, str]])
+
+Record = tuple[int, tp.Any]
+
+
+class JournalCorrupted(Exception):
+    pass
+
+
+def encode_record(kind: int, body: tp.Any) -> bytes:
+    if kind == COUNTS:
+        data = COUNTS_CODEC.encode(body)
+    elif kind == VOTERS:
+        data = VOTERS_CODEC.encode(body)
+    else:
+        data = codec.encode(body)
+    payload = bytes((kind,)) + data
+    return HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def decode_body(kind: int, data: memoryview) -> tp.Any:
+    if kind == COUNTS:
+        return COUNTS_CODEC.decode(data)
+    if kind == VOTERS:
+        return VOTERS_CODEC.decode(data)
+    return codec.decode(data)
+
+
+def decode_records(data: bytes) -> tuple[list[Record], int]:
+    """
+    Records of data and length of their valid prefix.
+    Reading stops at first short or damaged record.
+    """
+    records: list[Record] = []
+    view = memoryview(data)
+    offset = 0
+    while offset + HEADER.size <= len(view):
+        length, crc = HEADER.unpack_from(view, offset)
+        start = offset + HEADER.size
+        end = start + length
+        payload = view[start:end]
+        if length == 0 or len(payload) < length or zlib.crc32(payload) != crc:
+            break
+        records.append((payload[0], decode_body(payload[0], payload[1:])))
+        offset = end
+    return records, offset
+
+
+class EventJournal:
+    """
+    Append-only journal of created polls and saved votes, savers log
+    changes before answering. Records are written by fsync_interval batches
+    to numbered segments, each snapshot_every records state of adapter
+    is written as snapshot and segments covered by it are removed.
+    replay restores adapter from latest snapshot and segments after it,
+    call it before bus start.
+    """
+
+    def __init__(
+        self,
+        db_adapter: IndexedDbAdapter,
+        directory: str,
+        fsync_interval: float = 0.01,
+        snapshot_every: int = 100000,
+    ) -> None:
+        self.storage = db_adapter
+        self.directory = Path(directory)
+        self.fsync_interval = fsync_interval
+        self.snapshot_every = snapshot_every
+        self.segment = 0
+        self.fd: int | None = None
+        self.buffer = bytearray()
+        self.batch_done: asyncio.Future[None] | None = None
+        self.flush_timer: asyncio.Task[None] | None = None
+        self.records_since_snapshot = 0
+        self.snapshot_task: asyncio.Task[None] | None = None
+        # один поток: записи, fsync и смена сегмента идут по порядку
+        self.executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="edec-journal"
+        )
+
+    def segment_path(self, number: int) -> Path:
+        return self.directory / f"journal-{number:08d}.log"
+
+    def snapshot_path(self, number: int) -> Path:
+        return self.directory / f"snapshot-{number:08d}.bin"
+
+    def numbers(self, prefix: str) -> list[int]:
+        return sorted(
+            int(path.stem.split("-", 1)[1])
+            for path in self.directory.glob(f"{prefix}-*.*")
+            if not path.name.endswith(".tmp")
+        )
+
+    async def replay(self) -> int:
+        """Restore adapter from snapshot and journal, return records count"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        covered = 0
+        count = 0
+        snapshots = self.numbers("snapshot")
+        if snapshots:
+            covered = snapshots[-1]
+            data = self.snapshot_path(covered).read_bytes()
+            records, valid = decode_records(data)
+            if valid != len(data):
+                raise JournalCorrupted(f"Damaged snapshot {covered}")
+            count += await self.apply(records)
+        segments = [number for number in self.numbers("journal") if number > covered]
+        for number in segments:
+            path = self.segment_path(number)
+            data = path.read_bytes()
+            records, valid = decode_records(data)
+            if valid != len(data):
+                if number != segments[-1]:
+                    raise JournalCorrupted(f"Damaged journal segment {number}")
+                # хвост последней записи не дописан до сбоя, он не подтвержден
+                logger.warning(f"Cut {len(data) - valid} bytes of torn journal tail")
+                with open(path, "r+b") as file:
+                    file.truncate(valid)
+            count += await self.apply(records)
+        # после рестарта запись всегда идет в новый сегмент
+        self.segment = max([covered, *segments]) + 1
+        self.fd = self.open_segment(self.segment)
+        return count
+
+    async def apply(self, records: list[Record]) -> int:
+        for kind, body in records:
+            if kind == POLL:
+                self.storage.restore_poll(body)
+            elif kind == VOTE:
+                # повтор голоса отбрасывается, как при первой записи
+                await self.storage.create_vote_if_absent(body.user_id, body.variant_id)
+            elif kind == COUNTS:
+                self.storage.restore_votes(body, ())
+            elif kind == VOTERS:
+                self.storage.restore_votes({}, body)
+        return len(records)
+
+    async def log_poll(self, poll: SimplePoll) -> None:
+        await self.append(encode_record(POLL, poll))
+
+    async def log_vote(self, vote: SimpleVote) -> None:
+        await self.append(encode_record(VOTE, vote))
+
+    async def append(self, record: bytes) -> None:
+        """Wait until record is written and synced with its batch"""
+        if self.fd is None:
+            raise RuntimeError("Journal is not replayed")
+        self.buffer += record
+        if self.batch_done is None:
+            self.batch_done = asyncio.get_running_loop().create_future()
+            self.flush_timer = asyncio.create_task(self.flush_later())
+        batch_done = self.batch_done
+        self.records_since_snapshot += 1
+        if (
+            self.records_since_snapshot >= self.snapshot_every
+            and self.snapshot_task is None
+        ):
+            self.records_since_snapshot = 0
+            self.snapshot_task = asyncio.create_task(self.snapshot())
+        await asyncio.shield(batch_done)
+
+    async def flush_later(self) -> None:
+        await asyncio.sleep(self.fsync_interval)
+        self.flush_timer = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        data, self.buffer = bytes(self.buffer), bytearray()
+        batch_done, self.batch_done = self.batch_done, None
+        if batch_done is None:
+            return
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                self.executor, self._write, data
+            )
+        except Exception as e:
+            batch_done.set_exception(e)
+            # исключение получат ожидающие записи, если они есть
+            batch_done.exception()
+            return
+        batch_done.set_result(None)
+
+    def open_segment(self, number: int) -> int:
+        flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT
+        return os.open(self.segment_path(number), flags, 0o644)
+
+    def _write(self, data: bytes) -> None:
+        assert self.fd is not None
+        view = memoryview(data)
+        while view:
+            written = os.write(self.fd, view)
+            view = view[written:]
+        os.fsync(self.fd)
+
+    def _rotate(self, number: int) -> None:
+        if self.fd is not None:
+            os.close(self.fd)
+        self.fd = self.open_segment(number)
+
+    async def snapshot(self) -> None:
+        """Write state of adapter and drop journal segments covered by it"""
+        loop = asyncio.get_running_loop()
+        try:
+            if self.flush_timer is not None:
+                self.flush_timer.cancel()
+                self.flush_timer = None
+            await self.flush()
+            # записи после этой точки идут в следующий сегмент
+            covered = self.segment
+            self.segment += 1
+            await loop.run_in_executor(self.executor, self._rotate, self.segment)
+            # копия в цикле событий, пока состояние не меняется;
+            # голоса, попавшие и в снимок, и в новый сегмент, не задвоятся
+            polls = list(self.storage.polls.values())
+            variant_votes = dict(self.storage.variant_votes)
+            voted = list(self.storage.voted)
+            await loop.run_in_executor(
+                None, self._write_snapshot, covered, polls, variant_votes, voted
+            )
+        except Exception:
+            logger.exception("Journal snapshot failed")
+        finally:
+            self.snapshot_task = None
+
+    def _write_snapshot(
+        self,
+        covered: int,
+        polls: list[SimplePoll],
+        variant_votes: dict[str, int],
+        voted: list[tuple[str, str]],
+    ) -> None:
+        path = self.snapshot_path(covered)
+        temp = path.with_suffix(".tmp")
+        with open(temp, "wb") as file:
+            for poll in polls:
+                file.write(encode_record(POLL, poll))
+            file.write(encode_record(COUNTS, variant_votes))
+            for start in range(0, len(voted), SNAPSHOT_CHUNK):
+                end = start + SNAPSHOT_CHUNK
+                file.write(encode_record(VOTERS, voted[start:end]))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp, path)
+        directory = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+        for number in self.numbers("journal"):
+            if number <= covered:
+                self.segment_path(number).unlink()
+        for number in self.numbers("snapshot"):
+            if number < covered:
+                self.snapshot_path(number).unlink()
+
+    async def close(self) -> None:
+        if self.snapshot_task is not None:
+            await self.snapshot_task
+        if self.flush_timer is not None:
+            self.flush_timer.cancel()
+            self.flush_timer = None
+        await self.flush()
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+        self.executor.shutdown()
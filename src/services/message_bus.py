@@ -1,15 +1,105 @@
+import asyncio
+import logging
+import time
+import typing as tp
 from abc import ABC
 from abc import abstractmethod
+from collections import deque
+from dataclasses import dataclass
+from dataclasses import field
 
 from src.domain.events import Event
 from src.domain.subscriber import Subscriber
 
+logger = logging.getLogger(__name__)
+
+
+class NoResponseError(Exception):
+    """Cascade of request is handled, but expected event was not published"""
+
+
+class BusOverloadedError(Exception):
+    """Bus queue is full, message is not accepted"""
+
+
+@dataclass(slots=True)
+class Cascade:
+    """Events handled after one published message, root level is 1"""
+
+    root: Event
+    started: float
+    elapsed: float = 0.0
+    size: int = 0
+    depth: int = 0
+    fan_out: int = 0
+    # уровень событий, которые еще в очереди
+    levels: dict[str, int] = field(default_factory=dict)
+
+    def add(self, message: Event, events: list[Event]) -> None:
+        level = self.levels.pop(message.id_, 1)
+        self.size += 1
+        self.depth = max(self.depth, level)
+        self.fan_out = max(self.fan_out, len(events))
+        for event in events:
+            self.levels[event.id_] = level + 1
+
+
+class BusObserver:
+    """
+    Hooks called by bus for metrics and tracing, default hooks do nothing.
+    Start and end hooks of one call run in the same task.
+    Times are from time.perf_counter, hooks must not block.
+    """
+
+    def on_process_start(self, subscriber: Subscriber, message: Event) -> None:
+        """Subscriber starts handling message"""
+
+    def on_process(
+        self,
+        subscriber: Subscriber,
+        message: Event,
+        started: float,
+        elapsed: float,
+        error: BaseException | None,
+    ) -> None:
+        """Subscriber handled message"""
+
+    def on_dispatch_start(self, message: Event) -> None:
+        """Subscribers of message start handling it"""
+
+    def on_dispatch(
+        self, message: Event, started: float, elapsed: float, events: list[Event]
+    ) -> None:
+        """All subscribers of message handled it and produced events"""
+
+    def on_dispatch_error(
+        self, message: Event, started: float, elapsed: float, error: BaseException
+    ) -> None:
+        """Subscriber of message failed, events of message are lost"""
+
+    def on_drop(self, events: list[Event]) -> None:
+        """Cascade failed, its queued events will not be handled"""
+
+    def on_cascade(self, cascade: Cascade) -> None:
+        """Cascade of published message is handled"""
+
+    def on_stop(self) -> None:
+        """Bus is stopped, flush buffered data"""
+
 
 class MessageBus(ABC):
     @abstractmethod
     def __init__(self) -> None:
         """Initialize of bus"""
 
+    @abstractmethod
+    async def start(self) -> None:
+        """Start bus before publishing"""
+
+    @abstractmethod
+    async def stop(self) -> None:
+        """Handle all accepted messages and stop bus"""
+
     @abstractmethod
     def register(self, subscriber: Subscriber) -> None:
         """Register subscriber in bus"""
@@ -22,47 +112,425 @@ class MessageBus(ABC):
     async def public_message(self, message: Event | list[Event]) -> None | Event:
         """Public message in bus for all subscribers"""
 
+    @abstractmethod
+    async def request(
+        self,
+        message: Event,
+        expect: list[type[Event]],
+        timeout: float | None = None,
+        write: bool = False,
+    ) -> Event:
+        """
+        Public message and return first child event of expected class.
+        write marks message changing data, like vote, bus may handle it
+        apart from read requests.
+        """
+
+    @abstractmethod
+    def add_observer(self, observer: BusObserver) -> None:
+        """Call hooks of observer on handling of messages"""
+
+    @abstractmethod
+    def queue_sizes(self) -> dict[str, int]:
+        """Messages and cascades waiting or in progress by queue name"""
+
 
 class ConcreteMessageBus(MessageBus):
-    def __init__(self) -> None:
-        """Initialize of bus"""
+    def __init__(
+        self,
+        concurrent: bool = False,
+        isolate_errors: bool = False,
+        early_return: bool = False,
+        max_background_tasks: int = 1000,
+    ) -> None:
+        """
+        Initialize of bus.
+        concurrent - run subscribers of one event at the same time,
+        child events are queued in subscribers registration order anyway.
+        isolate_errors - log subscriber exception and go on instead of raising.
+        early_return - return tracked event as soon as it is produced,
+        rest of cascade is handled in background task.
+        max_background_tasks - limit of background cascades, public_message
+        waits for free slot when limit is reached.
+        """
         self.services: list[Subscriber] = []
+        self.routes: dict[type[Event], list[Subscriber]] = {}
+        self.concurrent = concurrent
+        self.isolate_errors = isolate_errors
+        self.early_return = early_return
+        self.background_limit = asyncio.Semaphore(max_background_tasks)
+        self.background_tasks: set[asyncio.Task[None]] = set()
+        # ожидающие ответа запросы по id корневого события
+        self.waiters: dict[
+            str, tuple[tuple[type[Event], ...], asyncio.Future[Event]]
+        ] = {}
+        self.observers: list[BusObserver] = []
+
+    async def start(self) -> None:
+        """Start bus before publishing"""
+
+    async def stop(self) -> None:
+        """Handle all accepted messages and stop bus"""
+        await self.wait_background_tasks()
+        await self.close_subscribers()
+
+    async def close_subscribers(self) -> None:
+        for sub in self.services:
+            await sub.close()
+        for observer in self.observers:
+            observer.on_stop()
 
     def register(self, subscriber: Subscriber) -> None:
         """Register subscriber in bus"""
         self.services.append(subscriber)
+        self.routes = {}
 
     def unregister(self, subscriber: Subscriber) -> None:
         """Unregister subscriber in bus"""
         self.services.remove(subscriber)
+        self.routes = {}
+
+    def add_observer(self, observer: BusObserver) -> None:
+        """Call hooks of observer on handling of messages"""
+        self.observers.append(observer)
+
+    def queue_sizes(self) -> dict[str, int]:
+        return {
+            "background": len(self.background_tasks),
+            "waiters": len(self.waiters),
+        }
+
+    def get_handlers(self, event_class: type[Event]) -> list[Subscriber]:
+        """Return subscribers for event class in registration order"""
+        handlers = self.routes.get(event_class)
+        if handlers is None:
+            handlers = [
+                sub
+                for sub in self.services
+                if not sub.handled_events or issubclass(event_class, sub.handled_events)
+            ]
+            self.routes[event_class] = handlers
+        return handlers
 
     async def public_message(self, message: Event | list[Event]) -> None | Event:
         """Public and handle message"""
-        track_for_class = None
-        track_for_id = None
+        messages = message if isinstance(message, list) else [message]
+        track_for_class = messages[0].track_for_event_class
+        track_for_id = messages[0].id_
         return_event = None
-        queue = []
-        if isinstance(message, list):
-            queue += message
-            if message[0].track_for_event_class:
-                track_for_class = message[0].track_for_event_class
-                track_for_id = message[0].id_
-        elif isinstance(message, Event):
-            queue.append(message)
-            if message.track_for_event_class:
-                track_for_class = message.track_for_event_class
-                track_for_id = message.id_
+        queue: deque[Event] = deque(messages)
+        cascade = self._new_cascade(messages[0])
         while queue:
-            current_message = queue.pop(0)
-            if (
-                track_for_id
-                and track_for_class
-                and not return_event
-                and current_message.__class__ in track_for_class
-                and current_message.parent_id == track_for_id
-            ):
-                return_event = current_message
-            for sub in self.services:
-                events = await sub.process(current_message)
-                queue += events
+            current_message = queue.popleft()
+            events = await self._dispatch_or_drop(current_message, queue)
+            queue.extend(events)
+            if cascade is not None:
+                cascade.add(current_message, events)
+            if return_event or not track_for_class:
+                continue
+            for event in events:
+                if (
+                    event.__class__ in track_for_class
+                    and event.parent_id == track_for_id
+                ):
+                    return_event = event
+                    break
+            if return_event and self.early_return and queue:
+                await self._handle_in_background(queue, cascade)
+                break
+        else:
+            self._report_cascade(cascade)
         return return_event
+
+    async def request(
+        self,
+        message: Event,
+        expect: list[type[Event]],
+        timeout: float | None = None,
+        write: bool = False,
+    ) -> Event:
+        """
+        Public message and return first child event of expected class.
+        Cascade is handled in background and goes on after the response,
+        timeout or cancellation of the caller.
+        """
+        future: asyncio.Future[Event] = asyncio.get_running_loop().create_future()
+        self.waiters[message.id_] = (tuple(expect), future)
+        try:
+            task = await self._handle_in_background(deque([message]))
+            task.add_done_callback(lambda t: self._cascade_done(message.id_, t))
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self.waiters.pop(message.id_, None)
+
+    def _cascade_done(self, root_id: str, task: asyncio.Task[None]) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            self._fail_waiter(root_id, tp.cast(BaseException, task.exception()))
+        else:
+            self._fail_waiter(root_id, NoResponseError(root_id))
+
+    def _fail_waiter(self, root_id: str, exception: BaseException) -> None:
+        waiter = self.waiters.get(root_id)
+        if waiter is not None and not waiter[1].done():
+            waiter[1].set_exception(exception)
+
+    def _resolve_waiters(self, events: list[Event]) -> None:
+        for event in events:
+            waiter = self.waiters.get(event.parent_id)
+            if waiter is None:
+                continue
+            expect, future = waiter
+            if isinstance(event, expect) and not future.done():
+                future.set_result(event)
+
+    async def _handle_in_background(
+        self, queue: deque[Event], cascade: Cascade | None = None
+    ) -> asyncio.Task[None]:
+        await self.background_limit.acquire()
+        task = asyncio.create_task(self._handle_queue(queue, cascade))
+        self.background_tasks.add(task)
+        task.add_done_callback(self._background_task_done)
+        return task
+
+    async def _handle_queue(
+        self, queue: deque[Event], cascade: Cascade | None = None
+    ) -> None:
+        if cascade is None and queue:
+            cascade = self._new_cascade(queue[0])
+        while queue:
+            message = queue.popleft()
+            events = await self._dispatch_or_drop(message, queue)
+            queue.extend(events)
+            if cascade is not None:
+                cascade.add(message, events)
+        self._report_cascade(cascade)
+
+    def _new_cascade(self, root: Event) -> Cascade | None:
+        # без наблюдателей каскад не отслеживается
+        if not self.observers:
+            return None
+        return Cascade(root=root, started=time.perf_counter())
+
+    def _report_cascade(self, cascade: Cascade | None) -> None:
+        if cascade is None:
+            return
+        cascade.elapsed = time.perf_counter() - cascade.started
+        for observer in self.observers:
+            observer.on_cascade(cascade)
+
+    def _background_task_done(self, task: asyncio.Task[None]) -> None:
+        self.background_tasks.discard(task)
+        self.background_limit.release()
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Background cascade failed", exc_info=task.exception())
+
+    async def wait_background_tasks(self) -> None:
+        """Wait until all background cascades are handled"""
+        while self.background_tasks:
+            await asyncio.gather(*self.background_tasks, return_exceptions=True)
+
+    async def _dispatch_or_drop(
+        self, message: Event, queue: deque[Event]
+    ) -> list[Event]:
+        try:
+            return await self._dispatch(message)
+        except BaseException:
+            # остаток каскада уже не обработается
+            if self.observers and queue:
+                dropped = list(queue)
+                for observer in self.observers:
+                    observer.on_drop(dropped)
+            raise
+
+    async def _dispatch(self, message: Event) -> list[Event]:
+        """Handle message by all subscribers and return child events"""
+        started = 0.0
+        if self.observers:
+            for observer in self.observers:
+                observer.on_dispatch_start(message)
+            started = time.perf_counter()
+        try:
+            events = await self._run_handlers(message)
+        except BaseException as e:
+            if self.observers:
+                elapsed = time.perf_counter() - started
+                for observer in self.observers:
+                    observer.on_dispatch_error(message, started, elapsed, e)
+            raise
+        if self.waiters:
+            self._resolve_waiters(events)
+        if self.observers:
+            elapsed = time.perf_counter() - started
+            for observer in self.observers:
+                observer.on_dispatch(message, started, elapsed, events)
+        return events
+
+    async def _run_handlers(self, message: Event) -> list[Event]:
+        events: list[Event] = []
+        handlers = self.get_handlers(message.__class__)
+        if self.concurrent and len(handlers) > 1:
+            results = await asyncio.gather(
+                *(self._process(sub, message) for sub in handlers)
+            )
+            for result in results:
+                events += result
+        else:
+            for sub in handlers:
+                events += await self._process(sub, message)
+        return events
+
+    async def _process(self, subscriber: Subscriber, message: Event) -> list[Event]:
+        if not self.isolate_errors:
+            return await self._observed_process(subscriber, message)
+        try:
+            return await self._observed_process(subscriber, message)
+        except Exception:
+            logger.exception(
+                f"{subscriber.__class__.__name__} failed on {message.__class__.__name__}"
+            )
+            return []
+
+    async def _observed_process(
+        self, subscriber: Subscriber, message: Event
+    ) -> list[Event]:
+        if not self.observers:
+            return await subscriber.process(message)
+        for observer in self.observers:
+            observer.on_process_start(subscriber, message)
+        started = time.perf_counter()
+        error: BaseException | None = None
+        try:
+            return await subscriber.process(message)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            for observer in self.observers:
+                observer.on_process(subscriber, message, started, elapsed, error)
+
+
+class WorkerPoolMessageBus(ConcreteMessageBus):
+    """
+    Bus with bounded queues handled by background workers.
+    Published messages are acknowledged when enqueued, requests have own queue
+    and workers, so burst of published messages does not slow down requests.
+    Write requests go to queue of published messages and wait for response
+    there, burst of votes does not take workers of page reads.
+    Worker of published messages takes up to prefetch waiting messages
+    and handles them concurrently, so one worker can fill a batch of votes.
+    BusOverloadedError is raised when queue is full.
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        request_workers: int = 4,
+        max_queue_size: int = 10000,
+        concurrent: bool = False,
+        isolate_errors: bool = True,
+        prefetch: int = 1,
+    ) -> None:
+        super().__init__(concurrent=concurrent, isolate_errors=isolate_errors)
+        self.workers_count = workers
+        self.request_workers_count = request_workers
+        self.prefetch = prefetch
+        self.queue: asyncio.Queue[Event] = asyncio.Queue(maxsize=max_queue_size)
+        self.request_queue: asyncio.Queue[Event] = asyncio.Queue(maxsize=max_queue_size)
+        self.workers: list[asyncio.Task[None]] = []
+
+    def queue_sizes(self) -> dict[str, int]:
+        return super().queue_sizes() | {
+            "published": self.queue.qsize(),
+            "requests": self.request_queue.qsize(),
+        }
+
+    async def start(self) -> None:
+        """Start workers"""
+        if self.workers:
+            return
+        self.workers = [
+            asyncio.create_task(self._worker(self.queue, self.prefetch))
+            for _ in range(self.workers_count)
+        ] + [
+            asyncio.create_task(self._worker(self.request_queue, 1))
+            for _ in range(self.request_workers_count)
+        ]
+
+    async def stop(self) -> None:
+        """Handle all enqueued messages and stop workers"""
+        if not self.workers:
+            return
+        await self.queue.join()
+        await self.request_queue.join()
+        await self.close_subscribers()
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+    @staticmethod
+    def _put(queue: asyncio.Queue[Event], message: Event) -> None:
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            raise BusOverloadedError(
+                f"Bus queue is full, {message.__class__.__name__} is not accepted"
+            )
+
+    async def public_message(self, message: Event | list[Event]) -> None | Event:
+        """Enqueue message, it is handled by workers later"""
+        await self.start()
+        messages = message if isinstance(message, list) else [message]
+        if (
+            self.queue.maxsize
+            and self.queue.qsize() + len(messages) > self.queue.maxsize
+        ):
+            raise BusOverloadedError(f"Bus queue is full, {len(messages)} not accepted")
+        for item in messages:
+            self._put(self.queue, item)
+        return None
+
+    async def request(
+        self,
+        message: Event,
+        expect: list[type[Event]],
+        timeout: float | None = None,
+        write: bool = False,
+    ) -> Event:
+        """Enqueue message and wait for first child event of expected class"""
+        await self.start()
+        future: asyncio.Future[Event] = asyncio.get_running_loop().create_future()
+        self.waiters[message.id_] = (tuple(expect), future)
+        try:
+            self._put(self.queue if write else self.request_queue, message)
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self.waiters.pop(message.id_, None)
+
+    async def _worker(self, queue: asyncio.Queue[Event], prefetch: int) -> None:
+        while True:
+            messages = [await queue.get()]
+            # голоса, ждущие пачку, не должны держать воркер по одному
+            while len(messages) < prefetch and not queue.empty():
+                messages.append(queue.get_nowait())
+            if len(messages) == 1:
+                await self._handle_message(queue, messages[0])
+            else:
+                await asyncio.gather(
+                    *(self._handle_message(queue, message) for message in messages)
+                )
+
+    async def _handle_message(
+        self, queue: asyncio.Queue[Event], message: Event
+    ) -> None:
+        try:
+            # каскад обрабатывается целиком в одном воркере
+            await self._handle_queue(deque([message]))
+        except Exception as e:
+            logger.exception(f"Cascade of {message.__class__.__name__} failed")
+            self._fail_waiter(message.id_, e)
+        else:
+            self._fail_waiter(message.id_, NoResponseError(message.id_))
+        finally:
+            queue.task_done()
@@ -0,0 +1,238 @@
+import typing as tp
+from bisect import bisect_left
+
+from src.domain.events import Event
+from src.domain.subscriber import Subscriber
+from src.services.message_bus import BusObserver
+from src.services.message_bus import Cascade
+from src.services.message_bus import MessageBus
+from src.services.observed_adapter import AdapterObserver
+
+Labels = tuple[str, ...]
+
+# от долей миллисекунды in-memory хранилищ до секунд медленных запросов
+SECONDS_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+COUNT_BUCKETS = (1, 2, 3, 4, 5, 8, 13, 21, 34, 55, 89)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def format_labels(names: Labels, values: Labels, *extra: str) -> str:
+    pairs = [
+        f'{name}="{escape(value)}"' for name, value in zip(names, values, strict=True)
+    ]
+    pairs += [pair for pair in extra if pair]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_value(value: float) -> str:
+    return repr(float(value))
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labels: Labels = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.values: dict[Labels, float] = {}
+
+    def inc(self, labels: Labels = (), amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self, const: str = "") -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} counter",
+        ]
+        for values, value in self.values.items():
+            labels = format_labels(self.labels, values, const)
+            lines.append(f"{self.name}{labels} {format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Histogram with fixed buckets, one series per label values"""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Labels = (),
+        buckets: tp.Sequence[float] = SECONDS_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        # попадания в каждый бакет, последний - больше всех границ
+        self.counts: dict[Labels, list[int]] = {}
+        self.sums: dict[Labels, float] = {}
+
+    def observe(self, value: float, labels: Labels = ()) -> None:
+        counts = self.counts.get(labels)
+        if counts is None:
+            counts = self.counts[labels] = [0] * (len(self.buckets) + 1)
+            self.sums[labels] = 0.0
+        counts[bisect_left(self.buckets, value)] += 1
+        self.sums[labels] += value
+
+    def render(self, const: str = "") -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        for values, counts in self.counts.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = format_labels(self.labels, values, const, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            total = cumulative + counts[-1]
+            labels = format_labels(self.labels, values, const, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {total}")
+            labels = format_labels(self.labels, values, const)
+            lines.append(f"{self.name}_sum{labels} {format_value(self.sums[values])}")
+            lines.append(f"{self.name}_count{labels} {total}")
+        return lines
+
+
+class BusMetrics(BusObserver, AdapterObserver):
+    """
+    Collects bus and adapter timings from observer hooks,
+    renders them in Prometheus text format. Every series of process
+    started among several web workers has worker label.
+    """
+
+    def __init__(self, bus: MessageBus | None = None, worker: str = "") -> None:
+        self.bus = bus
+        self.const = f'worker="{escape(worker)}"' if worker else ""
+        self.dispatch_seconds = Histogram(
+            "edec_bus_dispatch_seconds",
+            "Time of handling event by all its subscribers",
+            ("event",),
+        )
+        self.subscriber_seconds = Histogram(
+            "edec_bus_subscriber_seconds",
+            "Time of handling event by one subscriber",
+            ("subscriber", "event"),
+        )
+        self.subscriber_errors = Counter(
+            "edec_bus_subscriber_errors_total",
+            "Exceptions raised by subscribers",
+            ("subscriber", "event"),
+        )
+        self.cascade_seconds = Histogram(
+            "edec_bus_cascade_seconds",
+            "Time of handling cascade by root event",
+            ("event",),
+        )
+        self.cascade_events = Histogram(
+            "edec_bus_cascade_events",
+            "Events handled in cascade by root event",
+            ("event",),
+            COUNT_BUCKETS,
+        )
+        self.cascade_depth = Histogram(
+            "edec_bus_cascade_depth",
+            "Levels of cascade by root event",
+            ("event",),
+            COUNT_BUCKETS,
+        )
+        self.cascade_fan_out = Histogram(
+            "edec_bus_cascade_fan_out",
+            "Most child events of one event in cascade by root event",
+            ("event",),
+            COUNT_BUCKETS,
+        )
+        self.adapter_seconds = Histogram(
+            "edec_adapter_call_seconds", "Time of storage adapter call", ("method",)
+        )
+        self.adapter_errors = Counter(
+            "edec_adapter_errors_total",
+            "Exceptions raised by storage adapter",
+            ("method",),
+        )
+
+    def on_process(
+        self,
+        subscriber: Subscriber,
+        message: Event,
+        started: float,
+        elapsed: float,
+        error: BaseException | None,
+    ) -> None:
+        labels = (subscriber.__class__.__name__, message.__class__.__name__)
+        self.subscriber_seconds.observe(elapsed, labels)
+        if error is not None:
+            self.subscriber_errors.inc(labels)
+
+    def on_dispatch(
+        self, message: Event, started: float, elapsed: float, events: list[Event]
+    ) -> None:
+        self.dispatch_seconds.observe(elapsed, (message.__class__.__name__,))
+
+    def on_cascade(self, cascade: Cascade) -> None:
+        labels = (cascade.root.__class__.__name__,)
+        self.cascade_seconds.observe(cascade.elapsed, labels)
+        self.cascade_events.observe(cascade.size, labels)
+        self.cascade_depth.observe(cascade.depth, labels)
+        self.cascade_fan_out.observe(cascade.fan_out, labels)
+
+    def on_adapter_call(
+        self, method: str, started: float, elapsed: float, error: BaseException | None
+    ) -> None:
+        self.adapter_seconds.observe(elapsed, (method,))
+        if error is not None:
+            self.adapter_errors.inc((method,))
+
+    def render_queues(self) -> list[str]:
+        # длина очередей читается в момент запроса метрик
+        name = "edec_bus_queue_length"
+        lines = [
+            f"# HELP {name} Messages and cascades waiting or in progress",
+            f"# TYPE {name} gauge",
+        ]
+        if self.bus is not None:
+            for queue, size in self.bus.queue_sizes().items():
+                labels = format_labels(("queue",), (queue,), self.const)
+                lines.append(f"{name}{labels} {size}")
+        return lines
+
+    def render(self) -> bytes:
+        lines: list[str] = []
+        metrics: tuple[Histogram | Counter, ...] = (
+            self.dispatch_seconds,
+            self.subscriber_seconds,
+            self.subscriber_errors,
+            self.cascade_seconds,
+            self.cascade_events,
+            self.cascade_depth,
+            self.cascade_fan_out,
+            self.adapter_seconds,
+            self.adapter_errors,
+        )
+        for metric in metrics:
+            lines += metric.render(self.const)
+        lines += self.render_queues()
+        return ("\n".join(lines) + "\n").encode()
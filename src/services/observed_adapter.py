@@ -0,0 +1,135 @@
+import time
+import typing as tp
+
+from src.domain.models import PollSummary
+from src.domain.models import SimplePoll
+from src.domain.models import SimpleVote
+from src.domain.processors import AbstractAdapter
+
+V = tp.TypeVar("V")
+
+
+class AdapterObserver:
+    """Hooks called by ObservedDbAdapter for metrics and tracing"""
+
+    def on_adapter_call_start(self, method: str) -> None:
+        """Adapter method is called"""
+
+    def on_adapter_call(
+        self, method: str, started: float, elapsed: float, error: BaseException | None
+    ) -> None:
+        """Adapter method returned or raised, times are from time.perf_counter"""
+
+
+class ObservedDbAdapter(AbstractAdapter):
+    """Adapter wrapper reporting time of every call to observers"""
+
+    def __init__(
+        self, adapter: AbstractAdapter, observers: list[AdapterObserver]
+    ) -> None:
+        self.adapter = adapter
+        self.observers = observers
+
+    async def close(self) -> None:
+        await self.adapter.close()
+
+    async def _call(self, method: str, func: tp.Callable[[], tp.Awaitable[V]]) -> V:
+        for observer in self.observers:
+            observer.on_adapter_call_start(method)
+        started = time.perf_counter()
+        error: BaseException | None = None
+        try:
+            return await func()
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            for observer in self.observers:
+                observer.on_adapter_call(method, started, elapsed, error)
+
+    async def create_poll(
+        self,
+        creator_id: str,
+        name: str,
+        description: str,
+        is_open: bool,
+        variants: list[str],
+    ) -> SimplePoll:
+        return await self._call(
+            "create_poll",
+            lambda: self.adapter.create_poll(
+                creator_id=creator_id,
+                name=name,
+                description=description,
+                is_open=is_open,
+                variants=variants,
+            ),
+        )
+
+    async def get_polls(self, polls_ids: list[str]) -> list[SimplePoll]:
+        return await self._call(
+            "get_polls", lambda: self.adapter.get_polls(polls_ids=polls_ids)
+        )
+
+    async def get_polls_ids(self) -> list[str]:
+        return await self._call("get_polls_ids", self.adapter.get_polls_ids)
+
+    async def get_polls_page(self, limit: int, after: str = "") -> list[PollSummary]:
+        return await self._call(
+            "get_polls_page",
+            lambda: self.adapter.get_polls_page(limit=limit, after=after),
+        )
+
+    async def create_vote_if_absent(self, user_id: str, variant_id: str) -> bool:
+        return await self._call(
+            "create_vote_if_absent",
+            lambda: self.adapter.create_vote_if_absent(
+                user_id=user_id, variant_id=variant_id
+            ),
+        )
+
+    async def create_votes(self, votes: list[SimpleVote]) -> list[bool]:
+        return await self._call(
+            "create_votes", lambda: self.adapter.create_votes(votes)
+        )
+
+    async def get_poll_results(
+        self, poll_id: str, sender_user_id: str
+    ) -> dict[str, int]:
+        return await self._call(
+            "get_poll_results",
+            lambda: self.adapter.get_poll_results(
+                poll_id=poll_id, sender_user_id=sender_user_id
+            ),
+        )
+
+    async def get_votes_count(self, poll_id: str) -> dict[str, int]:
+        return await self._call(
+            "get_votes_count", lambda: self.adapter.get_votes_count(poll_id=poll_id)
+        )
+
+    async def get_poll_and_voted(
+        self, poll_id: str, user_id: str
+    ) -> tuple[SimplePoll, bool] | None:
+        return await self._call(
+            "get_poll_and_voted",
+            lambda: self.adapter.get_poll_and_voted(poll_id=poll_id, user_id=user_id),
+        )
+
+    async def update_poll(self, poll_id: str, is_open: bool) -> bool:
+        return await self._call(
+            "update_poll",
+            lambda: self.adapter.update_poll(poll_id=poll_id, is_open=is_open),
+        )
+
+    async def has_user_voted(self, user_id: str, poll_id: str) -> bool:
+        return await self._call(
+            "has_user_voted",
+            lambda: self.adapter.has_user_voted(user_id=user_id, poll_id=poll_id),
+        )
+
+    async def has_variant(self, variant_id: str) -> bool:
+        return await self._call(
+            "has_variant", lambda: self.adapter.has_variant(variant_id=variant_id)
+        )
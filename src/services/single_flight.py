@@ -0,0 +1,172 @@
+import asyncio
+import typing as tp
+
+from src.domain.models import PollSummary
+from src.domain.models import SimplePoll
+from src.domain.models import SimpleVote
+from src.domain.processors import AbstractAdapter
+
+V = tp.TypeVar("V")
+
+
+class SingleFlight:
+    """
+    Run one call per key at a time, concurrent callers
+    with the same key wait for result of the running call
+    """
+
+    def __init__(self) -> None:
+        self.calls: dict[tp.Hashable, asyncio.Future[tp.Any]] = {}
+        self.started = 0
+        self.shared = 0
+
+    async def do(self, key: tp.Hashable, func: tp.Callable[[], tp.Awaitable[V]]) -> V:
+        future = self.calls.get(key)
+        if future is None:
+            self.started += 1
+            future = asyncio.ensure_future(func())
+            self.calls[key] = future
+            future.add_done_callback(lambda f: self._call_done(key, f))
+        else:
+            self.shared += 1
+        # отмена одного ожидающего не отменяет запрос для остальных
+        return tp.cast(V, await asyncio.shield(future))
+
+    def _call_done(self, key: tp.Hashable, future: asyncio.Future[tp.Any]) -> None:
+        if self.calls.get(key) is future:
+            del self.calls[key]
+        if not future.cancelled():
+            # исключение уже получили ожидающие, иначе asyncio ругается
+            future.exception()
+
+    def forget(self, match: tp.Callable[[tp.Hashable], bool]) -> None:
+        """Next callers of matched keys start new call instead of waiting"""
+        for key in [key for key in self.calls if match(key)]:
+            del self.calls[key]
+
+
+class SingleFlightDbAdapter(AbstractAdapter):
+    """
+    Adapter wrapper coalescing identical concurrent reads into one query.
+    Poll writes make later reads of polls start a new query, votes do the same
+    for results and voted flags of the user. Vote counts are not shared,
+    tallies recount from them and must not get counts older than their votes.
+    """
+
+    def __init__(self, adapter: AbstractAdapter) -> None:
+        self.adapter = adapter
+        self.flight = SingleFlight()
+
+    async def close(self) -> None:
+        await self.adapter.close()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "flight_started": self.flight.started,
+            "flight_shared": self.flight.shared,
+        }
+
+    def _forget_polls(self) -> None:
+        self.flight.forget(
+            lambda key: isinstance(key, tuple)
+            and key[0] in ("polls", "ids", "page", "view")
+        )
+
+    async def create_poll(
+        self,
+        creator_id: str,
+        name: str,
+        description: str,
+        is_open: bool,
+        variants: list[str],
+    ) -> SimplePoll:
+        poll = await self.adapter.create_poll(
+            creator_id=creator_id,
+            name=name,
+            description=description,
+            is_open=is_open,
+            variants=variants,
+        )
+        self._forget_polls()
+        return poll
+
+    async def get_polls(self, polls_ids: list[str]) -> list[SimplePoll]:
+        polls = await self.flight.do(
+            ("polls", tuple(polls_ids)),
+            lambda: self.adapter.get_polls(polls_ids=polls_ids),
+        )
+        return list(polls)
+
+    async def get_polls_ids(self) -> list[str]:
+        ids = await self.flight.do(("ids",), self.adapter.get_polls_ids)
+        return list(ids)
+
+    async def get_polls_page(self, limit: int, after: str = "") -> list[PollSummary]:
+        page = await self.flight.do(
+            ("page", limit, after),
+            lambda: self.adapter.get_polls_page(limit=limit, after=after),
+        )
+        return list(page)
+
+    def _forget_voted(self, users_ids: set[str]) -> None:
+        # опрос по варианту не известен: забываются результаты всех опросов
+        # и все опросы пользователя
+        self.flight.forget(
+            lambda key: isinstance(key, tuple)
+            and (
+                key[0] == "results"
+                or (key[0] == "voted" and key[1] in users_ids)
+                or (key[0] == "view" and key[2] in users_ids)
+            )
+        )
+
+    async def create_vote_if_absent(self, user_id: str, variant_id: str) -> bool:
+        saved = await self.adapter.create_vote_if_absent(
+            user_id=user_id, variant_id=variant_id
+        )
+        self._forget_voted({user_id})
+        return saved
+
+    async def create_votes(self, votes: list[SimpleVote]) -> list[bool]:
+        saved = await self.adapter.create_votes(votes)
+        self._forget_voted({vote.user_id for vote in votes})
+        return saved
+
+    async def get_poll_results(
+        self, poll_id: str, sender_user_id: str
+    ) -> dict[str, int]:
+        # результаты от пользователя не зависят, ключ только по опросу
+        results = await self.flight.do(
+            ("results", poll_id),
+            lambda: self.adapter.get_poll_results(
+                poll_id=poll_id, sender_user_id=sender_user_id
+            ),
+        )
+        return dict(results)
+
+    async def get_votes_count(self, poll_id: str) -> dict[str, int]:
+        # пересчет подсчетов и так один на опрос, а общий запрос мог начаться
+        # до голоса, который подсчеты уже учли
+        return await self.adapter.get_votes_count(poll_id=poll_id)
+
+    async def get_poll_and_voted(
+        self, poll_id: str, user_id: str
+    ) -> tuple[SimplePoll, bool] | None:
+        return await self.flight.do(
+            ("view", poll_id, user_id),
+            lambda: self.adapter.get_poll_and_voted(poll_id=poll_id, user_id=user_id),
+        )
+
+    async def update_poll(self, poll_id: str, is_open: bool) -> bool:
+        result = await self.adapter.update_poll(poll_id=poll_id, is_open=is_open)
+        self._forget_polls()
+        return result
+
+    async def has_user_voted(self, user_id: str, poll_id: str) -> bool:
+        return await self.flight.do(
+            ("voted", user_id, poll_id),
+            lambda: self.adapter.has_user_voted(user_id=user_id, poll_id=poll_id),
+        )
+
+    async def has_variant(self, variant_id: str) -> bool:
+        return await self.adapter.has_variant(variant_id=variant_id)
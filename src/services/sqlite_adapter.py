@@ -0,0 +1,485 @@
+import asyncio
+import sqlite3
+import typing as tp
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from dataclasses import replace
+
+from src.domain.models import PollSummary
+from src.domain.models import SimplePoll
+from src.domain.models import SimpleVariant
+from src.domain.models import SimpleVote
+from src.domain.processors import AbstractAdapter
+
+T = tp.TypeVar("T")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS polls (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    creator_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    description TEXT NOT NULL,
+    is_open INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS variants (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    poll_id INTEGER NOT NULL REFERENCES polls (id),
+    name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS votes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    poll_id INTEGER NOT NULL REFERENCES polls (id),
+    variant_id INTEGER NOT NULL REFERENCES variants (id),
+    UNIQUE (user_id, poll_id)
+);
+-- созданные и измененные опросы, по ним процессы узнают о чужих записях
+CREATE TABLE IF NOT EXISTS poll_changes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    poll_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS variants_poll_id_idx ON variants (poll_id);
+CREATE INDEX IF NOT EXISTS votes_variant_id_idx ON votes (variant_id);
+"""
+
+# ограничение sqlite на количество параметров в одном запросе
+MAX_QUERY_PARAMS = 500
+
+
+@dataclass(frozen=True, slots=True)
+class Changes:
+    """Writes of other processes since previous read of changes"""
+
+    polls_ids: frozenset[str]
+    # опрос и голос
+    votes: tuple[tuple[str, SimpleVote], ...]
+
+
+def _to_int(value: str) -> int | None:
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+class SqliteConnectionPool:
+    """
+    Pool of sqlite connections, blocking calls run in thread executor.
+    Readers share the pool, all writes go through one connection.
+    """
+
+    def __init__(self, path: str, size: int = 4) -> None:
+        self.path = path
+        self.size = size
+        self._executor = ThreadPoolExecutor(
+            max_workers=size + 1, thread_name_prefix="sqlite"
+        )
+        self._readers: asyncio.Queue[sqlite3.Connection] = asyncio.Queue()
+        self._all_readers: list[sqlite3.Connection] = []
+        self._writer: sqlite3.Connection | None = None
+        self._write_lock = asyncio.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(
+            self.path, timeout=30, check_same_thread=False, isolation_level=None
+        )
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("PRAGMA foreign_keys=ON")
+        return connection
+
+    def _open(self) -> None:
+        self._writer = self._connect()
+        self._writer.executescript(SCHEMA)
+        for _ in range(self.size):
+            connection = self._connect()
+            self._all_readers.append(connection)
+            self._readers.put_nowait(connection)
+
+    async def open(self) -> None:
+        if self._writer is not None:
+            return
+        async with self._write_lock:
+            if self._writer is None:
+                await asyncio.get_running_loop().run_in_executor(
+                    self._executor, self._open
+                )
+
+    async def read(self, func: tp.Callable[[sqlite3.Connection], T]) -> T:
+        await self.open()
+        connection = await self._readers.get()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, func, connection
+            )
+        finally:
+            self._readers.put_nowait(connection)
+
+    async def write(self, func: tp.Callable[[sqlite3.Connection], T]) -> T:
+        await self.open()
+        async with self._write_lock:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, self._in_transaction, func
+            )
+
+    def _in_transaction(self, func: tp.Callable[[sqlite3.Connection], T]) -> T:
+        if self._writer is None:
+            raise RuntimeError("Pool is not opened")
+        self._writer.execute("BEGIN IMMEDIATE")
+        try:
+            result = func(self._writer)
+        except BaseException:
+            self._writer.execute("ROLLBACK")
+            raise
+        self._writer.execute("COMMIT")
+        return result
+
+    async def close(self) -> None:
+        async with self._write_lock:
+            for connection in self._all_readers:
+                connection.close()
+            self._all_readers = []
+            self._readers = asyncio.Queue()
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        self._executor.shutdown(wait=True)
+
+
+class SqliteDbAdapter(AbstractAdapter):
+    """
+    Persistent adapter on local sqlite file
+    """
+
+    def __init__(self, path: str, pool_size: int = 4) -> None:
+        self.pool = SqliteConnectionPool(path=path, size=pool_size)
+        # курсоры get_changes, None пока изменения не читали
+        self.votes_cursor: int | None = None
+        self.polls_cursor = 0
+        # диапазоны id своих голосов (после, до включительно), их нет в changes
+        self.own_votes: list[tuple[int, int]] | None = None
+
+    async def close(self) -> None:
+        await self.pool.close()
+
+    async def create_poll(
+        self,
+        creator_id: str,
+        name: str,
+        description: str,
+        is_open: bool,
+        variants: list[str],
+    ) -> SimplePoll:
+        def query(connection: sqlite3.Connection) -> SimplePoll:
+            cursor = connection.execute(
+                "INSERT INTO polls (creator_id, name, description, is_open) VALUES (?, ?, ?, ?)",
+                (creator_id, name, description, int(is_open)),
+            )
+            poll_id = tp.cast(int, cursor.lastrowid)
+            connection.execute(
+                "INSERT INTO poll_changes (poll_id) VALUES (?)", (poll_id,)
+            )
+            connection.executemany(
+                "INSERT INTO variants (poll_id, name) VALUES (?, ?)",
+                [(poll_id, var) for var in variants],
+            )
+            rows = connection.execute(
+                "SELECT id, name FROM variants WHERE poll_id = ? ORDER BY id",
+                (poll_id,),
+            ).fetchall()
+            return SimplePoll(
+                poll_id=str(poll_id),
+                creator_id=creator_id,
+                name=name,
+                description=description,
+                is_open=is_open,
+                variants=tuple(
+                    SimpleVariant(
+                        variant_id=str(variant_id), poll_id=str(poll_id), name=var
+                    )
+                    for variant_id, var in rows
+                ),
+            )
+
+        return await self.pool.write(query)
+
+    async def get_polls_ids(self) -> list[str]:
+        def query(connection: sqlite3.Connection) -> list[str]:
+            rows = connection.execute("SELECT id FROM polls ORDER BY id").fetchall()
+            return [str(row[0]) for row in rows]
+
+        return await self.pool.read(query)
+
+    async def get_polls_page(self, limit: int, after: str = "") -> list[PollSummary]:
+        after_id = _to_int(after) if after else 0
+        if after_id is None:
+            return []
+
+        def query(connection: sqlite3.Connection) -> list[PollSummary]:
+            rows = connection.execute(
+                "SELECT id, name, description, is_open FROM polls "
+                "WHERE id > ? ORDER BY id LIMIT ?",
+                (after_id, limit),
+            ).fetchall()
+            return [
+                PollSummary(
+                    poll_id=str(poll_id),
+                    name=name,
+                    description=description,
+                    is_open=bool(is_open),
+                )
+                for poll_id, name, description, is_open in rows
+            ]
+
+        return await self.pool.read(query)
+
+    async def get_polls(self, polls_ids: list[str]) -> list[SimplePoll]:
+        ids = [i for i in (_to_int(poll_id) for poll_id in polls_ids) if i is not None]
+
+        def query(connection: sqlite3.Connection) -> dict[int, SimplePoll]:
+            found: dict[int, SimplePoll] = {}
+            variants: dict[int, list[SimpleVariant]] = {}
+            for start in range(0, len(ids), MAX_QUERY_PARAMS):
+                end = start + MAX_QUERY_PARAMS
+                chunk = ids[start:end]
+                placeholders = ", ".join("?" * len(chunk))
+                for row in connection.execute(
+                    "SELECT id, creator_id, name, description, is_open FROM polls "
+                    f"WHERE id IN ({placeholders})",
+                    chunk,
+                ):
+                    found[row[0]] = SimplePoll(
+                        poll_id=str(row[0]),
+                        creator_id=row[1],
+                        name=row[2],
+                        description=row[3],
+                        is_open=bool(row[4]),
+                        variants=(),
+                    )
+                for variant_id, poll_id, name in connection.execute(
+                    "SELECT id, poll_id, name FROM variants "
+                    f"WHERE poll_id IN ({placeholders}) ORDER BY id",
+                    chunk,
+                ):
+                    variants.setdefault(poll_id, []).append(
+                        SimpleVariant(
+                            variant_id=str(variant_id), poll_id=str(poll_id), name=name
+                        )
+                    )
+            return {
+                poll_id: replace(poll, variants=tuple(variants.get(poll_id, ())))
+                for poll_id, poll in found.items()
+            }
+
+        found = await self.pool.read(query)
+        result: list[SimplePoll] = []
+        for poll_id in polls_ids:
+            int_id = _to_int(poll_id)
+            if int_id is not None and int_id in found:
+                result.append(found[int_id])
+        return result
+
+    async def create_vote_if_absent(self, user_id: str, variant_id: str) -> bool:
+        # дубли отсекает UNIQUE (user_id, poll_id) внутри транзакции
+        return (await self.create_votes([SimpleVote(user_id, variant_id)]))[0]
+
+    async def create_votes(self, votes: list[SimpleVote]) -> list[bool]:
+        """Save votes in one transaction"""
+        rows = [(vote.user_id, _to_int(vote.variant_id)) for vote in votes]
+
+        def query(connection: sqlite3.Connection) -> list[bool]:
+            results: list[bool] = []
+            own_votes = self.own_votes
+            if own_votes is not None:
+                # записи процессов идут по очереди, новые id в транзакции - свои
+                last_id = self._last_vote_id(connection)
+            for user_id, variant_id in rows:
+                if variant_id is None:
+                    results.append(False)
+                    continue
+                cursor = connection.execute(
+                    "INSERT OR IGNORE INTO votes (user_id, poll_id, variant_id) "
+                    "SELECT ?, poll_id, id FROM variants WHERE id = ?",
+                    (user_id, variant_id),
+                )
+                results.append(cursor.rowcount > 0)
+            if own_votes is not None and any(results):
+                own_votes.append((last_id, self._last_vote_id(connection)))
+            return results
+
+        return await self.pool.write(query)
+
+    @staticmethod
+    def _last_vote_id(connection: sqlite3.Connection) -> int:
+        row = connection.execute("SELECT MAX(id) FROM votes").fetchone()
+        return row[0] or 0
+
+    async def get_changes(self, limit: int = 10000) -> Changes:
+        """
+        Polls and votes written by other processes since previous call,
+        first call only starts tracking and returns nothing
+        """
+        if self.votes_cursor is None:
+            self.own_votes = []
+
+            def start(connection: sqlite3.Connection) -> tuple[int, int]:
+                row = connection.execute("SELECT MAX(id) FROM poll_changes").fetchone()
+                return self._last_vote_id(connection), row[0] or 0
+
+            self.votes_cursor, self.polls_cursor = await self.pool.read(start)
+            return Changes(polls_ids=frozenset(), votes=())
+        votes_after, polls_after = self.votes_cursor, self.polls_cursor
+
+        def query(
+            connection: sqlite3.Connection,
+        ) -> tuple[list[tuple[int, int, str, int]], list[tuple[int, int]]]:
+            votes = connection.execute(
+                "SELECT id, poll_id, user_id, variant_id FROM votes "
+                "WHERE id > ? ORDER BY id LIMIT ?",
+                (votes_after, limit),
+            ).fetchall()
+            polls = connection.execute(
+                "SELECT id, poll_id FROM poll_changes WHERE id > ? ORDER BY id",
+                (polls_after,),
+            ).fetchall()
+            return votes, polls
+
+        vote_rows, poll_rows = await self.pool.read(query)
+        own_votes = self.own_votes or []
+        votes = tuple(
+            (str(poll_id), SimpleVote(user_id=user_id, variant_id=str(variant_id)))
+            for vote_id, poll_id, user_id, variant_id in vote_rows
+            if not any(after < vote_id <= last for after, last in own_votes)
+        )
+        if vote_rows:
+            self.votes_cursor = vote_rows[-1][0]
+            # диапазоны возрастают, пройденные удаляются на месте,
+            # запись в потоке пула может дописывать в этот же список
+            passed = 0
+            while passed < len(own_votes) and own_votes[passed][1] <= self.votes_cursor:
+                passed += 1
+            del own_votes[:passed]
+        if poll_rows:
+            self.polls_cursor = poll_rows[-1][0]
+        return Changes(
+            polls_ids=frozenset(str(poll_id) for _, poll_id in poll_rows), votes=votes
+        )
+
+    async def get_poll_results(
+        self, poll_id: str, sender_user_id: str
+    ) -> dict[str, int]:
+        int_poll_id = _to_int(poll_id)
+        if int_poll_id is None:
+            return {}
+
+        def query(connection: sqlite3.Connection) -> dict[str, int]:
+            rows = connection.execute(
+                "SELECT variants.name, COUNT(votes.id) FROM variants "
+                "LEFT JOIN votes ON votes.variant_id = variants.id "
+                "WHERE variants.poll_id = ? GROUP BY variants.id ORDER BY variants.id",
+                (int_poll_id,),
+            ).fetchall()
+            return {name: count for name, count in rows}
+
+        return await self.pool.read(query)
+
+    async def get_votes_count(self, poll_id: str) -> dict[str, int]:
+        int_poll_id = _to_int(poll_id)
+        if int_poll_id is None:
+            return {}
+
+        def query(connection: sqlite3.Connection) -> dict[str, int]:
+            rows = connection.execute(
+                "SELECT variants.id, COUNT(votes.id) FROM variants "
+                "LEFT JOIN votes ON votes.variant_id = variants.id "
+                "WHERE variants.poll_id = ? GROUP BY variants.id ORDER BY variants.id",
+                (int_poll_id,),
+            ).fetchall()
+            return {str(variant_id): count for variant_id, count in rows}
+
+        return await self.pool.read(query)
+
+    async def get_poll_and_voted(
+        self, poll_id: str, user_id: str
+    ) -> tuple[SimplePoll, bool] | None:
+        int_poll_id = _to_int(poll_id)
+        if int_poll_id is None:
+            return None
+
+        def query(connection: sqlite3.Connection) -> tuple[SimplePoll, bool] | None:
+            rows = connection.execute(
+                "SELECT polls.creator_id, polls.name, polls.description, "
+                "polls.is_open, variants.id, variants.name, "
+                "EXISTS (SELECT 1 FROM votes "
+                "WHERE votes.user_id = ? AND votes.poll_id = polls.id) "
+                "FROM polls LEFT JOIN variants ON variants.poll_id = polls.id "
+                "WHERE polls.id = ? ORDER BY variants.id",
+                (user_id, int_poll_id),
+            ).fetchall()
+            if not rows:
+                return None
+            creator_id, name, description, is_open, _, _, voted = rows[0]
+            str_poll_id = str(int_poll_id)
+            variants = tuple(
+                SimpleVariant(
+                    variant_id=str(variant_id), poll_id=str_poll_id, name=variant_name
+                )
+                for _, _, _, _, variant_id, variant_name, _ in rows
+                if variant_id is not None
+            )
+            poll = SimplePoll(
+                poll_id=str_poll_id,
+                creator_id=creator_id,
+                name=name,
+                description=description,
+                is_open=bool(is_open),
+                variants=variants,
+            )
+            return poll, bool(voted)
+
+        return await self.pool.read(query)
+
+    async def update_poll(self, poll_id: str, is_open: bool) -> bool:
+        int_poll_id = _to_int(poll_id)
+        if int_poll_id is None:
+            return False
+
+        def query(connection: sqlite3.Connection) -> bool:
+            cursor = connection.execute(
+                "UPDATE polls SET is_open = ? WHERE id = ?", (int(is_open), int_poll_id)
+            )
+            if cursor.rowcount == 0:
+                return False
+            connection.execute(
+                "INSERT INTO poll_changes (poll_id) VALUES (?)", (int_poll_id,)
+            )
+            return True
+
+        return await self.pool.write(query)
+
+    async def has_user_voted(self, user_id: str, poll_id: str) -> bool:
+        int_poll_id = _to_int(poll_id)
+        if int_poll_id is None:
+            return False
+
+        def query(connection: sqlite3.Connection) -> bool:
+            row = connection.execute(
+                "SELECT 1 FROM votes WHERE user_id = ? AND poll_id = ?",
+                (user_id, int_poll_id),
+            ).fetchone()
+            return row is not None
+
+        return await self.pool.read(query)
+
+    async def has_variant(self, variant_id: str) -> bool:
+        int_variant_id = _to_int(variant_id)
+        if int_variant_id is None:
+            return False
+
+        def query(connection: sqlite3.Connection) -> bool:
+            row = connection.execute(
+                "SELECT 1 FROM variants WHERE id = ?", (int_variant_id,)
+            ).fetchone()
+            return row is not None
+
+        return await self.pool.read(query)
@@ -0,0 +1,230 @@
+import json
+import secrets
+import time
+import typing as tp
+from collections import deque
+from contextvars import ContextVar
+from contextvars import Token
+from dataclasses import dataclass
+from dataclasses import field
+
+from src.domain.events import Event
+from src.domain.subscriber import Subscriber
+from src.services.message_bus import BusObserver
+from src.services.observed_adapter import AdapterObserver
+
+Attributes = dict[str, str | int | float | bool]
+
+# типы спанов OTLP
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+
+@dataclass(slots=True)
+class Span:
+    trace_id: str
+    span_id: str
+    parent_id: str
+    name: str
+    kind: int
+    start: int  # наносекунды с начала эпохи
+    end: int = 0
+    attributes: Attributes = field(default_factory=dict)
+    error: str = ""
+    token: Token["Span | None"] | None = field(default=None, repr=False)
+
+    @property
+    def duration(self) -> float:
+        return (self.end - self.start) / 1e9
+
+    def to_otlp(self) -> dict[str, tp.Any]:
+        """Span in OTLP JSON encoding"""
+        otlp: dict[str, tp.Any] = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start),
+            "endTimeUnixNano": str(self.end),
+            "attributes": [
+                {"key": key, "value": otlp_value(value)}
+                for key, value in self.attributes.items()
+            ],
+            "status": {"code": 2, "message": self.error} if self.error else {},
+        }
+        if self.parent_id:
+            otlp["parentSpanId"] = self.parent_id
+        return otlp
+
+
+def otlp_value(value: str | int | float | bool) -> dict[str, tp.Any]:
+    # bool проверяется первым, это подкласс int
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": value}
+
+
+class SpanExporter(tp.Protocol):
+    def export(self, span: Span) -> None:
+        """Take finished span"""
+
+    def close(self) -> None:
+        """Flush buffered spans"""
+
+
+class JsonLinesExporter:
+    """Appends finished spans to file, one OTLP JSON span per line"""
+
+    def __init__(self, path: str, buffer_size: int = 100) -> None:
+        self.path = path
+        self.buffer_size = buffer_size
+        self.buffer: list[Span] = []
+
+    def export(self, span: Span) -> None:
+        self.buffer.append(span)
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self.buffer:
+            return
+        lines = "".join(
+            json.dumps(span.to_otlp(), ensure_ascii=False) + "\n"
+            for span in self.buffer
+        )
+        self.buffer = []
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.write(lines)
+
+    def close(self) -> None:
+        self.flush()
+
+
+class SpanCollector:
+    """Keeps last finished spans in process, oldest are dropped"""
+
+    def __init__(self, max_spans: int = 10000) -> None:
+        self.spans: deque[Span] = deque(maxlen=max_spans)
+
+    def export(self, span: Span) -> None:
+        self.spans.append(span)
+
+    def close(self) -> None:
+        return None
+
+    def trace(self, trace_id: str) -> list[Span]:
+        """Spans of trace ordered by start"""
+        return sorted(
+            (span for span in self.spans if span.trace_id == trace_id),
+            key=lambda span: span.start,
+        )
+
+
+current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+class Tracer(BusObserver, AdapterObserver):
+    """
+    Builds span tree of request from bus and adapter hooks:
+    request - event - subscriber - adapter call. Child events are spans
+    under event which produced them, so cascade keeps its shape.
+    """
+
+    def __init__(self, exporter: SpanExporter) -> None:
+        self.exporter = exporter
+        # родительский спан событий, которые еще не обработаны
+        self.event_parents: dict[str, Span] = {}
+
+    def start_span(
+        self,
+        name: str,
+        kind: int = SPAN_KIND_INTERNAL,
+        attributes: Attributes | None = None,
+        parent: Span | None = None,
+    ) -> Span:
+        """Start span and make it current, parent is current span by default"""
+        if parent is None:
+            parent = current_span.get()
+        span = Span(
+            trace_id=parent.trace_id if parent else secrets.token_hex(16),
+            span_id=secrets.token_hex(8),
+            parent_id=parent.span_id if parent else "",
+            name=name,
+            kind=kind,
+            start=time.time_ns(),
+            attributes=attributes or {},
+        )
+        span.token = current_span.set(span)
+        return span
+
+    def end_span(self, span: Span, error: BaseException | None = None) -> None:
+        """End span started in the same task and export it"""
+        span.end = time.time_ns()
+        if error is not None:
+            span.error = repr(error)
+        if span.token is not None:
+            current_span.reset(span.token)
+            span.token = None
+        self.exporter.export(span)
+
+    def _end_current(self, error: BaseException | None = None) -> Span | None:
+        span = current_span.get()
+        if span is not None:
+            self.end_span(span, error)
+        return span
+
+    def on_dispatch_start(self, message: Event) -> None:
+        self.start_span(
+            f"event {message.__class__.__name__}",
+            attributes={"event.id": message.id_},
+            parent=self.event_parents.pop(message.id_, None),
+        )
+
+    def on_dispatch(
+        self, message: Event, started: float, elapsed: float, events: list[Event]
+    ) -> None:
+        span = current_span.get()
+        if span is None:
+            return
+        span.attributes["event.children"] = len(events)
+        for event in events:
+            self.event_parents[event.id_] = span
+        self.end_span(span)
+
+    def on_dispatch_error(
+        self, message: Event, started: float, elapsed: float, error: BaseException
+    ) -> None:
+        self._end_current(error)
+
+    def on_drop(self, events: list[Event]) -> None:
+        for event in events:
+            self.event_parents.pop(event.id_, None)
+
+    def on_process_start(self, subscriber: Subscriber, message: Event) -> None:
+        self.start_span(f"process {subscriber.__class__.__name__}")
+
+    def on_process(
+        self,
+        subscriber: Subscriber,
+        message: Event,
+        started: float,
+        elapsed: float,
+        error: BaseException | None,
+    ) -> None:
+        self._end_current(error)
+
+    def on_adapter_call_start(self, method: str) -> None:
+        self.start_span(f"adapter {method}", kind=SPAN_KIND_CLIENT)
+
+    def on_adapter_call(
+        self, method: str, started: float, elapsed: float, error: BaseException | None
+    ) -> None:
+        self._end_current(error)
+
+    def on_stop(self) -> None:
+        self.exporter.close()
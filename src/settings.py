@@ -0,0 +1,80 @@
+import os
+from dataclasses import dataclass
+
+
+@dataclass
+class Settings:
+    """
+    Application settings, read from environment
+    """
+
+    host: str = "localhost"
+    port: int = 8080
+    storage: str = "memory"  # memory, indexed, columnar или sqlite
+    sqlite_path: str = "edec.sqlite3"
+    sqlite_pool_size: int = 4
+    bus: str = "inline"  # inline или workers
+    bus_workers: int = 4
+    bus_queue_size: int = 10000
+    vote_batch_size: int = 100
+    vote_batch_window: float = 0.005
+    cache_size: int = 10000  # 0 отключает кэш опросов
+    cache_ttl: float = 60
+    live_results_tick: float = 0.5
+    page_cache_size: int = 1000  # 0 отключает кэш страниц
+    metrics: bool = True
+    trace_path: str = ""  # пустой путь отключает трассировку
+    web_workers: int = 1  # больше 1 только с хранилищем sqlite
+    sync_interval: float = 0.1
+    journal_dir: str = ""  # пустой путь отключает журнал, только с indexed
+    journal_fsync_interval: float = 0.01
+    journal_snapshot_every: int = 100000
+
+
+def get_settings() -> Settings:
+    defaults = Settings()
+    return Settings(
+        host=os.environ.get("EDEC_HOST", defaults.host),
+        port=int(os.environ.get("EDEC_PORT", defaults.port)),
+        storage=os.environ.get("EDEC_STORAGE", defaults.storage),
+        sqlite_path=os.environ.get("EDEC_SQLITE_PATH", defaults.sqlite_path),
+        sqlite_pool_size=int(
+            os.environ.get("EDEC_SQLITE_POOL_SIZE", defaults.sqlite_pool_size)
+        ),
+        bus=os.environ.get("EDEC_BUS", defaults.bus),
+        bus_workers=int(os.environ.get("EDEC_BUS_WORKERS", defaults.bus_workers)),
+        bus_queue_size=int(
+            os.environ.get("EDEC_BUS_QUEUE_SIZE", defaults.bus_queue_size)
+        ),
+        vote_batch_size=int(
+            os.environ.get("EDEC_VOTE_BATCH_SIZE", defaults.vote_batch_size)
+        ),
+        vote_batch_window=float(
+            os.environ.get("EDEC_VOTE_BATCH_WINDOW", defaults.vote_batch_window)
+        ),
+        cache_size=int(os.environ.get("EDEC_CACHE_SIZE", defaults.cache_size)),
+        cache_ttl=float(os.environ.get("EDEC_CACHE_TTL", defaults.cache_ttl)),
+        live_results_tick=float(
+            os.environ.get("EDEC_LIVE_RESULTS_TICK", defaults.live_results_tick)
+        ),
+        page_cache_size=int(
+            os.environ.get("EDEC_PAGE_CACHE_SIZE", defaults.page_cache_size)
+        ),
+        metrics=os.environ.get("EDEC_METRICS", str(int(defaults.metrics))) != "0",
+        trace_path=os.environ.get("EDEC_TRACE_PATH", defaults.trace_path),
+        web_workers=int(os.environ.get("EDEC_WEB_WORKERS", defaults.web_workers)),
+        sync_interval=float(
+            os.environ.get("EDEC_SYNC_INTERVAL", defaults.sync_interval)
+        ),
+        journal_dir=os.environ.get("EDEC_JOURNAL_DIR", defaults.journal_dir),
+        journal_fsync_interval=float(
+            os.environ.get(
+                "EDEC_JOURNAL_FSYNC_INTERVAL", defaults.journal_fsync_interval
+            )
+        ),
+        journal_snapshot_every=int(
+            os.environ.get(
+                "EDEC_JOURNAL_SNAPSHOT_EVERY", defaults.journal_snapshot_every
+            )
+        ),
+    )
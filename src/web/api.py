@@ -0,0 +1,145 @@
+import typing as tp
+
+from fastapi import APIRouter
+from fastapi import HTTPException
+from fastapi import Request
+from starlette import status
+
+from src.web.serialization import ApiResponse
+from src.web.serialization import loads
+from src.web.web_adapter import AbstractWebAdapter
+from src.web.web_adapter import UnknownVariantError
+
+
+class JsonApi:
+    """
+    Versioned JSON API over web adapter, mounted next to HTML pages.
+    Bodies are parsed and dataclasses are serialized without pydantic.
+    """
+
+    prefix = "/api/v1"
+    max_page_size = 100
+    max_batch_size = 100
+
+    def __init__(self, adapter: AbstractWebAdapter) -> None:
+        self.adapter = adapter
+        self.router = APIRouter(prefix=self.prefix, default_response_class=ApiResponse)
+        self.router.add_api_route(
+            path="/polls", endpoint=self.get_polls, methods=["GET"]
+        )
+        self.router.add_api_route(
+            path="/polls", endpoint=self.create_poll, methods=["POST"]
+        )
+        self.router.add_api_route(
+            path="/polls/{item_id}", endpoint=self.get_poll, methods=["GET"]
+        )
+        self.router.add_api_route(
+            path="/polls/{item_id}/results", endpoint=self.get_results, methods=["GET"]
+        )
+        self.router.add_api_route(path="/votes", endpoint=self.vote, methods=["POST"])
+        self.router.add_api_route(
+            path="/votes/batch", endpoint=self.vote_batch, methods=["POST"]
+        )
+
+    @staticmethod
+    async def read_body(request: Request) -> dict[str, tp.Any]:
+        try:
+            body = loads(await request.body())
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="Body is not JSON"
+            )
+        if not isinstance(body, dict):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Body must be JSON object",
+            )
+        return body
+
+    @staticmethod
+    def invalid(detail: str) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=detail
+        )
+
+    async def get_polls(
+        self, request: Request, cursor: str = "", limit: int = 50
+    ) -> ApiResponse:
+        limit = min(max(limit, 1), self.max_page_size)
+        page = await self.adapter.get_polls_page(
+            user_id=request.state.user_id, cursor=cursor, limit=limit
+        )
+        return ApiResponse({"polls": page.polls, "next_cursor": page.next_cursor})
+
+    async def get_poll(self, request: Request, item_id: str) -> ApiResponse:
+        view = await self.adapter.get_poll_view(
+            item_id=item_id, user_id=request.state.user_id
+        )
+        if view is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+        return ApiResponse(view)
+
+    async def get_results(self, request: Request, item_id: str) -> ApiResponse:
+        results = await self.adapter.get_poll_results(
+            item_id=item_id, user_id=request.state.user_id
+        )
+        # у существующего опроса всегда есть варианты
+        if not results:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+        return ApiResponse({"poll_id": item_id, "results": results})
+
+    async def create_poll(self, request: Request) -> ApiResponse:
+        body = await self.read_body(request)
+        name = body.get("name")
+        description = body.get("description", "")
+        variants = body.get("variants")
+        if not (name and isinstance(name, str)):
+            raise self.invalid("name must be non-empty string")
+        if not isinstance(description, str):
+            raise self.invalid("description must be string")
+        if not (
+            variants
+            and isinstance(variants, list)
+            and all(variant and isinstance(variant, str) for variant in variants)
+        ):
+            raise self.invalid("variants must be list of non-empty strings")
+        poll = await self.adapter.create_poll(
+            name=name,
+            description=description,
+            variants=variants,
+            user_id=request.state.user_id,
+        )
+        return ApiResponse(poll, status_code=status.HTTP_201_CREATED)
+
+    async def vote(self, request: Request) -> ApiResponse:
+        body = await self.read_body(request)
+        variant_id = body.get("variant_id")
+        if not (variant_id and isinstance(variant_id, str)):
+            raise self.invalid("variant_id must be non-empty string")
+        try:
+            saved = await self.adapter.create_vote(
+                variant_id=variant_id, user_id=request.state.user_id
+            )
+        except UnknownVariantError:
+            raise self.invalid("variant_id is unknown")
+        # повторный голос не записывается
+        return ApiResponse(
+            {"variant_id": variant_id, "saved": saved},
+            status_code=status.HTTP_201_CREATED if saved else status.HTTP_409_CONFLICT,
+        )
+
+    async def vote_batch(self, request: Request) -> ApiResponse:
+        body = await self.read_body(request)
+        variant_ids = body.get("variant_ids")
+        if not (
+            variant_ids
+            and isinstance(variant_ids, list)
+            and all(v_id and isinstance(v_id, str) for v_id in variant_ids)
+        ):
+            raise self.invalid("variant_ids must be list of non-empty strings")
+        if len(variant_ids) > self.max_batch_size:
+            raise self.invalid(f"no more than {self.max_batch_size} votes in batch")
+        saved = await self.adapter.create_votes(
+            variant_ids=variant_ids, user_id=request.state.user_id
+        )
+        return ApiResponse({"variant_ids": variant_ids, "saved": saved})
@@ -0,0 +1,41 @@
+import hashlib
+import typing as tp
+import uuid
+
+from fastapi import Request
+
+from src.services.cache import TTLCache
+
+PageKey = tuple[tp.Hashable, ...]
+
+
+class PageCache:
+    """
+    Rendered pages by key, key has to contain versions of data on the page.
+    ETag of page is derived from key, so it is known before rendering.
+    """
+
+    def __init__(self, max_size: int, ttl: float = 3600) -> None:
+        self.pages: TTLCache[PageKey, bytes] = TTLCache(max_size, ttl)
+        # счетчики версий начинаются заново при перезапуске, ETag не должен совпасть
+        self.boot_id = uuid.uuid4().hex
+
+    def etag(self, key: PageKey) -> str:
+        digest = hashlib.blake2b(
+            f"{self.boot_id}:{key!r}".encode(), digest_size=16
+        ).hexdigest()
+        return f'"{digest}"'
+
+    @staticmethod
+    def not_modified(request: Request, etag: str) -> bool:
+        if_none_match = request.headers.get("if-none-match")
+        if not if_none_match:
+            return False
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+
+    def get(self, key: PageKey) -> bytes | None:
+        return self.pages.get(key)
+
+    def set(self, key: PageKey, page: bytes) -> None:
+        self.pages.set(key, page)
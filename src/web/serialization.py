@@ -0,0 +1,49 @@
+import dataclasses
+import json
+import typing as tp
+
+from fastapi import Response
+
+try:
+    import orjson
+
+    HAS_ORJSON = True
+except ImportError:  # orjson не обязателен, без него работает json из stdlib
+    HAS_ORJSON = False
+
+
+def _to_builtin(value: tp.Any) -> tp.Any:
+    # asdict копирует вложенные значения, здесь достаточно полей верхнего уровня
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return {
+            field.name: getattr(value, field.name)
+            for field in dataclasses.fields(value)
+        }
+    raise TypeError(f"{value.__class__.__name__} is not JSON serializable")
+
+
+def dumps(value: tp.Any) -> bytes:
+    """Serialize value with domain dataclasses to JSON bytes"""
+    if HAS_ORJSON:
+        return orjson.dumps(value)
+    return json.dumps(
+        value, default=_to_builtin, ensure_ascii=False, separators=(",", ":")
+    ).encode()
+
+
+def loads(data: bytes) -> tp.Any:
+    if HAS_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class ApiResponse(Response):
+    """
+    JSON response serializing dataclasses directly,
+    without jsonable_encoder and pydantic validation
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: tp.Any) -> bytes:
+        return dumps(content)
@@ -1,4 +1,5 @@
 import json
+import socket
 import typing as tp
 import uuid
 from abc import ABC
@@ -7,16 +8,24 @@ from abc import abstractmethod
 import uvicorn
 from fastapi import APIRouter
 from fastapi import FastAPI
+from fastapi import HTTPException
 from fastapi import Request
 from fastapi import Response
 from fastapi.encoders import jsonable_encoder
 from fastapi.responses import RedirectResponse
+from fastapi.responses import StreamingResponse
 from starlette import status
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.middleware.base import RequestResponseEndpoint
 from starlette.templating import _TemplateResponse
+from starlette.types import ASGIApp
 
+from src.services.message_bus import BusOverloadedError
+from src.services.tracing import SPAN_KIND_SERVER
+from src.services.tracing import Tracer
+from src.web.api import JsonApi
 from src.web.web_adapter import AbstractWebAdapter
+from src.web.web_adapter import UnknownVariantError
 
 
 class AbstractWeb(ABC):
@@ -40,7 +49,8 @@ class AbstractWeb(ABC):
         self.message_handler = message_handler
 
     @abstractmethod
-    async def start(self) -> None:
+    async def start(self, sockets: list[socket.socket] | None = None) -> None:
+        """Serve on host and port or on sockets shared by worker processes"""
         raise NotImplementedError
 
 
@@ -59,6 +69,36 @@ class CookieMiddleware(BaseHTTPMiddleware):
         return response
 
 
+class TracingMiddleware(BaseHTTPMiddleware):
+    """Root span of request, id of trace is returned in X-Trace-Id header"""
+
+    def __init__(self, app: ASGIApp, tracer: Tracer) -> None:
+        super().__init__(app)
+        self.tracer = tracer
+
+    async def dispatch(
+        self, request: Request, call_next: RequestResponseEndpoint
+    ) -> Response:
+        span = self.tracer.start_span(
+            f"{request.method} {request.url.path}",
+            kind=SPAN_KIND_SERVER,
+            attributes={"http.method": request.method, "http.target": request.url.path},
+        )
+        try:
+            response = await call_next(request)
+        except BaseException as e:
+            self.tracer.end_span(span, e)
+            raise
+        # роутер дописывает обработчик в общий scope запроса
+        endpoint = request.scope.get("endpoint")
+        if endpoint is not None:
+            span.attributes["http.route"] = endpoint.__name__
+        span.attributes["http.status_code"] = response.status_code
+        self.tracer.end_span(span)
+        response.headers["X-Trace-Id"] = span.trace_id
+        return response
+
+
 class FastApiWeb(AbstractWeb):
     def __init__(
         self,
@@ -75,6 +115,9 @@ class FastApiWeb(AbstractWeb):
         )
         self.app = FastAPI()
         self.app.add_middleware(CookieMiddleware)
+        if adapter.tracer is not None:
+            self.app.add_middleware(TracingMiddleware, tracer=adapter.tracer)
+        self.app.add_exception_handler(BusOverloadedError, self.bus_overloaded)
         self.router = APIRouter()
         self.router.add_api_route(
             path="/healthcheck", endpoint=self.healthcheck, methods=["GET", "POST"]
@@ -92,23 +135,41 @@ class FastApiWeb(AbstractWeb):
             path="/poll_vote/{item_id}", endpoint=self.poll_vote, methods=["GET"]
         )
         self.router.add_api_route(path="/vote", endpoint=self.vote, methods=["POST"])
-        # self.router.add_api_route(
-        #     path="/metrics", endpoint=self.metrics, methods=["GET"]
-        # )
+        self.router.add_api_route(
+            path="/poll_results/{item_id}/stream",
+            endpoint=self.results_stream,
+            methods=["GET"],
+        )
+        self.router.add_api_route(
+            path="/metrics", endpoint=self.metrics, methods=["GET"]
+        )
         # self.router.add_api_route(
         #     path="/message_text", endpoint=self.message_handler, methods=["POST"]
         # )
         self.app.include_router(self.router)
+        self.app.include_router(JsonApi(adapter=adapter).router)
 
     @staticmethod
     async def healthcheck() -> dict[str, str]:
         print("hhhh")
         return {"status": "ok"}
 
-    async def get_polls(self, request: Request) -> _TemplateResponse:
+    @staticmethod
+    async def bus_overloaded(request: Request, exc: Exception) -> Response:
+        return Response(
+            content="Service is overloaded, try again later",
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={"Retry-After": "1"},
+        )
+
+    async def metrics(self) -> Response:
+        content_type, body = await self.adapter.get_metrics()
+        return Response(content=body, media_type=content_type)
+
+    async def get_polls(self, request: Request, cursor: str = "") -> Response:
         user_id = request.state.user_id
-        response: _TemplateResponse = await self.adapter.get_polls(
-            request=request, user_id=user_id
+        response: Response = await self.adapter.get_polls(
+            request=request, user_id=user_id, cursor=cursor
         )
         return response
 
@@ -146,10 +207,15 @@ class FastApiWeb(AbstractWeb):
         )
         return RedirectResponse("/polls", status_code=status.HTTP_302_FOUND)
 
-    async def poll_vote(self, request: Request, item_id: str) -> _TemplateResponse:
+    async def poll_vote(
+        self, request: Request, item_id: str, already_voted: bool = False
+    ) -> Response:
         user_id = request.state.user_id
-        response: _TemplateResponse = await self.adapter.poll_vote(
-            request=request, item_id=item_id, user_id=user_id
+        response: Response = await self.adapter.poll_vote(
+            request=request,
+            item_id=item_id,
+            user_id=user_id,
+            already_voted=already_voted,
         )
         return response
 
@@ -161,13 +227,31 @@ class FastApiWeb(AbstractWeb):
             raise
         user_id = request.state.user_id
         referer_id = request.headers.get("Referer")
+        try:
+            saved = await self.adapter.create_vote(
+                variant_id=variant_id, user_id=user_id
+            )
+        except UnknownVariantError:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
         if not referer_id:
-            _ = await self.adapter.create_vote(variant_id=variant_id, user_id=user_id)
             return RedirectResponse("/polls", status_code=status.HTTP_302_FOUND)
-        poll_id = referer_id.split("/")[-1]
-        _ = await self.adapter.create_vote(variant_id=variant_id, user_id=user_id)
-        return RedirectResponse(
-            f"/poll_vote/{poll_id}", status_code=status.HTTP_302_FOUND
+        poll_id = referer_id.split("?")[0].split("/")[-1]
+        # повторный голос не записан, страница результатов скажет об этом
+        url = (
+            f"/poll_vote/{poll_id}"
+            if saved
+            else f"/poll_vote/{poll_id}?already_voted=1"
+        )
+        return RedirectResponse(url, status_code=status.HTTP_302_FOUND)
+
+    async def results_stream(self, item_id: str) -> Response:
+        stream = await self.adapter.results_stream(item_id=item_id)
+        if stream is None:
+            return Response(status_code=status.HTTP_404_NOT_FOUND)
+        return StreamingResponse(
+            stream,
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
         )
 
     @staticmethod
@@ -185,7 +269,7 @@ class FastApiWeb(AbstractWeb):
         del log_config["formatters"]["default"]["use_colors"]
         return log_config
 
-    async def start(self) -> None:
+    async def start(self, sockets: list[socket.socket] | None = None) -> None:
         config = uvicorn.Config(
             self.app,
             host=self.host,
@@ -194,4 +278,4 @@ class FastApiWeb(AbstractWeb):
             access_log=False,
         )
         server = uvicorn.Server(config)
-        await server.serve()
+        await server.serve(sockets=sockets)
@@ -1,20 +1,42 @@
+import asyncio
+import json
 import typing as tp
 from abc import ABC
 from abc import abstractmethod
 
+from fastapi import HTTPException
 from fastapi import Request
+from fastapi import Response
+from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
+from starlette import status
 from starlette.templating import _TemplateResponse
 
 from src.domain.events import CreatePoll
-from src.domain.events import GetPollIds
-from src.domain.events import GetPollsByIds
+from src.domain.events import GetPollResult
+from src.domain.events import GetPollsPage
+from src.domain.events import GetPollView
+from src.domain.events import PollCreated
 from src.domain.events import PollResult
-from src.domain.events import Polls
-from src.domain.events import PollsIds
+from src.domain.events import PollsPage
+from src.domain.events import PollView
 from src.domain.events import VoteEvent
+from src.domain.events import VoteSaved
+from src.domain.models import PollWithResults
+from src.domain.models import SimplePoll
 from src.domain.models import SimpleVote
+from src.domain.processors import ResultsBroadcaster
+from src.domain.versions import DataVersion
 from src.services.message_bus import MessageBus
+from src.services.metrics import CONTENT_TYPE
+from src.services.metrics import BusMetrics
+from src.services.tracing import Tracer
+from src.web.page_cache import PageCache
+from src.web.page_cache import PageKey
+
+
+class UnknownVariantError(Exception):
+    """Vote is for variant which does not exist"""
 
 
 class AbstractWebAdapter(ABC):
@@ -23,12 +45,21 @@ class AbstractWebAdapter(ABC):
         # uow: tp.Type[AbstractUOWFactory],
         # ctx_repo: AbstractContextRepo,
         bus: MessageBus,
-        # metrics_processor: AbstractMetricsProcessor,
+        metrics: BusMetrics | None = None,
+        tracer: Tracer | None = None,
+        live_results: ResultsBroadcaster | None = None,
+        versions: DataVersion | None = None,
+        page_cache: PageCache | None = None,
     ) -> None:
         # self.uow = uow
         # self.ctx_repo = ctx_repo
         self.bus = bus
-        # self.metrics_processor = metrics_processor
+        self.live_results = live_results
+        # страницы кэшируются, только если известны версии данных
+        self.versions = versions
+        self.page_cache = page_cache if versions is not None else None
+        self.metrics = metrics
+        self.tracer = tracer
 
     @abstractmethod
     async def message_handler(
@@ -37,12 +68,14 @@ class AbstractWebAdapter(ABC):
         """Process income message"""
 
     @abstractmethod
-    async def get_metrics(self) -> tuple[tp.Any, bytes]:
-        """Get collected prometheus metrics"""
+    async def get_metrics(self) -> tuple[str, bytes]:
+        """Get content type and collected prometheus metrics"""
 
     @abstractmethod
-    async def get_polls(self, request: Request, user_id: str) -> _TemplateResponse:
-        """Return polls list"""
+    async def get_polls(
+        self, request: Request, user_id: str, cursor: str = ""
+    ) -> Response:
+        """Return page of polls list"""
 
     @abstractmethod
     async def new_poll(self, request: Request) -> _TemplateResponse:
@@ -56,55 +89,132 @@ class AbstractWebAdapter(ABC):
 
     @abstractmethod
     async def poll_vote(
-        self, request: Request, item_id: str, user_id: str
-    ) -> _TemplateResponse:
+        self, request: Request, item_id: str, user_id: str, already_voted: bool = False
+    ) -> Response:
         """Page for vote in poll"""
 
     @abstractmethod
     async def create_vote(self, variant_id: str, user_id: str) -> bool:
-        """Create vote in poll"""
+        """
+        Create vote in poll, return False if user already voted in poll.
+        UnknownVariantError is raised if variant does not exist.
+        """
+
+    @abstractmethod
+    async def results_stream(self, item_id: str) -> tp.AsyncIterator[str] | None:
+        """Server-sent events with poll results, None if poll is unknown"""
+
+    @abstractmethod
+    async def get_polls_page(
+        self, user_id: str, cursor: str = "", limit: int | None = None
+    ) -> PollsPage:
+        """Page of polls summaries"""
+
+    @abstractmethod
+    async def get_poll_view(self, item_id: str, user_id: str) -> PollWithResults | None:
+        """Poll with results and voted flag, None if poll is unknown"""
+
+    @abstractmethod
+    async def get_poll_results(self, item_id: str, user_id: str) -> dict[str, int]:
+        """Results of poll as variant_name: votes, empty if poll is unknown"""
+
+    @abstractmethod
+    async def create_poll(
+        self, name: str, description: str, variants: list[str], user_id: str
+    ) -> SimplePoll:
+        """Create poll and return it"""
+
+    @abstractmethod
+    async def create_votes(self, variant_ids: list[str], user_id: str) -> list[bool]:
+        """Create votes of user, return saved flag for every vote"""
 
 
 class WebAdapter(AbstractWebAdapter):
+    # сколько секунд ждать ответа шины
+    request_timeout = 10.0
+    polls_page_size = 50
+    # пустое сообщение в потоке результатов, чтобы прокси не рвали соединение
+    stream_heartbeat = 15.0
+
     def __init__(
         self,
         # uow: tp.Type[AbstractUOWFactory],
         # ctx_repo: AbstractContextRepo,
         bus: MessageBus,
-        # metrics_processor: AbstractMetricsProcessor,
+        metrics: BusMetrics | None = None,
+        tracer: Tracer | None = None,
+        live_results: ResultsBroadcaster | None = None,
+        versions: DataVersion | None = None,
+        page_cache: PageCache | None = None,
     ) -> None:
         super().__init__(
             # uow=uow,
             # ctx_repo=ctx_repo,
             bus=bus,
-            # metrics_processor=metrics_processor,
+            metrics=metrics,
+            tracer=tracer,
+            live_results=live_results,
+            versions=versions,
+            page_cache=page_cache,
         )
         self.templates = Jinja2Templates(directory="templates")
 
-    async def get_metrics(self) -> tuple[tp.Any, bytes]:
-        # return await self.metrics_processor.get_metrics()
-        return 1, b"0"
+    async def get_metrics(self) -> tuple[str, bytes]:
+        if self.metrics is None:
+            return CONTENT_TYPE, b""
+        return CONTENT_TYPE, self.metrics.render()
 
     # @staticmethod
     # def _get_headers(headers: tp.List[tp.List[str]]) -> tp.Dict[str, str]:
     #     return {header: value for header, value in headers}
     #
 
-    async def get_polls(self, request: Request, user_id: str) -> _TemplateResponse:
-        """Return polls list"""
-        polls_ids_request = GetPollIds(
-            sender_user_id=user_id, track_for_event_class=[PollsIds]
-        )
-        polls_ids: PollsIds = await self.bus.public_message(message=polls_ids_request)  # type: ignore
+    async def render_cached(
+        self,
+        request: Request,
+        template: str,
+        key: PageKey,
+        get_context: tp.Callable[[], tp.Awaitable[dict[str, tp.Any]]],
+    ) -> Response:
+        """
+        Render template or take it from page cache.
+        Key has to identify data on the page, get_context is called on miss.
+        """
+        if self.page_cache is None:
+            context = await get_context()
+            return self.templates.TemplateResponse(
+                template, {"request": request} | context
+            )
+        page_key = (template, *key)
+        etag = self.page_cache.etag(page_key)
+        # браузер каждый раз переспрашивает, но получает 304 без тела
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if self.page_cache.not_modified(request, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        page = self.page_cache.get(page_key)
+        if page is None:
+            context = await get_context()
+            page = (
+                self.templates.get_template(template)
+                .render({"request": request} | context)
+                .encode()
+            )
+            self.page_cache.set(page_key, page)
+        return HTMLResponse(page, headers=headers)
 
-        get_poll_request = GetPollsByIds(
-            polls_ids=polls_ids.ids,
-            sender_user_id="",
-            track_for_event_class=[Polls],
-        )
-        res: Polls = await self.bus.public_message(get_poll_request)  # type: ignore
-        return self.templates.TemplateResponse(
-            "all/polls.html", {"request": request, "polls": res.polls}
+    async def get_polls(
+        self, request: Request, user_id: str, cursor: str = ""
+    ) -> Response:
+        """Return page of polls list"""
+
+        async def get_context() -> dict[str, tp.Any]:
+            res = await self.get_polls_page(user_id=user_id, cursor=cursor)
+            return {"polls": res.polls, "next_cursor": res.next_cursor}
+
+        # список зависит только от опросов, голоса его не меняют
+        polls_version = self.versions.polls if self.versions is not None else 0
+        return await self.render_cached(
+            request, "all/polls.html", (cursor, polls_version), get_context
         )
 
     async def new_poll(self, request: Request) -> _TemplateResponse:
@@ -127,48 +237,157 @@ class WebAdapter(AbstractWebAdapter):
         return True
 
     async def poll_vote(
-        self, request: Request, item_id: str, user_id: str
-    ) -> _TemplateResponse:
-        get_poll_request = GetPollsByIds(
-            polls_ids=[str(item_id)],
-            sender_user_id=user_id,
-            track_for_event_class=[Polls, PollResult],
+        self, request: Request, item_id: str, user_id: str, already_voted: bool = False
+    ) -> Response:
+        # версии берутся до запроса, чтобы не закэшировать старые данные как новые
+        polls_version, votes_version = (
+            (self.versions.polls, self.versions.votes)
+            if self.versions is not None
+            else (0, 0)
         )
+        view = await self.get_poll_view(item_id=item_id, user_id=user_id)
+        if view is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+        if not view.voted:
 
-        res = await self.bus.public_message(get_poll_request)
-        if isinstance(res, Polls):
-            poll = res.polls[0]
-            return self.templates.TemplateResponse(
-                "all/poll_vote.html", {"request": request, "poll": poll}
-            )
-        elif isinstance(res, PollResult):
-            get_poll_request = GetPollsByIds(
-                polls_ids=[str(item_id)],
-                sender_user_id="not_user",
-                track_for_event_class=[Polls],
-            )
+            async def vote_context() -> dict[str, tp.Any]:
+                return {"poll": view.poll}
 
-            poll_res = await self.bus.public_message(get_poll_request)
-            if not isinstance(poll_res, Polls):
-                raise
-            poll = poll_res.polls[0]
-            return self.templates.TemplateResponse(
-                "all/poll_results.html",
-                {"request": request, "poll": poll, "results": res},
+            return await self.render_cached(
+                request,
+                "all/poll_vote.html",
+                (view.poll.poll_id, polls_version),
+                vote_context,
             )
-        else:
-            raise NotImplementedError
+
+        async def results_context() -> dict[str, tp.Any]:
+            return {
+                "poll": view.poll,
+                "results": view.results,
+                "already_voted": already_voted,
+            }
+
+        return await self.render_cached(
+            request,
+            "all/poll_results.html",
+            (view.poll.poll_id, polls_version, votes_version, already_voted),
+            results_context,
+        )
 
     async def create_vote(self, variant_id: str, user_id: str) -> bool:
-        """Create vote in poll"""
         create_vote = VoteEvent(
             vote=SimpleVote(
                 user_id=user_id,
                 variant_id=variant_id,
             )
         )
-        _ = await self.bus.public_message(create_vote)
-        return True
+        # голос ждет сохранения, но в очереди записей, а не чтений
+        res = await self.bus.request(
+            create_vote, expect=[VoteSaved], timeout=self.request_timeout, write=True
+        )
+        if not isinstance(res, VoteSaved):
+            raise
+        if res.unknown_variant:
+            raise UnknownVariantError(variant_id)
+        return res.saved
+
+    async def get_polls_page(
+        self, user_id: str, cursor: str = "", limit: int | None = None
+    ) -> PollsPage:
+        res = await self.bus.request(
+            GetPollsPage(
+                sender_user_id=user_id,
+                limit=limit or self.polls_page_size,
+                cursor=cursor,
+            ),
+            expect=[PollsPage],
+            timeout=self.request_timeout,
+        )
+        if not isinstance(res, PollsPage):
+            raise
+        return res
+
+    async def get_poll_view(self, item_id: str, user_id: str) -> PollWithResults | None:
+        res = await self.bus.request(
+            GetPollView(sender_user_id=user_id, poll_id=str(item_id)),
+            expect=[PollView],
+            timeout=self.request_timeout,
+        )
+        if not isinstance(res, PollView):
+            raise
+        return res.view
+
+    async def get_poll_results(self, item_id: str, user_id: str) -> dict[str, int]:
+        res = await self.bus.request(
+            GetPollResult(sender_user_id=user_id, poll_id=str(item_id)),
+            expect=[PollResult],
+            timeout=self.request_timeout,
+        )
+        if not isinstance(res, PollResult):
+            raise
+        return res.results
+
+    async def create_poll(
+        self, name: str, description: str, variants: list[str], user_id: str
+    ) -> SimplePoll:
+        res = await self.bus.request(
+            CreatePoll(
+                creator_id=user_id,
+                name=name,
+                description=description,
+                is_open=True,
+                variants=variants,
+            ),
+            expect=[PollCreated],
+            timeout=self.request_timeout,
+        )
+        if not isinstance(res, PollCreated):
+            raise
+        return res.poll
+
+    async def create_votes(self, variant_ids: list[str], user_id: str) -> list[bool]:
+        # VoteSaver сам собирает одновременные голоса в одну запись
+        return list(
+            await asyncio.gather(
+                *(
+                    self._create_vote_or_false(variant_id=variant_id, user_id=user_id)
+                    for variant_id in variant_ids
+                )
+            )
+        )
+
+    async def _create_vote_or_false(self, variant_id: str, user_id: str) -> bool:
+        # в пачке неизвестный вариант - просто не сохраненный голос
+        try:
+            return await self.create_vote(variant_id=variant_id, user_id=user_id)
+        except UnknownVariantError:
+            return False
+
+    async def results_stream(self, item_id: str) -> tp.AsyncIterator[str] | None:
+        """Server-sent events with poll results, None if poll is unknown"""
+        if self.live_results is None or not await self.live_results.has_poll(item_id):
+            return None
+        return self._results_events(self.live_results, item_id)
+
+    async def _results_events(
+        self, live_results: ResultsBroadcaster, poll_id: str
+    ) -> tp.AsyncIterator[str]:
+        queue = await live_results.subscribe(poll_id)
+        try:
+            while True:
+                try:
+                    update = await asyncio.wait_for(
+                        queue.get(), timeout=self.stream_heartbeat
+                    )
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if update is None:
+                    return
+                data = json.dumps(update, ensure_ascii=False)
+                yield f"event: results\ndata: {data}\n\n"
+        finally:
+            live_results.unsubscribe(poll_id, queue)
 
     async def message_handler(
         self, unparsed_event: tp.Dict[str, tp.Any]
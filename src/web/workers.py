@@ -0,0 +1,53 @@
+import logging
+import multiprocessing
+import signal
+import socket
+import typing as tp
+from types import FrameType
+
+from src.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+Worker = tp.Callable[[Settings, socket.socket], None]
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_workers(settings: Settings, worker: Worker) -> None:
+    """
+    Bind socket once and serve it by settings.web_workers processes.
+    Worker has to be module level function, processes are spawned.
+    """
+    sock = bind_socket(settings.host, settings.port)
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=worker, args=(settings, sock), name=f"edec-web-{n}")
+        for n in range(settings.web_workers)
+    ]
+    for process in processes:
+        process.start()
+    logger.info(
+        f"Started {len(processes)} web workers on {settings.host}:{settings.port}"
+    )
+
+    def stop(signum: int, frame: FrameType | None) -> None:
+        # воркеры сами корректно завершаются по SIGTERM
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        for process in processes:
+            process.join()
+    finally:
+        sock.close()
@@ -0,0 +1,119 @@
+import json
+import typing as tp
+
+import pytest
+from fastapi import HTTPException
+from fastapi import Request
+
+from src.domain.processors import PollGetter
+from src.domain.processors import PollSaver
+from src.domain.processors import VoteCounter
+from src.domain.processors import VoteSaver
+from src.services.db_adapter import FakeDbAdapter
+from src.services.message_bus import ConcreteMessageBus
+from src.web.api import JsonApi
+from src.web.serialization import ApiResponse
+from src.web.serialization import dumps
+from src.web.web_adapter import WebAdapter
+
+
+def make_request(user_id: str, body: tp.Any = None) -> Request:
+    data = json.dumps(body).encode() if body is not None else b""
+
+    async def receive() -> dict[str, tp.Any]:
+        return {"type": "http.request", "body": data, "more_body": False}
+
+    return Request(
+        {
+            "type": "http",
+            "method": "POST",
+            "path": "/",
+            "headers": [],
+            "state": {"user_id": user_id},
+        },
+        receive,
+    )
+
+
+def as_json(response: ApiResponse) -> tp.Any:
+    return json.loads(response.body)
+
+
+@pytest.fixture
+def api() -> JsonApi:
+    adapter = FakeDbAdapter(initial=True)
+    bus = ConcreteMessageBus()
+    bus.register(PollSaver(db_adapter=adapter))
+    bus.register(PollGetter(db_adapter=adapter))
+    bus.register(VoteCounter(db_adapter=adapter))
+    bus.register(VoteSaver(db_adapter=adapter, batch_size=10, batch_window=0.01))
+    return JsonApi(adapter=WebAdapter(bus=bus))
+
+
+@pytest.mark.asyncio
+async def test_api_polls(api: JsonApi) -> None:
+    page = as_json(await api.get_polls(make_request("user"), limit=1))
+    assert page == {
+        "polls": [
+            {
+                "poll_id": "1",
+                "name": "Первый опрос",
+                "description": "Описание самого первого опроса в системе",
+                "is_open": True,
+            }
+        ],
+        "next_cursor": "1",
+    }
+
+    created = await api.create_poll(
+        make_request("user", {"name": "API", "variants": ["yes", "no"]})
+    )
+    assert created.status_code == 201
+    poll = as_json(created)
+    assert [v["name"] for v in poll["variants"]] == ["yes", "no"]
+
+    detail = as_json(await api.get_poll(make_request("user"), item_id=poll["poll_id"]))
+    assert detail["poll"] == poll
+    assert detail == {"poll": poll, "results": {"yes": 0, "no": 0}, "voted": False}
+
+    with pytest.raises(HTTPException) as not_found:
+        await api.get_poll(make_request("user"), item_id="404")
+    assert not_found.value.status_code == 404
+    with pytest.raises(HTTPException) as invalid:
+        await api.create_poll(make_request("user", {"name": "", "variants": []}))
+    assert invalid.value.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_api_votes(api: JsonApi) -> None:
+    voted = await api.vote(make_request("user", {"variant_id": "1"}))
+    assert voted.status_code == 201
+    repeated = await api.vote(make_request("user", {"variant_id": "2"}))
+    assert repeated.status_code == 409
+    assert as_json(repeated) == {"variant_id": "2", "saved": False}
+    with pytest.raises(HTTPException) as unknown:
+        await api.vote(make_request("user", {"variant_id": "404"}))
+    assert unknown.value.status_code == 422
+
+    batch = await api.vote_batch(
+        make_request("other", {"variant_ids": ["1", "3", "4", "404"]})
+    )
+    assert as_json(batch)["saved"] == [True, True, False, False]
+
+    results = await api.get_results(make_request("user"), item_id="1")
+    assert as_json(results) == {"poll_id": "1", "results": {"Да": 2, "Нет": 0}}
+    with pytest.raises(HTTPException) as too_big:
+        await api.vote_batch(make_request("user", {"variant_ids": ["1"] * 101}))
+    assert too_big.value.status_code == 422
+    with pytest.raises(HTTPException) as not_json:
+        await api.vote(make_request("user", ["1"]))
+    assert not_json.value.status_code == 400
+
+
+def test_dumps_dataclasses() -> None:
+    view = FakeDbAdapter(initial=True).polls["1"]
+    assert json.loads(dumps(view))["variants"][1] == {
+        "variant_id": "2",
+        "poll_id": "1",
+        "name": "Нет",
+    }
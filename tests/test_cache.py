@@ -0,0 +1,58 @@
+import time
+
+import pytest
+
+from src.services.cache import CachedDbAdapter
+from src.services.cache import TTLCache
+from src.services.db_adapter import FakeDbAdapter
+
+
+def test_ttl_cache(monkeypatch: pytest.MonkeyPatch) -> None:
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    cache: TTLCache[str, int] = TTLCache(max_size=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    # "b" дольше всех не использовался
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+    monkeypatch.setattr(time, "monotonic", lambda: now + 11)
+    assert cache.get("a") is None
+    assert len(cache) == 1
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+@pytest.mark.asyncio
+async def test_cached_adapter() -> None:
+    fake_adapter = FakeDbAdapter(initial=True)
+    adapter = CachedDbAdapter(adapter=fake_adapter, max_size=100, ttl=60)
+
+    assert await adapter.get_polls_ids() == ["1", "2"]
+    polls = await adapter.get_polls(["2", "404", "1"])
+    assert polls == await fake_adapter.get_polls(["2", "1"])
+    assert await adapter.get_polls(["1", "2"]) == [polls[1], polls[0]]
+    assert await adapter.get_polls_ids() == ["1", "2"]
+    assert adapter.stats() == {
+        "polls_hits": 2,
+        "polls_misses": 3,
+        "polls_size": 2,
+        "ids_hits": 1,
+        "ids_misses": 1,
+        "pages_hits": 0,
+        "pages_misses": 0,
+    }
+
+    poll = await adapter.create_poll(
+        creator_id="test_user",
+        name="test_poll",
+        description="test poll for test",
+        is_open=True,
+        variants=["yes", "no"],
+    )
+    assert await adapter.get_polls_ids() == ["1", "2", poll.poll_id]
+
+    await adapter.update_poll(poll_id="1", is_open=False)
+    assert not (await adapter.get_polls(["1"]))[0].is_open
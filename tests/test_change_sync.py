@@ -0,0 +1,73 @@
+from pathlib import Path
+
+import pytest
+
+from src.domain.models import SimpleVote
+from src.domain.processors import ResultsBroadcaster
+from src.domain.tallies import PollTallies
+from src.domain.versions import DataVersion
+from src.services.cache import CachedDbAdapter
+from src.services.change_sync import ChangeSync
+from src.services.message_bus import ConcreteMessageBus
+from src.services.sqlite_adapter import SqliteDbAdapter
+
+
+@pytest.mark.asyncio
+async def test_change_sync(tmp_path: Path) -> None:
+    path = str(tmp_path / "test.sqlite3")
+    other_worker = SqliteDbAdapter(path=path, pool_size=1)
+    storage = SqliteDbAdapter(path=path, pool_size=1)
+    cache = CachedDbAdapter(adapter=storage, max_size=100, ttl=60)
+    tallies = PollTallies(db_adapter=cache)
+    versions = DataVersion()
+    live_results = ResultsBroadcaster(db_adapter=cache, tallies=tallies, tick=60)
+    bus = ConcreteMessageBus()
+    bus.register(live_results)
+    sync = ChangeSync(
+        storage=storage, bus=bus, tallies=tallies, versions=versions, cache=cache
+    )
+
+    poll = await cache.create_poll(
+        creator_id="test_user",
+        name="test_poll",
+        description="test poll for test",
+        is_open=True,
+        variants=["yes", "no"],
+    )
+    yes, no = (variant.variant_id for variant in poll.variants)
+    await sync.start()
+    listener = await live_results.subscribe(poll.poll_id)
+    assert listener.get_nowait() == {
+        "poll_id": poll.poll_id,
+        "delta": {},
+        "results": {"yes": 0, "no": 0},
+    }
+    assert await cache.get_polls_ids() == [poll.poll_id]
+
+    other_poll = await other_worker.create_poll(
+        creator_id="test_user",
+        name="other",
+        description="created by other worker",
+        is_open=True,
+        variants=["yes"],
+    )
+    await other_worker.create_votes(
+        [SimpleVote("first", yes), SimpleVote("second", no), SimpleVote("third", no)]
+    )
+    await sync.sync()
+
+    assert await cache.get_polls_ids() == [poll.poll_id, other_poll.poll_id]
+    assert versions.polls == 1
+    assert versions.votes == 1
+    assert await tallies.get_results(poll.poll_id) == {"yes": 1, "no": 2}
+    await live_results.flush()
+    assert listener.get_nowait() == {
+        "poll_id": poll.poll_id,
+        "delta": {"yes": 1, "no": 2},
+        "results": {"yes": 1, "no": 2},
+    }
+
+    await sync.stop()
+    await bus.stop()
+    await other_worker.close()
+    await storage.close()
@@ -0,0 +1,182 @@
+import dataclasses
+import inspect
+import typing as tp
+
+import pytest
+
+from src.domain import events
+from src.domain import models
+from src.domain.events import GetPollResult
+from src.domain.events import GetPollsPage
+from src.domain.events import PollResult
+from src.domain.events import PollView
+from src.domain.events import VoteSaved
+from src.domain.models import PollWithResults
+from src.domain.models import SimplePoll
+from src.domain.models import SimpleVariant
+from src.domain.models import SimpleVote
+from src.services import codec
+
+POLL = SimplePoll(
+    poll_id="3",
+    creator_id="test_user",
+    name="Опрос",
+    description="test poll for test",
+    is_open=True,
+    variants=(
+        SimpleVariant(variant_id="5", poll_id="3", name="да"),
+        SimpleVariant(variant_id="6", poll_id="3", name="no"),
+    ),
+)
+
+
+def sample(cls: type) -> tp.Any:
+    """Instance of class with every field set"""
+    values: dict[tp.Any, tp.Any] = {
+        str: "value",
+        int: -7,
+        bool: True,
+        list[str]: ["1", "2"],
+        dict[str, int]: {"yes": 3, "no": 0},
+        list[type] | None: [PollResult],
+        SimpleVote: SimpleVote("user", "5"),
+        SimplePoll: POLL,
+        list[SimplePoll]: [POLL],
+        list[models.PollSummary]: [models.PollSummary("3", "name", "", False)],
+        tuple[SimpleVariant, ...]: POLL.variants,
+        PollWithResults | None: PollWithResults(POLL, {"да": 1, "no": 2}, True),
+    }
+    hints = tp.get_type_hints(cls)
+    kwargs = {
+        field.name: values[hints[field.name]]
+        for field in dataclasses.fields(cls)
+        if field.init and field.name not in ("id_", "parent_id")
+    }
+    return cls(**kwargs)
+
+
+def domain_classes() -> list[type]:
+    return [
+        cls
+        for module in (events, models)
+        for _, cls in inspect.getmembers(module, inspect.isclass)
+        if dataclasses.is_dataclass(cls) and cls.__module__ == module.__name__
+    ]
+
+
+def test_all_domain_classes_registered() -> None:
+    assert set(domain_classes()) == set(codec.CLASSES)
+
+
+@pytest.mark.parametrize("cls", codec.CLASSES, ids=lambda cls: cls.__name__)
+def test_codec_roundtrip(cls: type) -> None:
+    value = sample(cls)
+    if isinstance(value, events.Event):
+        value = dataclasses.replace(value, parent_id="not-uuid")
+
+    decoded = codec.decode(codec.encode(value))
+
+    assert decoded == value
+    if isinstance(value, events.Event):
+        # id_ не создается заново при чтении
+        assert decoded.id_ == value.id_
+        assert decoded.parent_id == "not-uuid"
+
+
+def test_decode_from_memoryview() -> None:
+    first = VoteSaved(vote=SimpleVote("user", "5"), saved=True)
+    second = PollView(sender_user_id="user", poll_id="3", view=None)
+    data = memoryview(b"header" + codec.encode(first) + codec.encode(second))
+
+    value, pos = codec.decode_from(data, 6)
+    assert value == first
+    value, pos = codec.decode_from(data, pos)
+    assert value == second
+    assert pos == len(data)
+
+
+def test_older_frame_gets_defaults() -> None:
+    # кадр писался, когда у GetPollsPage еще не было поля cursor
+    struct_codec = codec.STRUCTS[GetPollsPage]
+    event = GetPollsPage(sender_user_id="user", limit=10, cursor="5")
+    out = bytearray((codec.FORMAT_VERSION,))
+    codec.write_uint(out, codec.TAGS[GetPollsPage])
+    codec.write_uint(out, 5)
+    for write, value in zip(struct_codec.writers[:5], struct_codec.get(event)):
+        write(out, value)
+
+    decoded = codec.decode(out)
+    assert decoded.id_ == event.id_
+    assert (decoded.sender_user_id, decoded.limit, decoded.cursor) == ("user", 10, "")
+
+
+@pytest.mark.parametrize(
+    "mutate",
+    [
+        lambda data: bytes((codec.FORMAT_VERSION + 1,)) + data[1:],
+        lambda data: data[:-3],
+        lambda data: data + b"\x00",
+    ],
+    ids=["version", "truncated", "trailing"],
+)
+def test_damaged_frame(mutate: tp.Callable[[bytes], bytes]) -> None:
+    data = codec.encode(GetPollResult(sender_user_id="user", poll_id="3"))
+    with pytest.raises(codec.CodecError):
+        codec.decode(mutate(data))
+
+
+def test_type_codec() -> None:
+    voters = codec.TypeCodec(list[tuple[str, str]])
+    value = [("user", "3"), ("другой", "4")]
+    assert voters.decode(memoryview(voters.encode(value))) == value
+
+
+@pytest.mark.parametrize(
+    ("hint", "value"),
+    [
+        (int, 63),
+        (int, 64),
+        (int, -1),
+        (int, 10**20),
+        (str, "я" * 100),
+        (list[type] | None, None),
+        (list[type] | None, [PollResult, VoteSaved]),
+        (dict[str, int], {"yes": 3, "no": -300}),
+        (list[tuple[str, str]], [("user", "3")] * 200),
+        (tuple[SimpleVariant, ...], POLL.variants),
+        (PollWithResults | None, PollWithResults(POLL, {"да": 1}, False)),
+    ],
+)
+def test_compiled_writer_matches_field_writers(hint: tp.Any, value: tp.Any) -> None:
+    write = codec.type_codec(hint)[0]
+    expected = bytearray()
+    write(expected, value)
+    out = bytearray()
+    codec.compile_writer(hint)(out, value)
+    assert out == expected
+
+
+@pytest.mark.parametrize(
+    "id_",
+    [
+        "",
+        "3f2b8a8e-1c4d-4e5f-9a6b-7c8d9e0f1a2b",
+        "3F2B8A8E-1C4D-4E5F-9A6B-7C8D9E0F1A2B",
+        "3f2b8a8e-1c4d-4e5f-9a6b-7c8d9e0f1a2x",
+        "3f2b8a8e-1c4d-4e5f-9a6b-7c8d9e 0f 1a",
+        "3f2b8a8e-1c4d-4e5f-9a6b-7c8d9e0f-a2b",
+        "42",
+    ],
+)
+def test_compiled_writer_keeps_id_kinds(id_: str) -> None:
+    event = GetPollResult(sender_user_id="user", poll_id="3")
+    object.__setattr__(event, "id_", id_)
+    struct_codec = codec.STRUCTS[GetPollResult]
+    expected = bytearray()
+    codec.write_uint(expected, len(struct_codec.writers))
+    for write, value in zip(struct_codec.writers, struct_codec.get(event)):
+        write(expected, value)
+    out = bytearray()
+    struct_codec.write(out, event)
+    assert out == expected
+    assert codec.decode(codec.encode(event)).id_ == id_
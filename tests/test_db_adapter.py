@@ -0,0 +1,186 @@
+import asyncio
+from array import array
+from pathlib import Path
+
+import pytest
+
+from src.domain.models import SimpleVote
+from src.domain.processors import AbstractAdapter
+from src.services.cache import CachedDbAdapter
+from src.services.columnar_adapter import ColumnarDbAdapter
+from src.services.columnar_adapter import PackedIntSet
+from src.services.db_adapter import FakeDbAdapter
+from src.services.db_adapter import IndexedDbAdapter
+from src.services.sqlite_adapter import SqliteDbAdapter
+
+
+async def fill_adapter(adapter: AbstractAdapter) -> None:
+    poll = await adapter.create_poll(
+        creator_id="test_user",
+        name="test_poll",
+        description="test poll for test",
+        is_open=True,
+        variants=["yes", "no", "maybe"],
+    )
+    for number, variant in enumerate(poll.variants * 3):
+        await adapter.create_vote(
+            user_id=f"user_{number}", variant_id=variant.variant_id
+        )
+    await adapter.update_poll(poll_id=poll.poll_id, is_open=False)
+
+
+@pytest.mark.parametrize("adapter_class", [IndexedDbAdapter, ColumnarDbAdapter])
+@pytest.mark.asyncio
+async def test_indexed_adapter_same_as_fake(
+    adapter_class: type[IndexedDbAdapter],
+) -> None:
+    fake_adapter = FakeDbAdapter(initial=True)
+    indexed_adapter = adapter_class(initial=True)
+    await fill_adapter(fake_adapter)
+    await fill_adapter(indexed_adapter)
+
+    polls_ids = await fake_adapter.get_polls_ids()
+    assert polls_ids == await indexed_adapter.get_polls_ids()
+    assert await fake_adapter.get_polls(
+        polls_ids + ["404"]
+    ) == await indexed_adapter.get_polls(polls_ids + ["404"])
+    for poll_id in polls_ids + ["404"]:
+        assert await fake_adapter.get_votes_count(
+            poll_id=poll_id
+        ) == await indexed_adapter.get_votes_count(poll_id=poll_id)
+        assert await fake_adapter.get_poll_results(
+            poll_id=poll_id, sender_user_id="test_user"
+        ) == await indexed_adapter.get_poll_results(
+            poll_id=poll_id, sender_user_id="test_user"
+        )
+        for user_id in ["user_0", "user_8", "user_9"]:
+            assert await fake_adapter.has_user_voted(
+                user_id=user_id, poll_id=poll_id
+            ) == await indexed_adapter.has_user_voted(user_id=user_id, poll_id=poll_id)
+
+
+@pytest.mark.asyncio
+async def test_polls_page(tmp_path: Path) -> None:
+    adapters: list[AbstractAdapter] = [
+        FakeDbAdapter(),
+        IndexedDbAdapter(),
+        ColumnarDbAdapter(),
+        SqliteDbAdapter(path=str(tmp_path / "test.sqlite3")),
+        CachedDbAdapter(adapter=IndexedDbAdapter(), max_size=10, ttl=60),
+    ]
+    for adapter in adapters:
+        for i in range(5):
+            await adapter.create_poll(
+                creator_id="test_user",
+                name=f"poll_{i}",
+                description="test poll for test",
+                is_open=True,
+                variants=["yes", "no"],
+            )
+        pages: list[list[str]] = []
+        cursor = ""
+        while True:
+            page = await adapter.get_polls_page(limit=2, after=cursor)
+            if not page:
+                break
+            pages.append([poll.name for poll in page])
+            cursor = page[-1].poll_id
+        assert pages == [["poll_0", "poll_1"], ["poll_2", "poll_3"], ["poll_4"]]
+        assert await adapter.get_polls_page(limit=2, after="404") == []
+
+    # начальные опросы тоже попадают в порядок страниц
+    seeded = FakeDbAdapter(initial=True)
+    await seeded.create_poll("test_user", "poll_3", "", True, ["yes"])
+    page = await seeded.get_polls_page(limit=5, after="1")
+    assert [poll.poll_id for poll in page] == ["2", "3"]
+
+
+@pytest.mark.asyncio
+async def test_create_vote_if_absent(tmp_path: Path) -> None:
+    sqlite_adapter = SqliteDbAdapter(path=str(tmp_path / "test.sqlite3"))
+    adapters: list[AbstractAdapter] = [
+        FakeDbAdapter(initial=True),
+        IndexedDbAdapter(initial=True),
+        ColumnarDbAdapter(initial=True),
+        sqlite_adapter,
+        CachedDbAdapter(adapter=IndexedDbAdapter(initial=True), max_size=10, ttl=60),
+    ]
+    for adapter in adapters:
+        poll = await adapter.create_poll(
+            creator_id="test_user",
+            name="test_poll",
+            description="test poll for test",
+            is_open=True,
+            variants=["yes", "no"],
+        )
+        yes, no = [v.variant_id for v in poll.variants]
+        saved = await asyncio.gather(
+            *(
+                adapter.create_vote_if_absent(user_id="user", variant_id=variant_id)
+                for variant_id in [yes, no] * 10
+            )
+        )
+        assert saved.count(True) == 1
+        assert not await adapter.create_vote_if_absent(
+            user_id="other", variant_id="404"
+        )
+        assert await adapter.create_votes(
+            [
+                SimpleVote(user_id="user", variant_id=no),
+                SimpleVote(user_id="other", variant_id=no),
+                SimpleVote(user_id="other", variant_id=yes),
+            ]
+        ) == [False, True, False]
+        assert sum((await adapter.get_votes_count(poll_id=poll.poll_id)).values()) == 2
+        assert await adapter.has_user_voted(user_id="other", poll_id=poll.poll_id)
+    await sqlite_adapter.close()
+
+
+@pytest.mark.asyncio
+async def test_poll_and_voted(tmp_path: Path) -> None:
+    sqlite_adapter = SqliteDbAdapter(path=str(tmp_path / "test.sqlite3"))
+    adapters: list[AbstractAdapter] = [
+        FakeDbAdapter(),
+        IndexedDbAdapter(),
+        ColumnarDbAdapter(),
+        sqlite_adapter,
+        CachedDbAdapter(adapter=IndexedDbAdapter(), max_size=10, ttl=60),
+    ]
+    for adapter in adapters:
+        await fill_adapter(adapter)
+        found = await adapter.get_poll_and_voted(poll_id="1", user_id="user_0")
+        assert found == ((await adapter.get_polls(polls_ids=["1"]))[0], True)
+        not_voted = await adapter.get_poll_and_voted(poll_id="1", user_id="stranger")
+        assert not_voted is not None and not not_voted[1]
+        assert await adapter.get_poll_and_voted(poll_id="404", user_id="user_0") is None
+    await sqlite_adapter.close()
+
+
+def test_packed_int_set() -> None:
+    packed_set = PackedIntSet(bits=2)
+    keys = [0, 1, 2**40 + 7, 2**63, 12345] + list(range(100, 2000, 7))
+    for key in keys:
+        assert packed_set.add(key)
+    assert not packed_set.add(12345)
+    assert len(packed_set) == len(keys)
+    assert all(key in packed_set for key in keys)
+    assert 5 not in packed_set
+    assert 2**40 not in packed_set
+
+
+@pytest.mark.asyncio
+async def test_columnar_recount() -> None:
+    adapter = ColumnarDbAdapter(initial=True)
+    await fill_adapter(adapter)
+    counts = await adapter.get_votes_count(poll_id="3")
+    adapter.variant_counts = array("Q", bytes(8 * len(adapter.variant_counts)))
+    adapter.recount_votes()
+    assert (
+        await adapter.get_votes_count(poll_id="3")
+        == counts
+        == {
+            "6": 3,
+            "7": 3,
+            "8": 3,
+        }
+    )
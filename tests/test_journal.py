@@ -0,0 +1,132 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from src.domain.events import CreatePoll
+from src.domain.events import PollCreated
+from src.domain.events import VoteEvent
+from src.domain.events import VoteSaved
+from src.domain.models import SimpleVote
+from src.domain.processors import PollSaver
+from src.domain.processors import VoteSaver
+from src.services.db_adapter import IndexedDbAdapter
+from src.services.journal import EventJournal
+from src.services.message_bus import ConcreteMessageBus
+
+
+async def run_app(
+    directory: Path,
+    votes: list[tuple[str, int]],
+    snapshot_every: int = 100000,
+    crash: bool = False,
+) -> IndexedDbAdapter:
+    """Restore storage from journal, create poll and vote like one app run"""
+    storage = IndexedDbAdapter(initial=True)
+    journal = EventJournal(
+        db_adapter=storage,
+        directory=str(directory),
+        fsync_interval=0.001,
+        snapshot_every=snapshot_every,
+    )
+    await journal.replay()
+    bus = ConcreteMessageBus(early_return=True)
+    bus.register(PollSaver(db_adapter=storage, journal=journal))
+    bus.register(VoteSaver(db_adapter=storage, journal=journal))
+
+    created = await bus.request(
+        CreatePoll(
+            creator_id="test_user",
+            name="test_poll",
+            description="test poll for test",
+            is_open=True,
+            variants=["yes", "no"],
+        ),
+        expect=[PollCreated],
+    )
+    assert isinstance(created, PollCreated)
+    for user_id, variant in votes:
+        await bus.request(
+            VoteEvent(
+                vote=SimpleVote(user_id, created.poll.variants[variant].variant_id)
+            ),
+            expect=[VoteSaved],
+        )
+    if crash:
+        # процесс упал сразу после ответов: без остановки шины и сброса журнала
+        assert not journal.buffer and journal.fd is not None
+        os.close(journal.fd)
+        journal.executor.shutdown()
+        return storage
+    await bus.stop()
+    await journal.close()
+    return storage
+
+
+async def restore(directory: Path) -> IndexedDbAdapter:
+    storage = IndexedDbAdapter(initial=True)
+    journal = EventJournal(db_adapter=storage, directory=str(directory))
+    await journal.replay()
+    await journal.close()
+    return storage
+
+
+def state(storage: IndexedDbAdapter) -> tuple[object, ...]:
+    return (
+        storage.polls,
+        storage.variant_votes,
+        storage.voted,
+        storage.votes_count,
+        storage.poll_order,
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("snapshot_every", [100000, 2])
+async def test_journal_restores_storage(tmp_path: Path, snapshot_every: int) -> None:
+    await run_app(tmp_path, [("a", 0), ("b", 1), ("a", 1)], snapshot_every)
+    written = await run_app(tmp_path, [("a", 0), ("c", 0)], snapshot_every)
+
+    restored = await restore(tmp_path)
+
+    assert state(restored) == state(written)
+    assert await restored.get_poll_results("3", "a") == {"yes": 1, "no": 1}
+    assert await restored.get_poll_results("4", "a") == {"yes": 2, "no": 0}
+    assert await restored.has_user_voted("a", "3")
+    assert not await restored.has_user_voted("c", "3")
+    # повтор голоса после восстановления не сохраняется
+    variant_id = restored.polls["3"].variants[0].variant_id
+    assert not await restored.create_vote_if_absent("a", variant_id)
+    if snapshot_every == 2:
+        # остается последний снимок и сегменты после него
+        (snapshot,) = tmp_path.glob("snapshot-*")
+        covered = int(snapshot.stem.split("-")[1])
+        assert all(
+            int(path.stem.split("-")[1]) > covered
+            for path in tmp_path.glob("journal-*")
+        )
+
+
+@pytest.mark.asyncio
+async def test_journal_keeps_acked_votes(tmp_path: Path) -> None:
+    written = await run_app(tmp_path, [("a", 0), ("b", 1)], crash=True)
+
+    restored = await restore(tmp_path)
+
+    assert state(restored) == state(written)
+    assert await restored.get_poll_results("3", "a") == {"yes": 1, "no": 1}
+
+
+@pytest.mark.asyncio
+async def test_journal_torn_tail(tmp_path: Path) -> None:
+    written = await run_app(tmp_path, [("a", 0), ("b", 1)])
+    segment = max(tmp_path.glob("journal-*.log"))
+    size = segment.stat().st_size
+    with open(segment, "ab") as file:
+        # запись оборвалась при сбое посреди нагрузки
+        file.write(b"\x40\x00\x00\x00\x00\x00\x00\x00\x02[")
+
+    restored = await restore(tmp_path)
+
+    assert state(restored) == state(written)
+    assert segment.stat().st_size == size
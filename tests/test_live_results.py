@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from src.domain.events import VoteEvent
+from src.domain.models import SimpleVote
+from src.domain.processors import ResultsBroadcaster
+from src.domain.processors import VoteSaver
+from src.domain.tallies import PollTallies
+from src.services.db_adapter import FakeDbAdapter
+from src.services.message_bus import ConcreteMessageBus
+
+
+@pytest.mark.asyncio
+async def test_results_pushed_once_per_tick() -> None:
+    adapter = FakeDbAdapter(initial=True)
+    tallies = PollTallies(db_adapter=adapter)
+    broadcaster = ResultsBroadcaster(db_adapter=adapter, tallies=tallies, tick=0.05)
+
+    bus = ConcreteMessageBus()
+    bus.register(VoteSaver(db_adapter=adapter, tallies=tallies))
+    bus.register(broadcaster)
+
+    assert await broadcaster.has_poll("1")
+    assert not await broadcaster.has_poll("404")
+    first = await broadcaster.subscribe("1")
+    second = await broadcaster.subscribe("1")
+    for queue in (first, second):
+        assert queue.get_nowait() == {
+            "poll_id": "1",
+            "delta": {},
+            "results": {"Да": 0, "Нет": 0},
+        }
+
+    votes = [("a", "1"), ("b", "1"), ("c", "2"), ("a", "2"), ("d", "3")]
+    for user_id, variant_id in votes:
+        await bus.public_message(
+            VoteEvent(vote=SimpleVote(user_id=user_id, variant_id=variant_id))
+        )
+    assert first.empty()
+
+    # голоса за тик приходят одним обновлением, повтор и чужой опрос не видны
+    for queue in (first, second):
+        update = await asyncio.wait_for(queue.get(), timeout=1)
+        assert update == {
+            "poll_id": "1",
+            "delta": {"Да": 2, "Нет": 1},
+            "results": {"Да": 2, "Нет": 1},
+        }
+
+    broadcaster.unsubscribe("1", second)
+    await bus.public_message(VoteEvent(vote=SimpleVote(user_id="e", variant_id="2")))
+    await bus.stop()
+    assert first.get_nowait() == {
+        "poll_id": "1",
+        "delta": {"Нет": 1},
+        "results": {"Да": 2, "Нет": 2},
+    }
+    assert first.get_nowait() is None
+    assert second.empty()
+
+
+@pytest.mark.asyncio
+async def test_slow_listener_keeps_latest() -> None:
+    adapter = FakeDbAdapter(initial=True)
+    tallies = PollTallies(db_adapter=adapter)
+    broadcaster = ResultsBroadcaster(
+        db_adapter=adapter, tallies=tallies, listener_queue_size=2
+    )
+    vote_saver = VoteSaver(db_adapter=adapter, tallies=tallies)
+    queue = await broadcaster.subscribe("1")
+
+    for i in range(5):
+        for event in await vote_saver.process(
+            VoteEvent(vote=SimpleVote(user_id=f"user_{i}", variant_id="1"))
+        ):
+            await broadcaster.process(event)
+        await broadcaster.flush()
+    assert queue.qsize() == 2
+    queue.get_nowait()
+    assert queue.get_nowait()["results"] == {"Да": 5, "Нет": 0}  # type: ignore
+    await broadcaster.close()
@@ -7,11 +7,19 @@ import pytest
 from src.domain.events import Event
 from src.domain.events import GetPollResult
 from src.domain.events import PollResult
+from src.domain.events import VoteEvent
+from src.domain.events import VoteSaved
+from src.domain.models import SimpleVote
 from src.domain.processors import AbstractAdapter
 from src.domain.processors import BaseProcessor
 from src.domain.processors import VoteCounter
+from src.domain.processors import VoteSaver
+from src.services.db_adapter import FakeDbAdapter
+from src.services.message_bus import BusOverloadedError
 from src.services.message_bus import ConcreteMessageBus
 from src.services.message_bus import MessageBus
+from src.services.message_bus import NoResponseError
+from src.services.message_bus import WorkerPoolMessageBus
 
 
 @pytest.mark.asyncio
@@ -33,7 +41,7 @@ async def test_message_bus_returning(fake_db_adapter: AbstractAdapter) -> None:
 # будет ли бесконечно крутиться вызов .public_message если будут прилетать новые сообщения
 @pytest.mark.asyncio
 async def test_message_bus_for_infinite(fake_db_adapter: AbstractAdapter) -> None:
-    @dataclass
+    @dataclass(frozen=True)
     class TestEvent(Event):
         wait_for: int | float
 
@@ -53,7 +61,7 @@ async def test_message_bus_for_infinite(fake_db_adapter: AbstractAdapter) -> Non
         await internal_bus.public_message(message=wait_event)
         return None
 
-    async def normal_bus_call(internal_bus: MessageBus) -> Event:
+    async def normal_bus_call(internal_bus: MessageBus) -> tuple[Event, float]:
         start_time = time.time()
         wait_event = TestEvent(wait_for=1.5)
         probe_event = GetPollResult(
@@ -62,24 +70,267 @@ async def test_message_bus_for_infinite(fake_db_adapter: AbstractAdapter) -> Non
         result = await internal_bus.public_message(message=[probe_event, wait_event])
         if result is None:
             raise
-        result.execute_time = time.time() - start_time  # type: ignore
-        return result
+        # события неизменяемые, время выполнения возвращается отдельно
+        return result, time.time() - start_time
 
     bus = ConcreteMessageBus()
     bus.register(vote_counter)
     bus.register(sleep_processor)
 
     res = await asyncio.gather(
-        delayed_bus_call(internal_bus=bus),
-        normal_bus_call(internal_bus=bus)
+        delayed_bus_call(internal_bus=bus), normal_bus_call(internal_bus=bus)
     )
 
     assert len(res) == 2
     for item in res:
         if item is None:
             continue
-        assert isinstance(item, PollResult)
-        assert item.execute_time < 1.6  # type: ignore
+        result, execute_time = item
+        assert isinstance(result, PollResult)
+        assert execute_time < 1.6
         break
     else:
         raise
+
+
+@dataclass(frozen=True)
+class SleepEvent(Event):
+    wait_for: float
+
+
+@dataclass(frozen=True)
+class SleptEvent(Event):
+    processor_name: str
+
+
+class SleepProcessor(BaseProcessor):
+    def __init__(self, db_adapter: AbstractAdapter, name: str) -> None:
+        super().__init__(db_adapter=db_adapter)
+        self.name = name
+
+    async def process(self, event: Event) -> list[Event]:
+        if not isinstance(event, SleepEvent):
+            return []
+        await asyncio.sleep(event.wait_for)
+        out_event = SleptEvent(processor_name=self.name)
+        out_event = await self.set_event_parent_id(event, out_event)
+        return [out_event]
+
+
+class FailingProcessor(BaseProcessor):
+    async def process(self, event: Event) -> list[Event]:
+        raise ValueError("failed")
+
+
+class RecordingProcessor(BaseProcessor):
+    def __init__(self, db_adapter: AbstractAdapter) -> None:
+        super().__init__(db_adapter=db_adapter)
+        self.received: list[Event] = []
+
+    async def process(self, event: Event) -> list[Event]:
+        self.received.append(event)
+        return []
+
+
+@pytest.mark.asyncio
+async def test_message_bus_concurrent_dispatch(
+    fake_db_adapter: AbstractAdapter,
+) -> None:
+    recorder = RecordingProcessor(db_adapter=fake_db_adapter)
+
+    bus = ConcreteMessageBus(concurrent=True)
+    for name in ["first", "second", "third"]:
+        bus.register(SleepProcessor(db_adapter=fake_db_adapter, name=name))
+    bus.register(recorder)
+
+    start_time = time.time()
+    await bus.public_message(SleepEvent(wait_for=0.3))
+
+    assert time.time() - start_time < 0.6
+    # дочерние события в порядке регистрации подписчиков
+    assert [
+        e.processor_name for e in recorder.received if isinstance(e, SleptEvent)
+    ] == ["first", "second", "third"]
+
+
+@pytest.mark.asyncio
+async def test_message_bus_error_isolation(fake_db_adapter: AbstractAdapter) -> None:
+    for concurrent in [False, True]:
+        bus = ConcreteMessageBus(concurrent=concurrent)
+        bus.register(FailingProcessor(db_adapter=fake_db_adapter))
+        bus.register(VoteCounter(db_adapter=fake_db_adapter))
+        with pytest.raises(ValueError):
+            await bus.public_message(GetPollResult(poll_id="1", sender_user_id="u"))
+
+        isolated_bus = ConcreteMessageBus(concurrent=concurrent, isolate_errors=True)
+        isolated_bus.register(FailingProcessor(db_adapter=fake_db_adapter))
+        isolated_bus.register(VoteCounter(db_adapter=fake_db_adapter))
+        res = await isolated_bus.public_message(
+            GetPollResult(
+                poll_id="1", sender_user_id="u", track_for_event_class=[PollResult]
+            )
+        )
+        assert isinstance(res, PollResult)
+
+
+@pytest.mark.asyncio
+async def test_message_bus_routing(fake_db_adapter: AbstractAdapter) -> None:
+    class PollResultRecorder(RecordingProcessor):
+        handled_events = (PollResult,)
+
+    vote_counter = VoteCounter(db_adapter=fake_db_adapter)
+    all_recorder = RecordingProcessor(db_adapter=fake_db_adapter)
+    result_recorder = PollResultRecorder(db_adapter=fake_db_adapter)
+
+    bus = ConcreteMessageBus()
+    bus.register(vote_counter)
+    bus.register(all_recorder)
+    bus.register(result_recorder)
+
+    assert bus.get_handlers(GetPollResult) == [vote_counter, all_recorder]
+    assert bus.get_handlers(PollResult) == [all_recorder, result_recorder]
+
+    await bus.public_message(GetPollResult(poll_id="1", sender_user_id="u"))
+    assert [e.__class__ for e in all_recorder.received] == [GetPollResult, PollResult]
+    assert [e.__class__ for e in result_recorder.received] == [PollResult]
+
+    bus.unregister(all_recorder)
+    assert bus.get_handlers(PollResult) == [result_recorder]
+
+
+@pytest.mark.asyncio
+async def test_message_bus_early_return(
+    fake_db_adapter: AbstractAdapter, caplog: pytest.LogCaptureFixture
+) -> None:
+    class SideEffectProcessor(BaseProcessor):
+        handled_events = (GetPollResult,)
+
+        async def process(self, event: Event) -> list[Event]:
+            return [SleepEvent(wait_for=0.5)]
+
+    class FailingOnResult(FailingProcessor):
+        handled_events = (PollResult,)
+
+    sleep_processor = SleepProcessor(db_adapter=fake_db_adapter, name="sleep")
+
+    bus = ConcreteMessageBus(early_return=True)
+    bus.register(VoteCounter(db_adapter=fake_db_adapter))
+    bus.register(SideEffectProcessor(db_adapter=fake_db_adapter))
+    bus.register(FailingOnResult(db_adapter=fake_db_adapter))
+    bus.register(sleep_processor)
+
+    start_time = time.time()
+    res = await bus.public_message(
+        GetPollResult(
+            poll_id="1", sender_user_id="test_user", track_for_event_class=[PollResult]
+        )
+    )
+    assert isinstance(res, PollResult)
+    assert time.time() - start_time < 0.3
+    assert len(bus.background_tasks) == 1
+
+    await bus.wait_background_tasks()
+    assert not bus.background_tasks
+    assert "Background cascade failed" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_message_bus_request(fake_db_adapter: AbstractAdapter) -> None:
+    bus = ConcreteMessageBus()
+    bus.register(VoteCounter(db_adapter=fake_db_adapter))
+    bus.register(SleepProcessor(db_adapter=fake_db_adapter, name="sleep"))
+
+    results = await asyncio.gather(
+        *(
+            bus.request(
+                GetPollResult(poll_id=poll_id, sender_user_id="test_user"),
+                expect=[PollResult],
+                timeout=1,
+            )
+            for poll_id in ["1", "2", "1"]
+        )
+    )
+    assert [r.poll_id for r in results if isinstance(r, PollResult)] == ["1", "2", "1"]
+    assert not bus.waiters
+
+    with pytest.raises(asyncio.TimeoutError):
+        await bus.request(SleepEvent(wait_for=0.5), expect=[SleptEvent], timeout=0.1)
+    assert not bus.waiters
+
+    with pytest.raises(NoResponseError):
+        await bus.request(
+            GetPollResult(poll_id="1", sender_user_id="test_user"),
+            expect=[SleptEvent],
+            timeout=1,
+        )
+    await bus.wait_background_tasks()
+
+
+@pytest.mark.asyncio
+async def test_worker_pool_message_bus(fake_db_adapter: AbstractAdapter) -> None:
+    sleep_processor = SleepProcessor(db_adapter=fake_db_adapter, name="sleep")
+    recorder = RecordingProcessor(db_adapter=fake_db_adapter)
+
+    bus = WorkerPoolMessageBus(workers=1, request_workers=1, max_queue_size=2)
+    bus.register(VoteCounter(db_adapter=fake_db_adapter))
+    bus.register(sleep_processor)
+    bus.register(recorder)
+
+    # публикация подтверждается сразу после постановки в очередь
+    start_time = time.time()
+    assert await bus.public_message(SleepEvent(wait_for=0.3)) is None
+    assert await bus.public_message(SleepEvent(wait_for=0.3)) is None
+    assert time.time() - start_time < 0.1
+    with pytest.raises(BusOverloadedError):
+        await bus.public_message([SleepEvent(wait_for=0.3), SleepEvent(wait_for=0.3)])
+
+    # запросы не ждут очередь опубликованных событий
+    res = await bus.request(
+        GetPollResult(poll_id="1", sender_user_id="test_user"),
+        expect=[PollResult],
+        timeout=0.2,
+    )
+    assert isinstance(res, PollResult)
+    with pytest.raises(NoResponseError):
+        await bus.request(
+            GetPollResult(poll_id="1", sender_user_id="test_user"),
+            expect=[SleptEvent],
+            timeout=1,
+        )
+
+    await bus.stop()
+    assert len([e for e in recorder.received if isinstance(e, SleptEvent)]) == 2
+    assert not bus.workers
+
+
+class BatchSizesAdapter(FakeDbAdapter):
+    def __init__(self) -> None:
+        super().__init__(initial=True)
+        self.batches: list[int] = []
+
+    async def create_votes(self, votes: list[SimpleVote]) -> list[bool]:
+        self.batches.append(len(votes))
+        return await super().create_votes(votes)
+
+
+@pytest.mark.asyncio
+async def test_worker_pool_fills_vote_batches() -> None:
+    adapter = BatchSizesAdapter()
+    bus = WorkerPoolMessageBus(workers=2, request_workers=1, prefetch=50)
+    bus.register(VoteSaver(db_adapter=adapter, batch_size=50, batch_window=1))
+
+    saved = await asyncio.gather(
+        *(
+            bus.request(
+                VoteEvent(vote=SimpleVote(user_id=f"user_{n}", variant_id="1")),
+                expect=[VoteSaved],
+                write=True,
+            )
+            for n in range(200)
+        )
+    )
+    await bus.stop()
+
+    assert all(isinstance(res, VoteSaved) and res.saved for res in saved)
+    # пачки полные, а не по голосу на воркер
+    assert adapter.batches == [50] * 4
@@ -0,0 +1,134 @@
+from dataclasses import dataclass
+
+import pytest
+
+from src.domain.events import Event
+from src.domain.events import GetPollResult
+from src.domain.events import PollResult
+from src.domain.processors import BaseProcessor
+from src.domain.processors import VoteCounter
+from src.services.db_adapter import FakeDbAdapter
+from src.services.message_bus import ConcreteMessageBus
+from src.services.message_bus import WorkerPoolMessageBus
+from src.services.metrics import BusMetrics
+from src.services.metrics import Histogram
+from src.services.observed_adapter import ObservedDbAdapter
+
+
+@dataclass(frozen=True)
+class Split(Event):
+    level: int
+
+
+class Splitter(BaseProcessor):
+    """Every Split produces two children until level 3"""
+
+    async def process(self, event: Event) -> list[Event]:
+        if not isinstance(event, Split) or event.level == 3:
+            return []
+        return [
+            await self.set_event_parent_id(event, Split(level=event.level + 1))
+            for _ in range(2)
+        ]
+
+
+class BrokenAdapter(FakeDbAdapter):
+    async def update_poll(self, poll_id: str, is_open: bool) -> bool:
+        raise ConnectionError("storage is down")
+
+
+class Failing(BaseProcessor):
+    async def process(self, event: Event) -> list[Event]:
+        raise ValueError("broken")
+
+
+def test_histogram_render() -> None:
+    histogram = Histogram("latency", "Latency", ("event",), buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 2):
+        histogram.observe(value, ('Vote"Event',))
+
+    assert histogram.render() == [
+        "# HELP latency Latency",
+        "# TYPE latency histogram",
+        'latency_bucket{event="Vote\\"Event",le="0.1"} 2',
+        'latency_bucket{event="Vote\\"Event",le="1"} 3',
+        'latency_bucket{event="Vote\\"Event",le="+Inf"} 4',
+        'latency_sum{event="Vote\\"Event"} 2.65',
+        'latency_count{event="Vote\\"Event"} 4',
+    ]
+
+
+@pytest.mark.asyncio
+async def test_bus_metrics() -> None:
+    bus = ConcreteMessageBus(isolate_errors=True)
+    metrics = BusMetrics(bus=bus)
+    bus.add_observer(metrics)
+    bus.register(Splitter(db_adapter=FakeDbAdapter()))
+    bus.register(Failing(db_adapter=FakeDbAdapter()))
+
+    await bus.public_message(Split(level=1))
+
+    # 1 + 2 + 4 события на трех уровнях
+    assert metrics.dispatch_seconds.counts[("Split",)][-1] == 0
+    assert sum(metrics.dispatch_seconds.counts[("Split",)]) == 7
+    assert sum(metrics.subscriber_seconds.counts[("Splitter", "Split")]) == 7
+    assert metrics.subscriber_errors.values == {("Failing", "Split"): 7}
+    assert metrics.cascade_events.sums[("Split",)] == 7
+    assert metrics.cascade_depth.sums[("Split",)] == 3
+    assert metrics.cascade_fan_out.sums[("Split",)] == 2
+
+    text = metrics.render().decode()
+    assert 'edec_bus_cascade_depth_bucket{event="Split",le="3"} 1' in text
+    errors = 'edec_bus_subscriber_errors_total{subscriber="Failing",event="Split"}'
+    assert f"{errors} 7.0" in text
+    assert 'edec_bus_queue_length{queue="background"} 0' in text
+
+
+@pytest.mark.asyncio
+async def test_bus_metrics_of_request() -> None:
+    bus = WorkerPoolMessageBus(workers=1, request_workers=1)
+    metrics = BusMetrics(bus=bus)
+    bus.add_observer(metrics)
+    bus.register(VoteCounter(db_adapter=FakeDbAdapter(initial=True)))
+
+    response = await bus.request(
+        GetPollResult(sender_user_id="user", poll_id="1"), expect=[PollResult]
+    )
+    await bus.stop()
+
+    assert isinstance(response, PollResult)
+    assert metrics.cascade_events.sums[("GetPollResult",)] == 2
+    assert metrics.cascade_depth.sums[("GetPollResult",)] == 2
+    assert 'edec_bus_queue_length{queue="requests"} 0' in metrics.render().decode()
+
+
+@pytest.mark.asyncio
+async def test_observed_adapter() -> None:
+    metrics = BusMetrics()
+    adapter = ObservedDbAdapter(
+        adapter=BrokenAdapter(initial=True), observers=[metrics]
+    )
+
+    assert await adapter.get_polls_ids() == ["1", "2"]
+    assert await adapter.create_vote(user_id="user", variant_id="1")
+    with pytest.raises(ConnectionError):
+        await adapter.update_poll(poll_id="1", is_open=False)
+
+    assert sum(metrics.adapter_seconds.counts[("get_polls_ids",)]) == 1
+    # create_vote идет через create_vote_if_absent
+    assert sum(metrics.adapter_seconds.counts[("create_vote_if_absent",)]) == 1
+    assert metrics.adapter_errors.values == {("update_poll",): 1}
+
+
+def test_worker_label() -> None:
+    metrics = BusMetrics(worker="4242")
+    metrics.on_adapter_call("get_polls", started=0, elapsed=0.5, error=None)
+    metrics.adapter_errors.inc(("get_polls",))
+
+    text = metrics.render().decode()
+    assert (
+        'edec_adapter_call_seconds_bucket{method="get_polls",worker="4242",le="0.5"} 1'
+        in text
+    )
+    assert 'edec_adapter_call_seconds_count{method="get_polls",worker="4242"} 1' in text
+    assert 'edec_adapter_errors_total{method="get_polls",worker="4242"} 1.0' in text
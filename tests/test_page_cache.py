@@ -0,0 +1,109 @@
+import pytest
+from fastapi import Request
+
+from src.domain.events import CreatePoll
+from src.domain.events import Event
+from src.domain.processors import PollGetter
+from src.domain.processors import PollSaver
+from src.domain.processors import VoteSaver
+from src.domain.versions import DataVersion
+from src.services.db_adapter import FakeDbAdapter
+from src.services.message_bus import ConcreteMessageBus
+from src.web.page_cache import PageCache
+from src.web.web_adapter import WebAdapter
+
+
+def make_request(etag: str = "") -> Request:
+    headers = [(b"if-none-match", etag.encode())] if etag else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+class CountingGetter(PollGetter):
+    calls = 0
+
+    async def process(self, event: Event) -> list[Event]:
+        self.calls += 1
+        return await super().process(event)
+
+
+@pytest.mark.asyncio
+async def test_polls_page_cached_until_polls_change() -> None:
+    adapter = FakeDbAdapter(initial=True)
+    versions = DataVersion()
+    poll_getter = CountingGetter(db_adapter=adapter)
+    bus = ConcreteMessageBus()
+    bus.register(poll_getter)
+    bus.register(PollSaver(db_adapter=adapter, versions=versions))
+    bus.register(VoteSaver(db_adapter=adapter, versions=versions))
+    web_adapter = WebAdapter(
+        bus=bus, versions=versions, page_cache=PageCache(max_size=10)
+    )
+
+    first = await web_adapter.get_polls(make_request(), user_id="user")
+    etag = first.headers["etag"]
+    assert first.status_code == 200
+    assert "Первый опрос".encode() in first.body
+
+    second = await web_adapter.get_polls(make_request(), user_id="other")
+    assert second.body == first.body
+    assert poll_getter.calls == 1
+
+    not_modified = await web_adapter.get_polls(make_request(etag), user_id="user")
+    assert not_modified.status_code == 304
+    assert poll_getter.calls == 1
+
+    # голос список не меняет, новый опрос меняет
+    assert await web_adapter.create_vote(variant_id="1", user_id="user")
+    assert versions.votes == 1
+    assert (await web_adapter.get_polls(make_request(etag), "user")).status_code == 304
+    await bus.public_message(
+        CreatePoll(
+            creator_id="user",
+            name="Третий опрос",
+            description="description",
+            is_open=True,
+            variants=["yes", "no"],
+        )
+    )
+    changed = await web_adapter.get_polls(make_request(etag), user_id="user")
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert "Третий опрос".encode() in changed.body
+    assert poll_getter.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_poll_page_depends_on_votes() -> None:
+    adapter = FakeDbAdapter(initial=True)
+    versions = DataVersion()
+    bus = ConcreteMessageBus()
+    bus.register(PollGetter(db_adapter=adapter))
+    bus.register(VoteSaver(db_adapter=adapter, versions=versions))
+    web_adapter = WebAdapter(
+        bus=bus, versions=versions, page_cache=PageCache(max_size=10)
+    )
+
+    vote_page = await web_adapter.poll_vote(make_request(), item_id="1", user_id="a")
+    assert b'name="radio"' in vote_page.body
+    await web_adapter.create_vote(variant_id="1", user_id="a")
+    results = await web_adapter.poll_vote(make_request(), item_id="1", user_id="a")
+    assert b"data-variant" in results.body
+    etag = results.headers["etag"]
+    # другой пользователь еще не голосовал и видит форму
+    other = await web_adapter.poll_vote(make_request(etag), item_id="1", user_id="b")
+    assert other.status_code == 200 and other.body == vote_page.body
+
+    await web_adapter.create_vote(variant_id="2", user_id="b")
+    updated = await web_adapter.poll_vote(make_request(etag), item_id="1", user_id="a")
+    assert updated.status_code == 200
+
+
+def test_not_modified_header() -> None:
+    page_cache = PageCache(max_size=1)
+    etag = page_cache.etag(("page", 1))
+    assert etag == page_cache.etag(("page", 1)) != page_cache.etag(("page", 2))
+    assert etag != PageCache(max_size=1).etag(("page", 1))
+    assert page_cache.not_modified(make_request(f'"other", W/{etag}'), etag)
+    assert page_cache.not_modified(make_request("*"), etag)
+    assert not page_cache.not_modified(make_request('"other"'), etag)
+    assert not page_cache.not_modified(make_request(), etag)
@@ -1,11 +1,18 @@
+import asyncio
+
 import pytest
 
 from src.domain.events import CreatePoll
 from src.domain.events import GetPollResult
 from src.domain.events import GetPollsByIds
+from src.domain.events import GetPollsPage
+from src.domain.events import GetPollView
 from src.domain.events import PollResult
 from src.domain.events import Polls
+from src.domain.events import PollsPage
+from src.domain.events import PollView
 from src.domain.events import VoteEvent
+from src.domain.events import VoteSaved
 from src.domain.models import SimplePoll
 from src.domain.models import SimpleVote
 from src.domain.processors import AbstractAdapter
@@ -13,6 +20,8 @@ from src.domain.processors import PollGetter
 from src.domain.processors import PollSaver
 from src.domain.processors import VoteCounter
 from src.domain.processors import VoteSaver
+from src.domain.tallies import PollTallies
+from src.services.db_adapter import FakeDbAdapter
 from src.services.message_bus import ConcreteMessageBus
 
 
@@ -93,3 +102,138 @@ async def test_make_vote(fake_db_adapter: AbstractAdapter) -> None:
     assert isinstance(res, PollResult)
     assert res.poll_id == created_poll.poll_id
     assert res.results == {"yes": 1, "no": 0}
+
+
+class BatchRecordingAdapter(FakeDbAdapter):
+    def __init__(self) -> None:
+        super().__init__(initial=True)
+        self.batches: list[int] = []
+
+    async def create_votes(self, votes: list[SimpleVote]) -> list[bool]:
+        self.batches.append(len(votes))
+        return await super().create_votes(votes)
+
+
+@pytest.mark.asyncio
+async def test_batch_votes() -> None:
+    adapter = BatchRecordingAdapter()
+    vote_saver = VoteSaver(db_adapter=adapter, batch_size=10, batch_window=0.05)
+
+    bus = ConcreteMessageBus()
+    bus.register(vote_saver)
+    bus.register(VoteCounter(db_adapter=adapter))
+
+    results = await asyncio.gather(
+        *(
+            bus.request(
+                VoteEvent(vote=SimpleVote(user_id=f"user_{i}", variant_id="1")),
+                expect=[VoteSaved],
+            )
+            for i in range(25)
+        )
+    )
+    assert adapter.batches == [10, 10, 5]
+    assert all(isinstance(res, VoteSaved) and res.saved for res in results)
+    assert [res.vote.user_id for res in results] == [  # type: ignore
+        f"user_{i}" for i in range(25)
+    ]
+
+    # при остановке шины недописанная пачка сохраняется
+    vote_task = asyncio.create_task(
+        vote_saver.process(VoteEvent(vote=SimpleVote(user_id="last", variant_id="2")))
+    )
+    await asyncio.sleep(0)
+    await bus.stop()
+    assert adapter.batches == [10, 10, 5, 1]
+    assert isinstance((await vote_task)[0], VoteSaved)
+    assert await adapter.get_poll_results(poll_id="1", sender_user_id="") == {
+        "Да": 25,
+        "Нет": 1,
+    }
+
+
+@pytest.mark.asyncio
+async def test_polls_pages() -> None:
+    adapter = FakeDbAdapter(initial=True)
+    bus = ConcreteMessageBus()
+    bus.register(PollGetter(db_adapter=adapter))
+
+    first_page = await bus.request(
+        GetPollsPage(sender_user_id="test_user", limit=1), expect=[PollsPage]
+    )
+    assert isinstance(first_page, PollsPage)
+    assert [p.name for p in first_page.polls] == ["Первый опрос"]
+    assert first_page.next_cursor == "1"
+
+    last_page = await bus.request(
+        GetPollsPage(sender_user_id="test_user", limit=1, cursor="1"),
+        expect=[PollsPage],
+    )
+    assert isinstance(last_page, PollsPage)
+    assert [p.name for p in last_page.polls] == ["Второй опрос"]
+    assert last_page.next_cursor == ""
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("batch_size", [1, 10])
+async def test_repeated_votes_not_saved(batch_size: int) -> None:
+    adapter = FakeDbAdapter(initial=True)
+    tallies = PollTallies(db_adapter=adapter)
+    bus = ConcreteMessageBus()
+    bus.register(VoteSaver(db_adapter=adapter, batch_size=batch_size, tallies=tallies))
+    await tallies.load("1")
+
+    results = await asyncio.gather(
+        *(
+            bus.request(
+                VoteEvent(vote=SimpleVote(user_id="same_user", variant_id=variant_id)),
+                expect=[VoteSaved],
+            )
+            for variant_id in ["1", "2"] * 5
+        )
+    )
+    await bus.stop()
+    assert [isinstance(res, VoteSaved) and res.saved for res in results].count(
+        True
+    ) == 1
+    assert sum((await tallies.get_results("1")).values()) == 1
+    assert not await tallies.check_consistency()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("with_tallies", [False, True])
+async def test_poll_view(with_tallies: bool, monkeypatch: pytest.MonkeyPatch) -> None:
+    adapter = FakeDbAdapter(initial=True)
+    bus = ConcreteMessageBus()
+    tallies = PollTallies(db_adapter=adapter) if with_tallies else None
+    bus.register(PollGetter(db_adapter=adapter, tallies=tallies))
+    await adapter.create_vote(user_id="voter", variant_id="2")
+    if with_tallies:
+        # с подсчетами голоса адаптера не пересчитываются на каждый просмотр
+        monkeypatch.delattr(FakeDbAdapter, "get_poll_results")
+
+    for user_id, voted in [("voter", True), ("stranger", False)]:
+        res = await bus.request(
+            GetPollView(sender_user_id=user_id, poll_id="1"), expect=[PollView]
+        )
+        assert isinstance(res, PollView) and res.view is not None
+        assert res.view.poll.name == "Первый опрос"
+        assert res.view.results == {"Да": 0, "Нет": 1}
+        assert res.view.voted == voted
+
+    res = await bus.request(
+        GetPollView(sender_user_id="voter", poll_id="404"), expect=[PollView]
+    )
+    assert isinstance(res, PollView) and res.view is None
+
+
+@pytest.mark.asyncio
+async def test_child_event_keeps_id() -> None:
+    parent = GetPollResult(sender_user_id="user", poll_id="1")
+    child = PollResult(poll_id="1", results={})
+
+    linked = await VoteCounter.set_event_parent_id(parent, child)
+
+    assert linked.id_ == child.id_
+    assert linked.parent_id == parent.id_
+    assert parent.id_ != child.id_
@@ -0,0 +1,134 @@
+import asyncio
+
+import pytest
+
+from src.domain.models import SimpleVote
+from src.services.db_adapter import FakeDbAdapter
+from src.services.single_flight import SingleFlight
+from src.services.single_flight import SingleFlightDbAdapter
+
+
+class SlowAdapter(FakeDbAdapter):
+    def __init__(self) -> None:
+        super().__init__(initial=True)
+        self.results_calls = 0
+        self.polls_calls = 0
+
+    async def get_poll_results(
+        self, poll_id: str, sender_user_id: str
+    ) -> dict[str, int]:
+        self.results_calls += 1
+        await asyncio.sleep(0.01)
+        return await super().get_poll_results(poll_id, sender_user_id)
+
+    async def get_polls(self, polls_ids: list[str]) -> list:  # type: ignore
+        self.polls_calls += 1
+        await asyncio.sleep(0.01)
+        return await super().get_polls(polls_ids)
+
+    async def has_user_voted(self, user_id: str, poll_id: str) -> bool:
+        # ответ читается сразу, а приходит позже, как из хранилища
+        voted = await super().has_user_voted(user_id, poll_id)
+        await asyncio.sleep(0.01)
+        return voted
+
+    async def get_votes_count(self, poll_id: str) -> dict[str, int]:
+        counts = await super().get_votes_count(poll_id)
+        await asyncio.sleep(0.01)
+        return counts
+
+
+@pytest.mark.asyncio
+async def test_single_flight_adapter() -> None:
+    slow_adapter = SlowAdapter()
+    adapter = SingleFlightDbAdapter(adapter=slow_adapter)
+
+    results = await asyncio.gather(
+        *(
+            adapter.get_poll_results(poll_id="1", sender_user_id=f"user_{i}")
+            for i in range(100)
+        ),
+        adapter.get_poll_results(poll_id="2", sender_user_id="user"),
+    )
+    assert slow_adapter.results_calls == 2
+    assert results[:100] == [{"Да": 0, "Нет": 0}] * 100
+    assert adapter.stats() == {"flight_started": 2, "flight_shared": 99}
+
+    # после ответа следующий вызов снова идет в хранилище
+    await adapter.get_poll_results(poll_id="1", sender_user_id="user")
+    assert slow_adapter.results_calls == 3
+
+    # запись опроса не отдает новым читателям начатое до нее чтение
+    slow_adapter.polls_calls = 0
+    reading = asyncio.create_task(adapter.get_polls(["1"]))
+    await asyncio.sleep(0)
+    await adapter.update_poll(poll_id="1", is_open=False)
+    polls = await adapter.get_polls(["1"])
+    await reading
+    assert slow_adapter.polls_calls == 2
+    assert not polls[0].is_open
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("batch", [False, True])
+async def test_single_flight_vote_forgets_voted(batch: bool) -> None:
+    adapter = SingleFlightDbAdapter(adapter=SlowAdapter())
+
+    voted = asyncio.create_task(adapter.has_user_voted(user_id="user", poll_id="1"))
+    view = asyncio.create_task(adapter.get_poll_and_voted(poll_id="1", user_id="user"))
+    # чтения начались и ждут ответа хранилища
+    await asyncio.sleep(0.001)
+    if batch:
+        await adapter.create_votes([SimpleVote(user_id="user", variant_id="1")])
+    else:
+        await adapter.create_vote_if_absent(user_id="user", variant_id="1")
+
+    # чтение, начатое до голоса, не отдается читающим после него
+    assert await adapter.has_user_voted(user_id="user", poll_id="1")
+    found = await adapter.get_poll_and_voted(poll_id="1", user_id="user")
+    assert found is not None and found[1]
+    assert not await voted
+    await view
+
+
+@pytest.mark.asyncio
+async def test_single_flight_counts_after_vote() -> None:
+    adapter = SingleFlightDbAdapter(adapter=SlowAdapter())
+
+    before = asyncio.create_task(adapter.get_votes_count(poll_id="1"))
+    await asyncio.sleep(0.001)
+    await adapter.create_vote_if_absent(user_id="user", variant_id="1")
+
+    # подсчеты, учевшие голос, не получают счетчики, прочитанные до него
+    assert await adapter.get_votes_count(poll_id="1") == {"1": 1, "2": 0}
+    assert await before == {"1": 0, "2": 0}
+    assert not adapter.flight.calls
+
+
+@pytest.mark.asyncio
+async def test_single_flight_errors_and_cancel() -> None:
+    flight = SingleFlight()
+    calls = 0
+
+    async def failing() -> int:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise ValueError("storage is down")
+
+    results = await asyncio.gather(
+        *(flight.do("key", failing) for _ in range(3)), return_exceptions=True
+    )
+    assert calls == 1
+    assert all(isinstance(res, ValueError) for res in results)
+
+    async def answer() -> int:
+        await asyncio.sleep(0.01)
+        return 42
+
+    first = asyncio.create_task(flight.do("key", answer))
+    second = asyncio.create_task(flight.do("key", answer))
+    await asyncio.sleep(0)
+    first.cancel()
+    assert await second == 42
+    assert not flight.calls
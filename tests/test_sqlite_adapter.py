@@ -0,0 +1,150 @@
+import typing as tp
+from pathlib import Path
+
+import pytest
+
+from src.bootstrap import build
+from src.domain.models import SimpleVote
+from src.services.message_bus import ConcreteMessageBus
+from src.services.sqlite_adapter import SqliteDbAdapter
+from src.settings import Settings
+from src.web.web import FastApiWeb
+from src.web.web_adapter import WebAdapter
+
+
+@pytest.mark.asyncio
+async def test_sqlite_adapter_polls_and_votes(tmp_path: Path) -> None:
+    adapter = SqliteDbAdapter(path=str(tmp_path / "test.sqlite3"), pool_size=2)
+    poll = await adapter.create_poll(
+        creator_id="test_user",
+        name="test_poll",
+        description="test poll for test",
+        is_open=True,
+        variants=["yes", "no"],
+    )
+
+    assert await adapter.get_polls_ids() == [poll.poll_id]
+    assert await adapter.get_polls([poll.poll_id, "404", "not_int"]) == [poll]
+
+    assert await adapter.create_vote(
+        user_id="user", variant_id=poll.variants[0].variant_id
+    )
+    # второй голос того же пользователя в этом опросе не сохраняется
+    assert not await adapter.create_vote(
+        user_id="user", variant_id=poll.variants[1].variant_id
+    )
+    assert not await adapter.create_vote(user_id="user", variant_id="404")
+    assert await adapter.has_variant(poll.variants[1].variant_id)
+    assert not await adapter.has_variant("404")
+    assert not await adapter.has_variant("not_int")
+    assert await adapter.has_user_voted(user_id="user", poll_id=poll.poll_id)
+    assert not await adapter.has_user_voted(user_id="other", poll_id=poll.poll_id)
+    assert await adapter.get_poll_results(
+        poll_id=poll.poll_id, sender_user_id="user"
+    ) == {"yes": 1, "no": 0}
+
+    assert await adapter.create_votes(
+        [
+            SimpleVote(user_id="first", variant_id=poll.variants[1].variant_id),
+            SimpleVote(user_id="first", variant_id=poll.variants[0].variant_id),
+            SimpleVote(user_id="second", variant_id="not_int"),
+            SimpleVote(user_id="second", variant_id=poll.variants[1].variant_id),
+        ]
+    ) == [True, False, False, True]
+    assert await adapter.get_poll_results(
+        poll_id=poll.poll_id, sender_user_id="user"
+    ) == {"yes": 1, "no": 2}
+    assert await adapter.get_votes_count(poll_id=poll.poll_id) == {
+        poll.variants[0].variant_id: 1,
+        poll.variants[1].variant_id: 2,
+    }
+
+    assert await adapter.update_poll(poll_id=poll.poll_id, is_open=False)
+    await adapter.close()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_adapter_persistence(tmp_path: Path) -> None:
+    path = str(tmp_path / "test.sqlite3")
+    adapter = SqliteDbAdapter(path=path)
+    poll = await adapter.create_poll(
+        creator_id="test_user",
+        name="test_poll",
+        description="test poll for test",
+        is_open=True,
+        variants=["yes", "no"],
+    )
+    await adapter.create_vote(user_id="user", variant_id=poll.variants[1].variant_id)
+    await adapter.close()
+
+    reopened_adapter = SqliteDbAdapter(path=path)
+    polls = await reopened_adapter.get_polls([poll.poll_id])
+    assert polls == [poll]
+    assert await reopened_adapter.get_poll_results(
+        poll_id=poll.poll_id, sender_user_id="user"
+    ) == {"yes": 0, "no": 1}
+    await reopened_adapter.close()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_changes_of_other_process(tmp_path: Path) -> None:
+    # два адаптера на одном файле - как два процесса
+    path = str(tmp_path / "test.sqlite3")
+    first = SqliteDbAdapter(path=path, pool_size=1)
+    second = SqliteDbAdapter(path=path, pool_size=1)
+    old_poll = await first.create_poll(
+        creator_id="test_user",
+        name="old",
+        description="created before tracking",
+        is_open=True,
+        variants=["yes"],
+    )
+    changes = await second.get_changes()
+    assert changes.polls_ids == frozenset() and changes.votes == ()
+
+    poll = await first.create_poll(
+        creator_id="test_user",
+        name="test_poll",
+        description="test poll for test",
+        is_open=True,
+        variants=["yes", "no"],
+    )
+    yes, no = (variant.variant_id for variant in poll.variants)
+    await first.create_votes(
+        [SimpleVote(user_id="first", variant_id=yes), SimpleVote("old", "404")]
+    )
+    await second.create_vote(user_id="second", variant_id=no)
+    await first.update_poll(poll_id=old_poll.poll_id, is_open=False)
+
+    changes = await second.get_changes()
+    assert changes.polls_ids == {poll.poll_id, old_poll.poll_id}
+    # свой голос второй адаптер уже учел
+    assert changes.votes == ((poll.poll_id, SimpleVote("first", yes)),)
+    assert second.own_votes == []
+
+    changes = await second.get_changes()
+    assert changes.polls_ids == frozenset() and changes.votes == ()
+
+    await first.close()
+    await second.close()
+
+
+@pytest.mark.asyncio
+async def test_app_stop_closes_sqlite(tmp_path: Path) -> None:
+    app = build(
+        bus=ConcreteMessageBus,
+        web=FastApiWeb,
+        web_adapter=WebAdapter,
+        settings=Settings(storage="sqlite", sqlite_path=str(tmp_path / "app.sqlite3")),
+    )
+    await app.start()
+    assert await app.db_adapter.get_polls_ids() == []
+    # обертки кэша, single-flight и метрик передают close хранилищу
+    storage: tp.Any = app.db_adapter
+    while not isinstance(storage, SqliteDbAdapter):
+        storage = storage.adapter
+    await app.stop()
+
+    assert storage.pool._writer is None
+    assert storage.pool._all_readers == []
+    assert storage.pool._executor._shutdown
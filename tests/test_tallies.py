@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+
+from src.domain.events import GetPollResult
+from src.domain.events import PollResult
+from src.domain.events import VoteEvent
+from src.domain.models import SimpleVote
+from src.domain.processors import VoteCounter
+from src.domain.processors import VoteSaver
+from src.domain.tallies import PollTallies
+from src.services.db_adapter import FakeDbAdapter
+from src.services.message_bus import ConcreteMessageBus
+
+
+@pytest.mark.asyncio
+async def test_tallies_follow_saved_votes() -> None:
+    adapter = FakeDbAdapter(initial=True)
+    tallies = PollTallies(db_adapter=adapter)
+
+    bus = ConcreteMessageBus()
+    bus.register(VoteSaver(db_adapter=adapter, tallies=tallies))
+    bus.register(VoteCounter(db_adapter=adapter, tallies=tallies))
+
+    await adapter.create_vote(user_id="before_load", variant_id="3")
+    for poll_id in ["1", "2", "404"]:
+        res = await bus.request(
+            GetPollResult(poll_id=poll_id, sender_user_id="test_user"),
+            expect=[PollResult],
+        )
+        assert isinstance(res, PollResult)
+        assert res.results == await adapter.get_poll_results(
+            poll_id=poll_id, sender_user_id="test_user"
+        )
+
+    for i, variant_id in enumerate(["1", "2", "2", "5"]):
+        await bus.public_message(
+            VoteEvent(vote=SimpleVote(user_id=f"user_{i}", variant_id=variant_id))
+        )
+    await bus.stop()
+    assert await tallies.get_results("1") == {"Да": 1, "Нет": 2}
+    assert await tallies.get_results("2") == {"Да": 1, "Нет": 0, "Не знаю": 1}
+    assert not await tallies.check_consistency()
+
+
+@pytest.mark.asyncio
+async def test_tallies_rebuild() -> None:
+    adapter = FakeDbAdapter(initial=True)
+    tallies = PollTallies(db_adapter=adapter)
+    assert await tallies.get_results("1") == {"Да": 0, "Нет": 0}
+
+    # голос мимо VoteSaver, счетчики расходятся с хранилищем
+    await adapter.create_vote(user_id="user", variant_id="2")
+    assert await tallies.check_consistency() == {
+        "1": ({"1": 0, "2": 0}, {"1": 0, "2": 1})
+    }
+
+    await tallies.rebuild_all()
+    assert not await tallies.check_consistency()
+    assert await tallies.get_results("1") == {"Да": 0, "Нет": 1}
+
+
+class SlowAckAdapter(FakeDbAdapter):
+    """Vote is committed before the call returns, like in sqlite thread pool"""
+
+    def __init__(self) -> None:
+        super().__init__(initial=True)
+        self.ack = asyncio.Event()
+        self.counts_read = asyncio.Event()
+        self.return_counts = asyncio.Event()
+
+    async def create_vote_if_absent(self, user_id: str, variant_id: str) -> bool:
+        saved = await super().create_vote_if_absent(user_id, variant_id)
+        await self.ack.wait()
+        return saved
+
+    async def get_votes_count(self, poll_id: str) -> dict[str, int]:
+        counts = await super().get_votes_count(poll_id)
+        self.counts_read.set()
+        await self.return_counts.wait()
+        return counts
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("load_first", [False, True])
+async def test_tallies_load_during_vote(load_first: bool) -> None:
+    adapter = SlowAckAdapter()
+    tallies = PollTallies(db_adapter=adapter)
+    saver = VoteSaver(db_adapter=adapter, tallies=tallies)
+    vote = VoteEvent(vote=SimpleVote(user_id="user", variant_id="1"))
+
+    if load_first:
+        # счетчики прочитаны до голоса, но еще не записаны в tallies
+        adapter.ack.set()
+        load = asyncio.create_task(tallies.get_results("1"))
+        await adapter.counts_read.wait()
+        save = asyncio.create_task(saver.process(vote))
+        await asyncio.sleep(0.01)
+        adapter.return_counts.set()
+    else:
+        # голос сохранен, но до record_vote еще не дошел
+        adapter.return_counts.set()
+        save = asyncio.create_task(saver.process(vote))
+        await asyncio.sleep(0.01)
+        load = asyncio.create_task(tallies.get_results("1"))
+        await asyncio.sleep(0.01)
+        adapter.ack.set()
+    await asyncio.gather(save, load)
+
+    assert await tallies.get_results("1") == {"Да": 1, "Нет": 0}
+    assert not await tallies.check_consistency()
@@ -0,0 +1,184 @@
+import asyncio
+import json
+import typing as tp
+from functools import partial
+from pathlib import Path
+
+import pytest
+
+from src.bootstrap import build
+from src.domain.events import Event
+from src.domain.events import GetPollResult
+from src.domain.events import PollResult
+from src.domain.processors import VoteCounter
+from src.domain.subscriber import Subscriber
+from src.services.db_adapter import FakeDbAdapter
+from src.services.message_bus import ConcreteMessageBus
+from src.services.observed_adapter import ObservedDbAdapter
+from src.services.tracing import Span
+from src.services.tracing import SpanCollector
+from src.services.tracing import Tracer
+from src.services.tracing import current_span
+from src.settings import Settings
+from src.web.web import FastApiWeb
+from src.web.web_adapter import WebAdapter
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("concurrent", [False, True])
+async def test_cascade_span_tree(concurrent: bool) -> None:
+    collector = SpanCollector()
+    tracer = Tracer(exporter=collector)
+    adapter = ObservedDbAdapter(adapter=FakeDbAdapter(initial=True), observers=[tracer])
+    bus = ConcreteMessageBus(concurrent=concurrent, early_return=True)
+    bus.add_observer(tracer)
+    bus.register(VoteCounter(db_adapter=adapter))
+    bus.register(VoteCounter(db_adapter=adapter))
+
+    root = tracer.start_span("GET /poll_vote/1")
+    response = await bus.request(
+        GetPollResult(sender_user_id="user", poll_id="1"), expect=[PollResult]
+    )
+    tracer.end_span(root)
+    await bus.stop()
+
+    assert isinstance(response, PollResult)
+    spans = collector.trace(root.trace_id)
+    by_id = {span.span_id: span for span in spans}
+
+    def parent(span: Span) -> str:
+        return by_id[span.parent_id].name
+
+    names = [span.name for span in spans]
+    assert names.count("event GetPollResult") == 1
+    assert names.count("event PollResult") == 2
+    assert names.count("process VoteCounter") == 2
+    for span in spans:
+        if span.name == "event GetPollResult":
+            assert span.parent_id == root.span_id
+            assert span.attributes["event.children"] == 2
+        elif span.name in ("event PollResult", "process VoteCounter"):
+            assert parent(span) == "event GetPollResult"
+        elif span.name.startswith("adapter "):
+            assert parent(span) == "process VoteCounter"
+        assert span.end >= span.start
+    assert len(collector.spans) == len(spans)
+
+
+class Splitter(Subscriber):
+    handled_events = (GetPollResult,)
+
+    async def process(self, event: Event) -> list[Event]:
+        assert isinstance(event, GetPollResult)
+        return [
+            PollResult(poll_id=poll_id, results={}, parent_id=event.id_)
+            for poll_id in ("1", "2")
+        ]
+
+
+class FailingCounter(Subscriber):
+    handled_events = (PollResult,)
+
+    async def process(self, event: Event) -> list[Event]:
+        raise ValueError("counter is down")
+
+
+@pytest.mark.asyncio
+async def test_failed_dispatch_ends_spans() -> None:
+    collector = SpanCollector()
+    tracer = Tracer(exporter=collector)
+    bus = ConcreteMessageBus(isolate_errors=False)
+    bus.add_observer(tracer)
+    bus.register(Splitter())
+    bus.register(FailingCounter())
+
+    root = tracer.start_span("GET /poll_vote/1")
+    with pytest.raises(ValueError):
+        await bus.public_message(GetPollResult(sender_user_id="user", poll_id="1"))
+    assert current_span.get() is root
+    tracer.end_span(root)
+
+    # второй PollResult не обработан, его родитель не остается в трассировщике
+    assert not tracer.event_parents
+    spans = {span.name: span for span in collector.trace(root.trace_id)}
+    assert set(spans) == {
+        "GET /poll_vote/1",
+        "event GetPollResult",
+        "event PollResult",
+        "process Splitter",
+        "process FailingCounter",
+    }
+    assert "counter is down" in spans["event PollResult"].error
+    assert "counter is down" in spans["process FailingCounter"].error
+    assert all(span.end for span in spans.values())
+
+
+async def call_app(app: tp.Any, path: str) -> tuple[int, dict[bytes, bytes], bytes]:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"test")],
+        "client": ("127.0.0.1", 0),
+        "server": ("test", 80),
+    }
+    messages: list[dict[str, tp.Any]] = []
+    received = False
+    done = asyncio.Event()
+
+    async def receive() -> dict[str, tp.Any]:
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # клиент отключается только после ответа
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: dict[str, tp.Any]) -> None:
+        messages.append(message)
+        if message["type"] == "http.response.body" and not message.get("more_body"):
+            done.set()
+
+    await app(scope, receive, send)
+    start = messages[0]
+    body = b"".join(message.get("body", b"") for message in messages[1:])
+    return start["status"], dict(start["headers"]), body
+
+
+@pytest.mark.asyncio
+async def test_request_trace_file(tmp_path: Path) -> None:
+    trace_path = tmp_path / "trace.jsonl"
+    app = build(
+        bus=partial(ConcreteMessageBus, concurrent=True, early_return=True),
+        web=FastApiWeb,
+        web_adapter=WebAdapter,
+        settings=Settings(cache_size=0, trace_path=str(trace_path)),
+    )
+    await app.start()
+    status, headers, _ = await call_app(
+        tp.cast(FastApiWeb, app.web).app, "/api/v1/polls/1"
+    )
+    await app.stop()
+
+    assert status == 200
+    trace_id = headers[b"x-trace-id"].decode()
+    spans = [json.loads(line) for line in trace_path.read_text().splitlines()]
+    request_span = next(span for span in spans if "parentSpanId" not in span)
+    assert request_span["traceId"] == trace_id
+    assert request_span["name"] == "GET /api/v1/polls/1"
+    assert {"key": "http.status_code", "value": {"intValue": "200"}} in (
+        request_span["attributes"]
+    )
+    assert {span["traceId"] for span in spans} == {trace_id}
+    assert {
+        "event GetPollView",
+        "process PollGetter",
+        "adapter get_poll_and_voted",
+    } <= {span["name"] for span in spans}
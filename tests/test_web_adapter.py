@@ -0,0 +1,122 @@
+import asyncio
+import time
+import typing as tp
+
+import pytest
+
+from src.domain.events import GetPollResult
+from src.domain.events import PollResult
+from src.domain.processors import VoteCounter
+from src.domain.processors import VoteSaver
+from src.services.db_adapter import FakeDbAdapter
+from src.services.message_bus import ConcreteMessageBus
+from src.services.message_bus import WorkerPoolMessageBus
+from src.web.web import FastApiWeb
+from src.web.web_adapter import UnknownVariantError
+from src.web.web_adapter import WebAdapter
+
+
+class SlowVotesAdapter(FakeDbAdapter):
+    async def create_vote_if_absent(self, user_id: str, variant_id: str) -> bool:
+        await asyncio.sleep(0.3)
+        return await super().create_vote_if_absent(user_id, variant_id)
+
+
+@pytest.mark.asyncio
+async def test_votes_do_not_take_read_workers() -> None:
+    adapter = SlowVotesAdapter(initial=True)
+    bus = WorkerPoolMessageBus(workers=1, request_workers=1)
+    bus.register(VoteSaver(db_adapter=adapter))
+    bus.register(VoteCounter(db_adapter=adapter))
+    web_adapter = WebAdapter(bus=bus)
+
+    vote = asyncio.create_task(web_adapter.create_vote(variant_id="1", user_id="user"))
+    await asyncio.sleep(0.01)
+    start_time = time.time()
+    res = await bus.request(
+        GetPollResult(poll_id="1", sender_user_id="user"), expect=[PollResult]
+    )
+    # чтение не ждет единственного воркера запросов за голосом
+    assert time.time() - start_time < 0.2
+    assert isinstance(res, PollResult)
+    assert not vote.done()
+
+    assert await vote
+    assert await adapter.has_user_voted(user_id="user", poll_id="1")
+    await bus.stop()
+
+
+@pytest.mark.asyncio
+async def test_unknown_variant_is_not_repeated_vote() -> None:
+    bus = ConcreteMessageBus()
+    bus.register(VoteSaver(db_adapter=FakeDbAdapter(initial=True)))
+    web_adapter = WebAdapter(bus=bus)
+
+    assert await web_adapter.create_vote(variant_id="1", user_id="user")
+    assert not await web_adapter.create_vote(variant_id="2", user_id="user")
+    with pytest.raises(UnknownVariantError):
+        await web_adapter.create_vote(variant_id="404", user_id="user")
+
+
+async def post_vote(app: tp.Any, variant_id: str) -> tuple[int, dict[bytes, bytes]]:
+    body = f"radio={variant_id}".encode()
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/vote",
+        "raw_path": b"/vote",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (b"host", b"test"),
+            (b"content-type", b"application/x-www-form-urlencoded"),
+            (b"content-length", str(len(body)).encode()),
+            (b"referer", b"http://test/poll_vote/1"),
+            (b"cookie", b"X-edec-poll=user"),
+        ],
+        "client": ("127.0.0.1", 0),
+        "server": ("test", 80),
+    }
+    messages: list[dict[str, tp.Any]] = []
+    received = False
+    done = asyncio.Event()
+
+    async def receive() -> dict[str, tp.Any]:
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: dict[str, tp.Any]) -> None:
+        messages.append(message)
+        if message["type"] == "http.response.body" and not message.get("more_body"):
+            done.set()
+
+    await app(scope, receive, send)
+    return messages[0]["status"], dict(messages[0]["headers"])
+
+
+@pytest.mark.asyncio
+async def test_vote_form_unknown_variant() -> None:
+    bus = ConcreteMessageBus()
+    bus.register(VoteSaver(db_adapter=FakeDbAdapter(initial=True)))
+    web_adapter = WebAdapter(bus=bus)
+    web = FastApiWeb(
+        host="test",
+        port=80,
+        adapter=web_adapter,
+        message_handler=web_adapter.message_handler,
+    )
+
+    status, headers = await post_vote(web.app, "1")
+    assert status == 302 and headers[b"location"] == b"/poll_vote/1"
+    status, headers = await post_vote(web.app, "2")
+    assert headers[b"location"] == b"/poll_vote/1?already_voted=1"
+    # неизвестный вариант - не повторный голос
+    status, _ = await post_vote(web.app, "404")
+    assert status == 404
@@ -0,0 +1,54 @@
+import os
+import re
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return int(sock.getsockname()[1])
+
+
+def get(url: str, timeout: float) -> bytes:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                data: bytes = response.read()
+                return data
+        except (urllib.error.URLError, ConnectionError):
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+def test_workers_serve_shared_socket(tmp_path: Path) -> None:
+    port = free_port()
+    env = os.environ | {
+        "EDEC_HOST": "127.0.0.1",
+        "EDEC_PORT": str(port),
+        "EDEC_WEB_WORKERS": "2",
+        "EDEC_STORAGE": "sqlite",
+        "EDEC_SQLITE_PATH": str(tmp_path / "edec.sqlite3"),
+    }
+    server = subprocess.Popen([sys.executable, "main.py"], cwd=ROOT, env=env)
+    try:
+        body = get(f"http://127.0.0.1:{port}/metrics", timeout=30).decode()
+    finally:
+        server.send_signal(signal.SIGTERM)
+        code = server.wait(timeout=30)
+
+    # ответил один из порожденных процессов, а не родитель с сокетом
+    workers = set(re.findall(r'worker="(\d+)"', body))
+    assert len(workers) == 1
+    assert int(workers.pop()) != server.pid
+    assert code == 0